@@ -0,0 +1,91 @@
+"""
+Micro-benchmark of the image processing nodes.
+
+Each node processes the same frame repeatedly. After a warm-up, the time per
+frame is measured and tracemalloc checks that no frame-sized buffer is
+allocated per call (NumPy reports its allocations to tracemalloc).
+
+Usage:
+    python -m benchmarks.bench_nodes [--width 1920] [--height 1080] [--frames 200]
+"""
+import argparse
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from flowdip.backend import flowdip_nodes as nodes
+
+# Node class, parameters
+CASES = [
+    (nodes.BackResize, {"width": 960, "height": 540}),
+    (nodes.BackColorConvert, {"conversion": "BGR2GRAY"}),
+    (nodes.BackColorConvert, {"conversion": "BGR2HSV"}),
+    (nodes.BackBlur, {"mode": "gaussian", "ksize": 5}),
+    (nodes.BackBlur, {"mode": "box", "ksize": 5}),
+    (nodes.BackBlur, {"mode": "median", "ksize": 5}),
+    (nodes.BackThreshold, {"thresh": 100, "type": "binary"}),
+    (nodes.BackCrop, {"x": 100, "y": 100, "width": 640, "height": 480}),
+    (nodes.BackNormalize, {"mode": "minmax"}),
+    (nodes.BackNormalize, {"mode": "scale", "alpha": 0.5, "beta": 10}),
+    (nodes.BackInvert, {}),
+    (nodes.BackMorphology, {"operation": "open", "ksize": 3}),
+]
+
+WARMUP_FRAMES = 10
+# Anything above this per frame can only be a frame-sized allocation
+ALLOCATION_TOLERANCE = 16 * 1024
+
+
+def bench_node(node_class, params, frame, n_frames):
+    node = node_class(flowdip_name=f"bench.{node_class.__name__}")
+    node.update_params(params)
+    node.frame_in.data = frame
+
+    for _ in range(WARMUP_FRAMES):
+        node._process_data()
+
+    tracemalloc.start()
+    base, _ = tracemalloc.get_traced_memory()
+    t0 = time.perf_counter()
+    for _ in range(n_frames):
+        node._process_data()
+    elapsed = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "node": node_class.__name__,
+        "params": params,
+        "ms_per_frame": elapsed / n_frames * 1e3,
+        "peak_alloc_bytes": peak - base,
+    }
+
+
+def run(width=1920, height=1080, n_frames=200):
+    rng = np.random.default_rng(0)
+    frame = rng.integers(0, 256, (height, width, 3), dtype=np.uint8)
+    return [bench_node(cls, params, frame, n_frames) for cls, params in CASES]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    parser.add_argument("--frames", type=int, default=200)
+    args = parser.parse_args()
+
+    failed = False
+    for result in run(args.width, args.height, args.frames):
+        ok = result["peak_alloc_bytes"] <= ALLOCATION_TOLERANCE
+        failed |= not ok
+        print(f"{result['node']:<18} {str(result['params']):<48} "
+              f"{result['ms_per_frame']:8.3f} ms/frame  "
+              f"peak alloc {result['peak_alloc_bytes']:>9} B  {'OK' if ok else 'ALLOCATES'}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Compares two benchmark result files and flags regressions.
+
+Usage:
+    python -m benchmarks.compare baseline.json candidate.json [--threshold 10]
+
+Exits with status 1 if any metric got worse by more than the threshold (%).
+"""
+import argparse
+import json
+import sys
+
+# Metric name -> True if higher is better
+METRICS = {
+    "fps": True,
+    "mb_per_s": True,
+    "events_per_s": True,
+    "per_edge_us": False,
+    "ms_per_frame": False,
+    "ms_per_upload": False,
+}
+
+
+def flatten(results: dict) -> dict:
+    """Maps 'section/key/metric' to value for every known metric."""
+    flat = {}
+
+    def visit(prefix, value):
+        if isinstance(value, dict):
+            for key, sub in value.items():
+                if key in METRICS and isinstance(sub, (int, float)):
+                    flat[f"{prefix}/{key}"] = sub
+                else:
+                    visit(f"{prefix}/{key}", sub)
+        elif isinstance(value, list):
+            # Node benchmark rows are keyed by node name and params
+            for row in value:
+                params = ",".join(f"{k}={v}" for k, v in row.get("params", {}).items())
+                visit(f"{prefix}/{row.get('node')}({params})", {k: v for k, v in row.items()
+                                                               if k in METRICS})
+
+    for section, value in results.items():
+        visit(section, value)
+    return flat
+
+
+def compare(baseline: dict, candidate: dict, threshold: float):
+    """Returns (rows, regressions). Each row is (name, base, new, change %)."""
+    base, new = flatten(baseline["results"]), flatten(candidate["results"])
+    rows, regressions = [], []
+    for name in sorted(base.keys() & new.keys()):
+        old_value, new_value = base[name], new[name]
+        if old_value == 0:
+            continue
+        change = (new_value - old_value) / old_value * 100.0
+        higher_is_better = METRICS[name.rsplit("/", 1)[1]]
+        worse = -change if higher_is_better else change
+        rows.append((name, old_value, new_value, change))
+        if worse > threshold:
+            regressions.append(name)
+    return rows, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare FlowDiP benchmark results.")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=10.0,
+                        help="Allowed slowdown in percent (default: 10)")
+    args = parser.parse_args()
+
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(args.candidate, "r", encoding="utf-8") as f:
+        candidate = json.load(f)
+
+    print(f"baseline:  {baseline['meta'].get('commit')}")
+    print(f"candidate: {candidate['meta'].get('commit')}")
+    if baseline["meta"].get("cpu_count") != candidate["meta"].get("cpu_count"):
+        print("warning: results come from machines with different CPU counts")
+
+    rows, regressions = compare(baseline, candidate, args.threshold)
+    width = max((len(row[0]) for row in rows), default=0)
+    for name, old_value, new_value, change in rows:
+        flag = "  REGRESSION" if name in regressions else ""
+        print(f"{name:<{width}}  {old_value:12.3f}  {new_value:12.3f}  {change:+7.1f}%{flag}")
+
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) above {args.threshold:.0f}%")
+        sys.exit(1)
+    print("\nNo regressions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Pixel format negotiation check of the graph compiler.
+
+Builds small graphs of backend nodes (without starting them) and checks the
+format negotiated by their source and the conversions inserted on links:
+  - a source only feeding inference decodes BGR (color models)
+  - a source only feeding GRAY consumers (Otsu threshold) decodes GRAY
+  - a source feeding both decodes BGR, converted to GRAY on the GRAY link
+  - a GRAY link to inference gets a GRAY2BGR conversion
+
+Exits with status 1 if a check fails.
+
+Usage:
+    python -m benchmarks.graph_check
+"""
+import sys
+
+from flowdip.backend.flowdip_nodes import BackColorConvert, BackInference, BackMediaPlayer, BackThreshold
+from flowdip.backend.graph_compiler import compile_graph
+
+
+def otsu_threshold(name: str) -> BackThreshold:
+    node = BackThreshold(name)
+    node.update_params({"otsu": True})
+    return node
+
+
+def gray_converter(name: str) -> BackColorConvert:
+    node = BackColorConvert(name)
+    node.update_params({"conversion": "BGR2GRAY"})
+    return node
+
+
+def link(output_port, input_port):
+    input_port.connect(output_port)
+    return input_port
+
+
+def case_inference_only():
+    source, inference = BackMediaPlayer("source"), BackInference("inference")
+    link(source.frame_out, inference.frame_ins[0])
+    return [source, inference], source.frame_out, {}
+
+
+def case_gray_only():
+    source, threshold = BackMediaPlayer("source"), otsu_threshold("threshold")
+    link(source.frame_out, threshold.frame_in)
+    return [source, threshold], source.frame_out, {}
+
+
+def case_gray_and_inference():
+    source, threshold, inference = BackMediaPlayer("source"), otsu_threshold("threshold"), BackInference("inference")
+    gray_input = link(source.frame_out, threshold.frame_in)
+    link(source.frame_out, inference.frame_ins[0])
+    return [source, threshold, inference], source.frame_out, {gray_input: "BGR2GRAY"}
+
+
+def case_gray_link_to_inference():
+    source, gray, inference = BackMediaPlayer("source"), gray_converter("gray"), BackInference("inference")
+    link(source.frame_out, gray.frame_in)
+    color_input = link(gray.frame_out, inference.frame_ins[0])
+    return [source, gray, inference], source.frame_out, {color_input: "GRAY2BGR"}
+
+
+# Case -> format the source must decode
+CASES = {
+    case_inference_only: "BGR",
+    case_gray_only: "GRAY",
+    case_gray_and_inference: "BGR",
+    case_gray_link_to_inference: "BGR",
+}
+
+
+def check() -> bool:
+    ok = True
+    for case, expected in CASES.items():
+        nodes, source_output, conversions = case()
+        plan = compile_graph(nodes)
+        failures = list(plan.errors)
+        if source_output.pixel_format != expected:
+            failures.append(f"source decodes {source_output.pixel_format}, expected {expected}")
+        for input_port, name in conversions.items():
+            conversion = plan.conversions.get(input_port)
+            if conversion is None or conversion.name != name:
+                failures.append(f"{input_port.node.flowdip_name}.{input_port.name} converts with "
+                                f"{conversion.name if conversion else None}, expected {name}")
+        name = case.__name__[len("case_"):]
+        print(f"{'FAIL' if failures else 'ok  '} {name}: {source_output.pixel_format}")
+        for failure in failures:
+            print(f"     {failure}")
+        ok = ok and not failures
+    return ok
+
+
+def main():
+    sys.exit(0 if check() else 1)
+
+
+if __name__ == "__main__":
+    main()
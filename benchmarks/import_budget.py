@@ -0,0 +1,79 @@
+"""
+Import budget check for the FlowDiP process entry points.
+
+Each entry module is imported in a fresh interpreter with `-X importtime`.
+The check fails (exit status 1) if an entry point imports a module it must
+not load (e.g. Qt in the backend, OpenCV in the frontend) or if its
+cumulative import time exceeds its budget.
+
+Usage:
+    python -m benchmarks.import_budget [--scale 1.5]
+
+`--scale` multiplies every budget, for slower machines.
+"""
+import argparse
+import json
+import subprocess
+import sys
+
+# Entry module -> (budget in ms, forbidden top-level modules)
+ENTRY_POINTS = {
+    "flowdip.__main__": (150, {"cv2", "numpy", "PySide6", "shiboken6", "OpenGL", "NodeGraphQt"}),
+    "flowdip.backend.main_backend": (200, {"cv2", "numpy", "PySide6", "shiboken6", "OpenGL", "NodeGraphQt"}),
+    "flowdip.frontend.main_frontend": (1500, {"cv2", "OpenGL"}),
+}
+
+_PROBE = "import json, sys, {module}; print(json.dumps(sorted(sys.modules)))"
+
+
+def measure(module: str):
+    """Returns (cumulative import time in ms, loaded modules), or None and
+    the error message if the module cannot be imported here."""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", _PROBE.format(module=module)],
+                          capture_output=True, text=True)
+    if proc.returncode != 0:
+        return None, proc.stderr.strip().splitlines()[-1] if proc.stderr else "import failed"
+
+    cumulative_us = 0
+    for line in proc.stderr.splitlines():
+        # "import time: self [us] | cumulative | imported package"
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if fields[2].strip() == module:
+            cumulative_us = int(fields[1])
+    return cumulative_us / 1000.0, set(json.loads(proc.stdout))
+
+
+def check(scale: float = 1.0) -> bool:
+    ok = True
+    for module, (budget_ms, forbidden) in ENTRY_POINTS.items():
+        elapsed_ms, loaded = measure(module)
+        if elapsed_ms is None:
+            # Missing optional dependency (e.g. no PySide6 on a headless box)
+            if "ModuleNotFoundError" in loaded:
+                print(f"SKIP {module}: {loaded}")
+                continue
+            print(f"FAIL {module}: {loaded}")
+            ok = False
+            continue
+
+        leaked = sorted(name for name in forbidden if name in loaded)
+        over_budget = elapsed_ms > budget_ms * scale
+        status = "FAIL" if leaked or over_budget else "ok  "
+        print(f"{status} {module}: {elapsed_ms:.0f} ms (budget {budget_ms * scale:.0f} ms)")
+        if leaked:
+            print(f"     imports forbidden modules: {', '.join(leaked)}")
+        ok = ok and not leaked and not over_budget
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check FlowDiP import time budgets.")
+    parser.add_argument("--scale", type=float, default=1.0, help="Budget multiplier")
+    args = parser.parse_args()
+    sys.exit(0 if check(args.scale) else 1)
+
+
+if __name__ == "__main__":
+    main()
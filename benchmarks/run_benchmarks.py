@@ -0,0 +1,321 @@
+"""
+FlowDiP benchmark suite.
+
+Measures, on locally generated synthetic videos:
+  - decode:     frames/s decoded by BackMediaPlayer per resolution and codec
+  - shm:        frames/s published to shared memory (decode-free raw source)
+  - ipc:        Request/Event objects/s through a multiprocessing.Queue
+  - scheduler:  per-edge overhead of the node thread handoff
+  - nodes:      image processing node cost (see bench_nodes.py)
+  - upload:     offscreen OpenGL texture upload time (needs PySide6/PyOpenGL)
+
+Results are written as JSON (with the git commit) so that runs on different
+commits can be compared with benchmarks/compare.py.
+
+Usage:
+    python -m benchmarks.run_benchmarks [-o results.json] [--quick]
+                                        [--only decode shm ...]
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from multiprocessing import Process, Queue
+
+import cv2
+import numpy as np
+
+from benchmarks import bench_nodes, synthetic
+from flowdip import Event, EventType, UpdateNodeParamsPayload
+from flowdip.backend.flowdip_be_base import BackEndFlowDiPNode
+from flowdip.backend.flowdip_nodes import BackMediaPlayer, BackRawFrameSource
+from flowdip.backend.graph_compiler import compile_graph
+from flowdip.backend.raw_frames import RawFrameWriter
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+class NullManager:
+    """Stands in for BackEndManager; events are discarded."""
+
+    remote_preview = None
+
+    def publish_event(self, ev):
+        pass
+
+
+# =============================================================================
+#  Decode
+# =============================================================================
+
+def bench_decode(resolutions, codecs, n_frames):
+    results = {}
+    for resolution in resolutions:
+        for codec in codecs:
+            path = synthetic.cached_video(resolution, codec, n_frames)
+            key = f"{resolution}/{codec}"
+            if path is None:
+                results[key] = {"skipped": f"codec {codec} unavailable"}
+                continue
+
+            player = BackMediaPlayer("bench.decode", be_manager=NullManager())
+            player.open_source(path)
+            decoded = 1  # open_source reads the first frame
+            t0 = time.perf_counter()
+            while player.read_frame() is not None:
+                decoded += 1
+            elapsed = time.perf_counter() - t0
+            player.cap.release()
+            results[key] = {"frames": decoded, "fps": (decoded - 1) / elapsed if elapsed else 0.0}
+    return results
+
+
+# =============================================================================
+#  Shared memory publish
+# =============================================================================
+
+def bench_shm(resolutions, n_frames):
+    results = {}
+    for resolution in resolutions:
+        width, height = synthetic.RESOLUTIONS[resolution]
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "frames.fdraw")
+            with RawFrameWriter(path, (height, width, 3), np.uint8, fps=0.0) as writer:
+                for frame in synthetic.synthetic_frames(width, height, min(n_frames, 30)):
+                    writer.append(frame)
+
+            source = BackRawFrameSource(f"flowdip.bench.shm.{os.getpid()}", be_manager=NullManager())
+            source.open_video_cap_from_file(path)
+            try:
+                published = 0
+                t0 = time.perf_counter()
+                while published < n_frames:
+                    if source.frame_index >= len(source.reader):
+                        source.frame_index = 0
+                    source._process_data()
+                    published += 1
+                elapsed = time.perf_counter() - t0
+            finally:
+                source.shm.close()
+                source.shm.unlink()
+                source.reader.close()
+
+        frame_mb = width * height * 3 / 1e6
+        results[resolution] = {"fps": n_frames / elapsed, "mb_per_s": n_frames * frame_mb / elapsed}
+    return results
+
+
+# =============================================================================
+#  IPC events
+# =============================================================================
+
+def _event_producer(queue: Queue, n_events: int):
+    for _ in range(n_events):
+        queue.put(Event(
+            event_type=EventType.UPDATE_NODE_PARAMS,
+            payload=UpdateNodeParamsPayload(flowdip_name="flowdip.Bench.0", new_params={})
+        ))
+    queue.put(None)
+
+
+def bench_ipc(n_events):
+    queue = Queue()
+    producer = Process(target=_event_producer, args=(queue, n_events))
+    t0 = time.perf_counter()
+    producer.start()
+    received = 0
+    while queue.get() is not None:
+        received += 1
+    elapsed = time.perf_counter() - t0
+    producer.join()
+    return {"events": received, "events_per_s": received / elapsed}
+
+
+# =============================================================================
+#  Scheduler overhead
+# =============================================================================
+
+class _BenchSource(BackEndFlowDiPNode):
+    """Loop node emitting `n_frames` frames, waiting for the whole chain."""
+
+    _loop = True
+
+    def __init__(self, n_frames):
+        super().__init__(flowdip_name="bench.source")
+        self._sync = True
+        self.n_frames = n_frames
+        self.emitted = 0
+        self.finished = threading.Event()
+        self.frame = np.zeros((4, 4), dtype=np.uint8)
+        self.frame_out = self.create_port("Frame", is_input=False)
+
+    def _process_data(self):
+        self.update_port_data(self.frame_out, self.frame)
+        self.emitted += 1
+        if self.emitted >= self.n_frames:
+            self.start_e.clear()
+            self.finished.set()
+
+
+class _BenchPassThrough(BackEndFlowDiPNode):
+
+    def __init__(self, index):
+        super().__init__(flowdip_name=f"bench.pass.{index}")
+        self._sync = True
+        self.frame_in = self.create_port("Frame", is_input=True, critical=True)
+        self.frame_out = self.create_port("Frame", is_input=False)
+
+    def _process_data(self):
+        self.update_port_data(self.frame_out, self.frame_in.data)
+
+
+def _run_chain(n_edges, n_frames):
+    source = _BenchSource(n_frames)
+    chain = [source] + [_BenchPassThrough(i) for i in range(n_edges)]
+    for upstream, downstream in zip(chain, chain[1:]):
+        downstream.frame_in.connect(upstream.frame_out)
+    compile_graph(chain)
+    for node in chain:
+        node.daemon = True
+        node.start()
+
+    t0 = time.perf_counter()
+    source.start_e.set()
+    source.finished.wait()
+    source.done_e.wait()
+    elapsed = time.perf_counter() - t0
+
+    for node in chain:
+        node._running = False
+        node.start_e.set()
+    return elapsed / n_frames
+
+
+def bench_scheduler(n_frames, n_edges=8):
+    base = _run_chain(0, n_frames)
+    chained = _run_chain(n_edges, n_frames)
+    return {
+        "edges": n_edges,
+        "source_only_us": base * 1e6,
+        "chain_us": chained * 1e6,
+        "per_edge_us": (chained - base) / n_edges * 1e6,
+    }
+
+
+# =============================================================================
+#  Offscreen texture upload
+# =============================================================================
+
+def bench_upload(resolutions, n_frames):
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    try:
+        from PySide6.QtGui import QGuiApplication, QOffscreenSurface, QOpenGLContext
+        from OpenGL import GL
+    except ImportError as e:
+        return {"skipped": f"missing dependency: {e.name}"}
+
+    app = QGuiApplication.instance() or QGuiApplication([])
+    context = QOpenGLContext()
+    surface = QOffscreenSurface()
+    surface.create()
+    if not context.create() or not context.makeCurrent(surface):
+        return {"skipped": "no OpenGL context available"}
+
+    results = {}
+    texture = GL.glGenTextures(1)
+    GL.glBindTexture(GL.GL_TEXTURE_2D, texture)
+    GL.glPixelStorei(GL.GL_UNPACK_ALIGNMENT, 1)
+    for resolution in resolutions:
+        width, height = synthetic.RESOLUTIONS[resolution]
+        frame = next(synthetic.synthetic_frames(width, height, 1)).copy()
+        GL.glTexImage2D(GL.GL_TEXTURE_2D, 0, GL.GL_RGB, width, height, 0,
+                        GL.GL_BGR, GL.GL_UNSIGNED_BYTE, frame)
+        GL.glFinish()
+        t0 = time.perf_counter()
+        for _ in range(n_frames):
+            GL.glTexSubImage2D(GL.GL_TEXTURE_2D, 0, 0, 0, width, height,
+                               GL.GL_BGR, GL.GL_UNSIGNED_BYTE, frame)
+        GL.glFinish()
+        results[resolution] = {"ms_per_upload": (time.perf_counter() - t0) / n_frames * 1e3}
+    GL.glDeleteTextures([texture])
+    context.doneCurrent()
+    del app
+    return results
+
+
+# =============================================================================
+#  Runner
+# =============================================================================
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+BENCHMARKS = ("decode", "shm", "ipc", "scheduler", "nodes", "upload")
+
+
+def run(only=BENCHMARKS, quick=False):
+    resolutions = ["480p", "1080p"] if quick else ["480p", "720p", "1080p", "2160p"]
+    codecs = ["mp4v", "mjpg"] if quick else list(synthetic.CODECS)
+    n_frames = 60 if quick else 240
+
+    results = {}
+    if "decode" in only:
+        results["decode"] = bench_decode(resolutions, codecs, n_frames)
+    if "shm" in only:
+        results["shm"] = bench_shm(resolutions, n_frames)
+    if "ipc" in only:
+        results["ipc"] = bench_ipc(2_000 if quick else 20_000)
+    if "scheduler" in only:
+        results["scheduler"] = bench_scheduler(200 if quick else 2_000)
+    if "nodes" in only:
+        results["nodes"] = bench_nodes.run(n_frames=20 if quick else 100)
+    if "upload" in only:
+        results["upload"] = bench_upload(resolutions, n_frames)
+
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "opencv": cv2.__version__,
+            "numpy": np.__version__,
+            "quick": quick,
+        },
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-o", "--output", help="JSON output path (default: benchmarks/results/<commit>.json)")
+    parser.add_argument("--only", nargs="+", choices=BENCHMARKS, default=BENCHMARKS)
+    parser.add_argument("--quick", action="store_true", help="Fewer resolutions and frames")
+    args = parser.parse_args()
+
+    report = run(args.only, args.quick)
+
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"{(report['meta']['commit'] or 'unknown')[:12]}.json")
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    json.dump(report["results"], sys.stdout, indent=2)
+    print(f"\nResults written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Synthetic test video generation, so benchmarks need no external assets.
+
+Frames combine a scrolling gradient, a moving box and mild noise, which keeps
+encoders honest (no all-static content) while staying deterministic.
+"""
+import os
+from typing import Iterator, Optional
+
+import cv2
+import numpy as np
+
+RESOLUTIONS = {
+    "480p": (854, 480),
+    "720p": (1280, 720),
+    "1080p": (1920, 1080),
+    "2160p": (3840, 2160),
+}
+
+# Codec name -> (fourcc, container extension)
+CODECS = {
+    "mp4v": ("mp4v", ".mp4"),
+    "mjpg": ("MJPG", ".avi"),
+    "xvid": ("XVID", ".avi"),
+}
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache")
+
+
+def synthetic_frames(width: int, height: int, n_frames: int, seed: int = 0) -> Iterator[np.ndarray]:
+    rng = np.random.default_rng(seed)
+    x = np.linspace(0, 255, width, dtype=np.float32)
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+    noise = rng.integers(0, 16, (height, width, 3), dtype=np.uint8)
+    frame = np.empty((height, width, 3), dtype=np.uint8)
+    box = max(8, min(width, height) // 6)
+
+    for i in range(n_frames):
+        frame[:, :, 0] = (x + 4 * i) % 256
+        frame[:, :, 1] = (y + 2 * i) % 256
+        frame[:, :, 2] = 128
+        np.add(frame, noise, out=frame, casting="unsafe")
+        bx = (i * 7) % max(1, width - box)
+        by = (i * 5) % max(1, height - box)
+        frame[by:by + box, bx:bx + box] = 255
+        yield frame
+
+
+def generate_video(path: str, width: int, height: int, n_frames: int = 120,
+                   fps: float = 30.0, codec: str = "mp4v") -> Optional[str]:
+    """Writes a synthetic video. Returns None if the codec is unavailable."""
+    fourcc, _ = CODECS[codec]
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*fourcc), fps, (width, height))
+    if not writer.isOpened():
+        return None
+    try:
+        for frame in synthetic_frames(width, height, n_frames):
+            writer.write(frame)
+    finally:
+        writer.release()
+    return path
+
+
+def cached_video(resolution: str, codec: str, n_frames: int = 120,
+                 cache_dir: str = DEFAULT_CACHE_DIR) -> Optional[str]:
+    """Returns the path of a synthetic video, generating it on first use."""
+    width, height = RESOLUTIONS[resolution]
+    _, extension = CODECS[codec]
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, f"synthetic_{resolution}_{codec}_{n_frames}{extension}")
+    if os.path.isfile(path) and os.path.getsize(path) > 0:
+        return path
+    return generate_video(path, width, height, n_frames, codec=codec)
@@ -0,0 +1,192 @@
+"""
+Loopback check of the remote backend transport.
+
+Opens a SocketChannel pair on 127.0.0.1 and checks that:
+  - every wire type survives encode()/decode(), and a message over the socket
+  - put_latest() keeps only the last pending message of a key
+  - a failing put_latest() builder doesn't stop the messages behind it
+  - JPEG, lz4 and zlib previews from the PreviewEncoder decode back to the
+    frame, with the frontend decoder when PySide6 is installed
+
+Exits with status 1 on the first failure. Codecs that can't run here
+(lz4 not installed) are skipped.
+
+Usage:
+    python -m benchmarks.transport_check
+"""
+import queue
+import sys
+import threading
+import zlib
+from typing import Tuple
+
+import cv2
+import numpy as np
+
+from flowdip import (
+    BatchPayload, ConnectPortsPayload, CreateNodePayload, DeleteNodePayload, Event, EventType,
+    FramePayload, NodeMetricsPayload, Request, RequestDonePayload, RequestType, RunNodePayload,
+    TransportCommand, UpdateNodeParamsPayload,
+)
+from flowdip.backend import remote_preview
+from flowdip.transport import WIRE_TYPES, accept, connect, decode, encode, listen
+
+TIMEOUT = 5.0
+
+# One message per wire type, nested payloads included
+SAMPLES = [
+    RequestType.CONNECT_PORTS, EventType.REQUEST_DONE, TransportCommand.STEP,
+    Request(RequestType.CREATE_NODE, CreateNodePayload("Blur", "flowdip.blur", {"shard": "auto"}), 7),
+    Request(RequestType.DELETE_NODE, DeleteNodePayload("flowdip.blur")),
+    Request(RequestType.RUN_NODE, RunNodePayload("flowdip.src", TransportCommand.STEP, 5)),
+    Request(RequestType.UPDATE_NODE_PARAMS, UpdateNodeParamsPayload(
+        "flowdip.blur", {"ksize": 5, "sigma": 1.5, "path": "é/ü", "flags": [True, None, b"\x00"]})),
+    Request(RequestType.BATCH, BatchPayload([
+        Request(RequestType.CONNECT_PORTS, ConnectPortsPayload("a", "out", "b", "in")),
+        Request(RequestType.DISCONNECT_PORTS, ConnectPortsPayload("a", "out", "b", "in")),
+    ]), 8),
+    Event(EventType.NODE_METRICS, NodeMetricsPayload({"flowdip.blur": {"fps": 29.97, "dropped": 0}}, 1.0)),
+    Event(EventType.NEW_FRAME, FramePayload("flowdip.src", "zlib", "GRAY", (2, 3), b"\x01" * 6, 42)),
+    Event(EventType.REQUEST_DONE, RequestDonePayload(8, "Node 'b' does not exist.")),
+    Event(EventType.UPDATE_NODE_STATE, (-3, 2 ** 40, -1.25, ("x", {1: "y"}))),
+]
+
+
+class CheckFailed(Exception):
+    pass
+
+
+def expect(condition: bool, message: str):
+    if not condition:
+        raise CheckFailed(message)
+
+
+def open_pair():
+    """Returns two connected SocketChannels (frontend side, backend side)."""
+    server = listen("127.0.0.1:0")
+    accepted = {}
+    thread = threading.Thread(target=lambda: accepted.update(channel=accept(server)))
+    thread.start()
+    frontend = connect(f"127.0.0.1:{server.getsockname()[1]}")
+    thread.join(TIMEOUT)
+    server.close()
+    return frontend, accepted["channel"]
+
+
+def check_wire_types(sender, receiver):
+    covered = {type(sample) for sample in SAMPLES}
+    for sample in SAMPLES:
+        payload = getattr(sample, "payload", None)
+        covered.add(type(payload))
+        if isinstance(payload, BatchPayload):
+            covered.update(type(request.payload) for request in payload.requests)
+    missing = [cls.__name__ for cls in WIRE_TYPES if cls not in covered]
+    expect(not missing, f"No sample of wire types {', '.join(missing)}")
+
+    for sample in SAMPLES:
+        expect(decode(encode(sample)) == sample, f"encode/decode changed {sample!r}")
+        sender.outgoing.put(sample)
+        received = receiver.incoming.get(timeout=TIMEOUT)
+        expect(received == sample, f"Sent {sample!r}, received {received!r}")
+    print(f"ok   {len(SAMPLES)} messages, {len(WIRE_TYPES)} wire types")
+
+
+def check_coalescing(sender, receiver):
+    outbox = sender.outgoing
+    outbox.take_stats()
+    with outbox._cond:  # Holds the sender thread back while the keys pile up
+        for index in range(5):
+            outbox.put_latest("preview", lambda index=index: index)
+        outbox.put_latest("other", lambda: "other")
+    received = [receiver.incoming.get(timeout=TIMEOUT) for _ in range(2)]
+    expect(received == [4, "other"], f"Coalesced messages received as {received}")
+    coalesced = outbox.take_stats()["coalesced"]
+    expect(coalesced == 4, f"{coalesced} messages counted as coalesced, expected 4")
+
+    # Keys are built oldest first: "after" only arrives if the sender survived
+    with outbox._cond:
+        outbox.put_latest("failing", lambda: 1 / 0)
+        outbox.put_latest("preview", lambda: "after")
+    received = receiver.incoming.get(timeout=TIMEOUT)
+    expect(received == "after", f"Received {received!r} after a failing builder")
+    print("ok   put_latest coalescing")
+
+
+def reference_decode(payload: FramePayload) -> Tuple[np.ndarray, str]:
+    """Like remote_frames.decode_frame, for frontends without PySide6."""
+    if payload.codec == "jpeg":
+        frame = cv2.imdecode(np.frombuffer(payload.data, np.uint8), cv2.IMREAD_UNCHANGED)
+        if frame.ndim == 2:
+            return frame, "GRAY"
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2RGB), "RGB"
+    if payload.codec == "lz4":
+        raw = remote_preview.lz4_frame.decompress(payload.data)
+    else:
+        raw = zlib.decompress(payload.data)
+    return np.frombuffer(raw, np.uint8).reshape(payload.shape), payload.pixfmt
+
+
+def check_previews(sender, receiver):
+    try:
+        from flowdip.frontend.remote_frames import decode_frame
+    except ImportError as e:
+        print(f"SKIP frontend preview decoder, checking with OpenCV: {e}")
+        decode_frame = reference_decode
+
+    # Smooth gradients: JPEG artifacts stay well below the tolerance
+    y, x = np.mgrid[0:240, 0:400]
+    color = np.dstack([x * 255 // 400, y * 255 // 240, (x + y) * 255 // 640]).astype(np.uint8)
+    frames = {"BGR": color, "GRAY": np.ascontiguousarray(color[:, :, 1])}
+
+    for codec in remote_preview.CODECS:
+        if codec == "lz4" and remote_preview.lz4_frame is None:
+            print("SKIP lz4 previews: lz4 is not installed")
+            continue
+        encoder = remote_preview.PreviewEncoder(sender.outgoing, codec=codec, max_width=200)
+        for pixfmt, frame in frames.items():
+            encoder.publish("flowdip.src", frame)
+            event = receiver.incoming.get(timeout=TIMEOUT)
+            payload = event.payload
+            expect(event.event_type == EventType.NEW_FRAME and payload.codec == codec,
+                   f"{codec} {pixfmt} preview received as {event!r}")
+
+            # Previews are downscaled to max_width, color frames come out as RGB
+            expected = cv2.resize(frame, (200, 120), interpolation=cv2.INTER_AREA)
+            if expected.ndim == 3:
+                expected = cv2.cvtColor(expected, cv2.COLOR_BGR2RGB)
+            decoded, decoded_pixfmt = decode_frame(payload)
+            if decoded_pixfmt == "BGR":
+                decoded = decoded[:, :, ::-1]
+            expect(decoded.shape == expected.shape,
+                   f"{codec} {pixfmt} preview decoded to {decoded.shape}, expected {expected.shape}")
+            error = np.abs(decoded.astype(np.int16) - expected).max()
+            tolerance = 16 if codec == "jpeg" else 0
+            expect(error <= tolerance, f"{codec} {pixfmt} preview differs by {error} (max {tolerance})")
+        print(f"ok   {codec} previews")
+
+
+def check() -> bool:
+    frontend, backend = open_pair()
+    try:
+        check_wire_types(frontend, backend)
+        check_wire_types(backend, frontend)
+        check_coalescing(backend, frontend)
+        check_previews(backend, frontend)
+    except CheckFailed as e:
+        print(f"FAIL {e}")
+        return False
+    except queue.Empty:
+        print(f"FAIL no message received within {TIMEOUT:.0f} s")
+        return False
+    finally:
+        frontend.close()
+        backend.close()
+    return True
+
+
+def main():
+    sys.exit(0 if check() else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,6 @@
 from enum import IntEnum
-import logging
 from dataclasses import dataclass
-from typing import Any
+from typing import Any, List, Optional
 
 # =============================================================================
 #  Enums and data structures
@@ -14,6 +13,9 @@ class RequestType(IntEnum):
     DELETE_NODE = 2
     RUN_NODE = 3
     UPDATE_NODE_PARAMS = 4
+    CONNECT_PORTS = 5
+    DISCONNECT_PORTS = 6
+    BATCH = 7
 
 class EventType(IntEnum):
     SHUTDOWN = -1
@@ -21,11 +23,20 @@ class EventType(IntEnum):
     UPDATE_PORT_STATE = 1
     NEW_FRAME = 2
     UPDATE_NODE_PARAMS = 3
+    NODE_METRICS = 4
+    REQUEST_DONE = 5
+
+class TransportCommand(IntEnum):
+    PLAY = 0
+    PAUSE = 1
+    STOP = 2   # Pause and rewind to the first frame
+    STEP = 3   # Run a number of frames through the whole graph, then pause
 
 @dataclass
 class Request:
     request_type: RequestType
     payload: Any
+    request_id: int = 0  # Correlation id: when set, the backend answers with a REQUEST_DONE event
 
 @dataclass
 class Event:
@@ -34,7 +45,7 @@ class Event:
 
 @dataclass
 class CreateNodePayload:
-    node_class_name: str
+    node_type: str  # Name of the node in flowdip.registry
     flowdip_name: str
     other_params: dict = None
 
@@ -42,24 +53,51 @@ class CreateNodePayload:
 class DeleteNodePayload:
     flowdip_name: str
 
+@dataclass
+class RunNodePayload:
+    flowdip_name: str
+    command: TransportCommand
+    frames: int = 1  # STEP only
+
 @dataclass
 class UpdateNodeParamsPayload:
     flowdip_name: str
     new_params: dict
 
+@dataclass
+class ConnectPortsPayload:
+    output_flowdip_name: str
+    output_port_name: str
+    input_flowdip_name: str
+    input_port_name: str
+
+@dataclass
+class BatchPayload:
+    requests: List[Request]  # CREATE_NODE, UPDATE_NODE_PARAMS, (DIS)CONNECT_PORTS
+
+@dataclass
+class NodeMetricsPayload:
+    metrics: dict  # flowdip_name -> metrics summary (see backend/metrics.py)
+    interval: float
+
+@dataclass
+class RequestDonePayload:
+    """Answer to a request with a request_id, once the backend applied it."""
+    request_id: int
+    error: Optional[str] = None  # Why the request failed, None on success
+
+@dataclass
+class FramePayload:
+    """Preview frame sent to a remote frontend (NEW_FRAME events)."""
+    flowdip_name: str
+    codec: str     # "jpeg", "lz4" or "zlib", see backend/remote_preview.py
+    pixfmt: str    # Pixel format of the decoded frame
+    shape: tuple   # Shape of the decoded frame
+    data: bytes
+    seq: int = 0
+
 # =============================================================================
 # Helper: logger factory
 # =============================================================================
-def get_logger(name: str) -> logging.Logger:
-    """Return a logger with the given name, configured if not already."""
-    logger = logging.getLogger(name)
-    if not logger.handlers:
-        logger.setLevel(logging.DEBUG)
-        ch = logging.StreamHandler()
-        ch.setLevel(logging.DEBUG)
-        formatter = logging.Formatter(
-            "[%(asctime)s] [%(name)s] [%(levelname)s] %(message)s"
-        )
-        ch.setFormatter(formatter)
-        logger.addHandler(ch)
-    return logger
+# Queued, rate limited loggers with per-logger levels, see flowdip/logs.py
+from flowdip.logs import get_logger  # noqa: E402
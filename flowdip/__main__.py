@@ -1,24 +1,96 @@
 # -*- coding: utf-8 -*-
 """
 FlowDip — Node Graph editor using PySide6 + NodeGraphQt.
+
+The launcher only imports the standard library: each process imports its own
+side on start, so the backend never loads Qt/OpenGL and the frontend never
+loads OpenCV.
+
+    python -m flowdip                          # Frontend and backend on this machine
+    python -m flowdip --listen 0.0.0.0:7878    # Backend only, serving remote frontends
+    python -m flowdip --connect renderbox:7878 # Frontend only, using a remote backend
 """
+import argparse
 from multiprocessing import Process, Queue
 
-from flowdip.backend.main_backend import main as main_backend
-from flowdip.frontend.main_frontend import main as main_frontend
 
-if __name__ == "__main__":
+def run_backend(request_queue, response_queue):
+    from flowdip import logs
+    from flowdip.backend.main_backend import main
+    try:
+        main(request_queue, response_queue)
+    finally:
+        logs.flush()  # The process ends with os._exit
+
 
+def run_frontend(request_queue, response_queue):
+    from flowdip import logs
+    from flowdip.frontend.main_frontend import main
+    try:
+        main(request_queue, response_queue)
+    finally:
+        logs.flush()
+
+
+def run_local():
     request_queue = Queue()
     response_queue = Queue()
 
-    backend_process = Process(target=main_backend, args=(request_queue, response_queue), daemon=True)
+    # Not a daemon: the backend may start its own worker processes (GOP decoding)
+    backend_process = Process(target=run_backend, args=(request_queue, response_queue), daemon=False)
     backend_process.start()
 
-    frontend_process = Process(target=main_frontend, args=(request_queue, response_queue), daemon=False)
+    frontend_process = Process(target=run_frontend, args=(request_queue, response_queue), daemon=False)
     frontend_process.start()
 
-    # Join processes
+    # Join processes. The frontend asks the backend to shut down on exit;
+    # if it crashed, the backend is terminated instead
     frontend_process.join()
-    backend_process.join()
+    backend_process.join(timeout=5.0)
+    if backend_process.is_alive():
+        backend_process.terminate()
+        backend_process.join()
+
+
+def run_server(address, preview_codec, preview_bandwidth):
+    from flowdip.backend.main_backend import serve
+    serve(address, preview_codec, preview_bandwidth)
+
+
+def run_remote_frontend(address):
+    from flowdip import Event, EventType
+    from flowdip.transport import connect
+
+    # If the backend goes away, the frontend manager stops
+    channel = connect(address, eof_message=Event(event_type=EventType.SHUTDOWN, payload=None))
+    try:
+        run_frontend(channel.outgoing, channel.incoming)
+        channel.flush()  # Deliver the shutdown request
+    finally:
+        channel.close()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="flowdip", description="Node-based multimedia processing.")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--listen", metavar="[HOST:]PORT",
+                      help="run only the backend and serve remote frontends (no authentication: "
+                           "trusted networks only)")
+    mode.add_argument("--connect", metavar="HOST[:PORT]",
+                      help="run only the frontend, using the backend served at this address")
+    parser.add_argument("--preview-codec", choices=("jpeg", "lz4", "zlib"), default="jpeg",
+                        help="compression of the previews sent to remote frontends (default: jpeg)")
+    parser.add_argument("--preview-bandwidth", type=float, default=0.0, metavar="MBPS",
+                        help="bandwidth cap of the remote previews in Mbit/s (default: adapt to the link only)")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
 
+    args = parse_args()
+    if args.listen:
+        run_server(args.listen, args.preview_codec, args.preview_bandwidth * 1e6 / 8)
+    elif args.connect:
+        run_remote_frontend(args.connect)
+    else:
+        run_local()
@@ -0,0 +1,61 @@
+import sys
+from typing import List, Tuple
+
+import numpy as np
+
+# =============================================================================
+#  Output buffer pool
+# =============================================================================
+
+
+def _references(ring: List[np.ndarray], index: int) -> int:
+    return sys.getrefcount(ring[index])
+
+
+# References to a buffer only held by its ring, as counted by _references
+_FREE_REFERENCES = _references([np.empty(0)], 0)
+
+
+class BufferPool:
+    """Preallocated output buffers for frame processing nodes.
+
+    Buffers are handed out round-robin from a ring of at least `depth`
+    arrays. A buffer still referenced outside the ring (by the input ports
+    it was published to, a consumer still reading it, a view of its ROI...)
+    is skipped, and the ring grows when none is free, so a slow consumer
+    never sees its frame rewritten. At steady state (same shape and dtype
+    every frame) no memory is allocated.
+    """
+
+    def __init__(self, depth: int = 3):
+        self.depth = depth
+        self._key: Tuple = ()
+        self._ring: List[np.ndarray] = []
+        self._next = 0
+
+    def acquire(self, shape: Tuple[int, ...], dtype) -> np.ndarray:
+        """Returns the next free buffer of the ring for the given format."""
+        key = (shape, dtype)
+        if key != self._key:
+            # Format changed: the old buffers are released
+            self._key = key
+            self._ring = [np.empty(shape, dtype=dtype) for _ in range(self.depth)]
+            self._next = 0
+
+        ring = self._ring
+        for _ in range(len(ring)):
+            index = self._next
+            self._next = (index + 1) % len(ring)
+            if _references(ring, index) <= _FREE_REFERENCES:
+                return ring[index]
+
+        # Every buffer is still being read downstream
+        ring.insert(self._next, np.empty(shape, dtype=dtype))
+        buffer = ring[self._next]
+        self._next = (self._next + 1) % len(ring)
+        return buffer
+
+    def clear(self):
+        self._key = ()
+        self._ring = []
+        self._next = 0
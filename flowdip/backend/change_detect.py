@@ -0,0 +1,51 @@
+from typing import Optional
+
+import cv2
+import numpy as np
+
+# =============================================================================
+#  Static frame detection
+# =============================================================================
+#
+#  Sources with a change threshold compare each frame with the last frame they
+#  published, on a strided thumbnail (no resampling, about THUMBNAIL_SIZE
+#  pixels). Frames whose mean absolute difference stays below the threshold
+#  are not published: the inputs downstream keep the previous frame and are
+#  not marked fresh, so the nodes below skip _process_data and their outputs
+#  keep the results of that frame (see BackEndFlowDiPNode.process_data).
+#
+#  The reference is the last published frame, not the previous one, so slow
+#  drifts (lighting) accumulate until they cross the threshold.
+# =============================================================================
+
+THUMBNAIL_SIZE = (64, 36)  # (width, height)
+
+
+class ChangeDetector:
+    """Tells whether a frame differs from the last changed one by more than
+    `threshold` gray levels on average."""
+
+    def __init__(self, threshold: float, size=THUMBNAIL_SIZE):
+        self.threshold = threshold
+        self.size = size
+        self._reference: Optional[np.ndarray] = None
+
+    def thumbnail(self, frame: np.ndarray) -> np.ndarray:
+        height, width = frame.shape[:2]
+        step_y = max(1, height // self.size[1])
+        step_x = max(1, width // self.size[0])
+        return np.ascontiguousarray(frame[::step_y, ::step_x])
+
+    def changed(self, frame: np.ndarray) -> bool:
+        thumbnail = self.thumbnail(frame)
+        reference = self._reference
+        if (reference is None or reference.shape != thumbnail.shape
+                or reference.dtype != thumbnail.dtype
+                or float(np.mean(cv2.absdiff(thumbnail, reference))) > self.threshold):
+            self._reference = thumbnail
+            return True
+        return False
+
+    def reset(self):
+        """The next frame is reported as changed."""
+        self._reference = None
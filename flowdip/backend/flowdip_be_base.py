@@ -1,8 +1,13 @@
 
-from typing import Any, List, Optional
+from typing import Any, List, Optional, Tuple
 from enum import IntEnum, Enum
-from threading import Thread, Event
+from dataclasses import dataclass
+from threading import Thread, Event, current_thread
 import time
+
+from flowdip import TransportCommand, get_logger, tracing
+from flowdip.backend.metrics import NodeMetrics
+from flowdip.backend.quality import FULL_QUALITY
 # =============================================================================
 #  Enums and data structures
 # =============================================================================
@@ -32,7 +37,55 @@ class NodeState(IntEnum):
 class ConnectionState(IntEnum):
     CONNECTED_OK = 1
     INCOMPATIBLE_CONNECTION = 0
-    DISCONNECTED = 1
+    DISCONNECTED = 2
+
+
+@dataclass(frozen=True)
+class NodeSchedule:
+    """Execution data of a node, frozen by the graph compiler."""
+    dependencies: Tuple["Input", ...] = ()  # Critical inputs, filled before running
+    successors: Tuple[Any, ...] = ()        # Nodes triggered after running
+    blocked: bool = False                   # A critical input is missing or incompatible
+
+
+EMPTY_SCHEDULE = NodeSchedule()
+
+# Valid rectangle of a frame: (x, y, width, height). Pixels outside are not
+# meaningful, nodes that accept ROIs only process the rectangle.
+Roi = Tuple[int, int, int, int]
+
+
+def clip_roi(roi: Optional[Roi], shape: tuple) -> Optional[Roi]:
+    """Clips a ROI to a frame shape. None if it covers the whole frame.
+    Empty intersections keep one pixel."""
+    if roi is None:
+        return None
+    height, width = shape[:2]
+    x, y, w, h = roi
+    x0, y0 = min(max(x, 0), width - 1), min(max(y, 0), height - 1)
+    x1, y1 = min(max(x + w, x0 + 1), width), min(max(y + h, y0 + 1), height)
+    if (x0, y0, x1, y1) == (0, 0, width, height):
+        return None
+    return x0, y0, x1 - x0, y1 - y0
+
+
+def parse_roi(value: Any) -> Optional[Roi]:
+    """Parses a ROI parameter, "x,y,width,height". Empty values clear it."""
+    if value is None or (isinstance(value, str) and not value.strip()):
+        return None
+    parts = value.split(",") if isinstance(value, str) else list(value)
+    if len(parts) != 4:
+        raise ValueError(f"Invalid ROI {value!r}, expected 'x,y,width,height'.")
+    x, y, w, h = (int(part) for part in parts)
+    if w <= 0 or h <= 0:
+        raise ValueError(f"Invalid ROI {value!r}, width and height must be positive.")
+    return x, y, w, h
+
+
+def roi_slices(roi: Roi) -> Tuple[slice, slice]:
+    x, y, w, h = roi
+    return slice(y, y + h), slice(x, x + w)
+
 
 # =============================================================================
 #  Input/Output classes
@@ -42,29 +95,55 @@ class ConnectionState(IntEnum):
 class Port:
     """Base class for FlowDiP ports (Input/Output)."""
 
-    def __init__(self, datatypes: Optional[List[type]] = None):
+    def __init__(self, name: str = "", datatypes: Optional[List[str]] = None):
+        self.name = name
+        self.node: Optional["BackEndFlowDiPNode"] = None  # Owner node
         self.tooltip: Optional[str] = None
         self.connection_state = ConnectionState.DISCONNECTED
-        self.datatypes: List[type] = datatypes if datatypes is not None else []
+        self.datatypes: List[str] = datatypes if datatypes is not None else []  # Empty accepts any
 
 # --- Subclase Input ---
 class Input(Port):
     """Represents a FlowDiP input port."""
 
-    def __init__(self, name: str, critical: bool = False, datatype: Optional[type] = None):
-        super().__init__(datatype=datatype)
-        self.name = name
+    def __init__(self, name: str, critical: bool = False, datatypes: Optional[List[str]] = None):
+        super().__init__(name=name, datatypes=datatypes)
         self.output: Optional[Output] = None
+        self.data = None
         self.critical = critical
         self.state = InputState.UNKNOWN
+        self.colorspaces: tuple = ()  # Accepted colorspaces, empty accepts any
+        self.conversion = None  # FormatConversion inserted by the graph compiler
+        self.scale = 1.0  # Downscale set by the quality controller
+        self.transform = None  # Applied by the producer, see pixel_formats.install_transform
+        self.fresh = False  # Data written since the node last processed it, see process_data
+        self.roi: Optional[Roi] = None  # Valid rectangle of data, only set for nodes that accept ROIs
+
+    def connect(self, output: "Output"):
+        """Connects this input to an output, replacing any previous link."""
+        self.disconnect()
+        self.output = output
+        output.inputs.append(self)
+
+    def disconnect(self):
+        """Removes the link with the current output, if any."""
+        if self.output is not None and self in self.output.inputs:
+            self.output.inputs.remove(self)
+        self.output = None
+        self.data = None
+        self.fresh = False
+        self.roi = None
 
     def check_connection(self) -> ConnectionState:
-        """Validates the connection state with its output."""
+        """Validates the datatypes of the link with its output. Only called
+        when the graph is compiled (see graph_compiler.py)."""
         if not self.output:
             return ConnectionState.DISCONNECTED
 
-        if not set(self.output.datatypes) & set(self.datatypes):
-            return ConnectionState.INCOMPATIBLE_CONNECTION
+        # Untyped ports accept any data
+        if self.datatypes and self.output.datatypes:
+            if not set(self.output.datatypes) & set(self.datatypes):
+                return ConnectionState.INCOMPATIBLE_CONNECTION
 
         return ConnectionState.CONNECTED_OK
 
@@ -73,14 +152,21 @@ class Input(Port):
 class Output(Port):
     """Represents a FlowDiP output port."""
 
-    def __init__(self, datatypes: Optional[List[type]] = None):
-        super().__init__(datatypes=datatypes)
+    def __init__(self, name: str = "", datatypes: Optional[List[str]] = None):
+        super().__init__(name=name, datatypes=datatypes)
         self.data = None
-        self.input: Optional[Input] = None
+        self.inputs: List[Input] = []
+        self.targets: tuple = ()  # Validly linked inputs, frozen by the graph compiler
+        self.formats: tuple = ()  # Pixel formats the node can produce here, default first
+        self.pixel_format: Optional[str] = None  # Negotiated among formats by the graph compiler
+        self.roi: Optional[Roi] = None  # Valid rectangle of data, None for the whole frame
 
 class BackEndFlowDiPNode(Thread):
     """Backend node with execution logic in a separate thread."""
     _loop: bool = False  # If true, node runs in a continuous loop
+    _degradable: bool = True  # If false, the quality controller never skips or downscales its frames
+    _cacheable: bool = True  # If false, the node also runs on unchanged inputs (see change_detect.py)
+    _roi_capable: bool = False  # If true, inputs receive whole frames and their ROI (see update_port_data)
 
     def __init__(self, flowdip_name: Optional[str] = None, be_manager: Any = None):
         super().__init__()
@@ -90,91 +176,238 @@ class BackEndFlowDiPNode(Thread):
         self.done_e = Event()
         self._running = True
         self._sync = False # If true, waits for dependant nodes to finish before proceeding
+        self._steps = 0  # Frames left to run in a transport STEP (loop nodes)
         self.dip_inputs: List[Input] = []
         self.dip_outputs: List[Output] = []
         self.state: NodeState = NodeState.IDLE
+        self.logger = get_logger(flowdip_name or self.__class__.__name__)
+        self.metrics = NodeMetrics()  # Swapped by the metrics publisher
+        self.schedule = EMPTY_SCHEDULE  # Installed by the graph compiler
+        self.quality = FULL_QUALITY  # Installed by the quality controller
+        self._quality_frames = 0
+        self._cache_valid = False  # Outputs hold the results of the current inputs
 
     # -------------------------------------------------------------------------
     def run(self):
         """Main execution loop."""
         while self._running:
-            if self._loop is True:
-                self.start_e.wait()
-                # Loop nodes don't clear their start event,
-                # they run in a constant loop. Only user
-                # action can clear and set the event, essentially
-                # pausing and resuming the loop.
-            else:
-                self.start_e.wait()
-                self.start_e.clear()
-
-            self.process_data()
+            self.wait_start()
+            if not self._running:
+                break  # Woken up by stop()
+
+            with tracing.span("process_data", self.flowdip_name):
+                self.process_data()
+            if self._steps:
+                self._steps -= 1
+                if self._steps == 0 or not self.start_e.is_set():
+                    self._steps = 0
+                    self.start_e.clear()  # Step done (or source ended)
             self.done_e.set()
 
-    # -------------------------------------------------------------------------
-    def process_data(self):
-        """Executes the dependency flow and the main node function."""
+    def wait_start(self):
+        """Blocks until the next execution. Nodes that also run on timers
+        override it: every execution goes through run()."""
+        if self._loop is True:
+            self.start_e.wait()
+            # Loop nodes don't clear their start event,
+            # they run in a constant loop. Only user
+            # action can clear and set the event, essentially
+            # pausing and resuming the loop.
+        else:
+            self.start_e.wait()
+            self.start_e.clear()
+
+    def stop(self, timeout: float = 2.0):
+        """Stops the node thread and releases its resources. The node must
+        already be unlinked from the execution plan."""
+        self._running = False
+        self.start_e.set()  # Wake up the run loop
+        self.done_e.set()   # Release nodes waiting for this one
+        if self.is_alive() and self is not current_thread():
+            self.join(timeout)
+            if self.is_alive():
+                self.logger.warning(f"Node thread did not stop within {timeout} s")
+        self.release()
+
+    def transport(self, command: TransportCommand, frames: int = 1):
+        """Play/pause/stop/step control of loop nodes. A paused node blocks
+        on its start event and uses no CPU."""
+        if not self._loop:
+            self.logger.warning(f"Node does not support transport commands ({command.name})")
+            return
+
+        if command == TransportCommand.PLAY:
+            self._steps = 0
+            self.start_e.set()
+        elif command == TransportCommand.PAUSE:
+            self._steps = 0
+            self.start_e.clear()
+        elif command == TransportCommand.STOP:
+            self._steps = 0
+            self.start_e.clear()
+            self.rewind()
+        elif command == TransportCommand.STEP:
+            self.start_e.clear()
+            self._steps = max(1, frames)
+            self.start_e.set()
+
+    def rewind(self):
+        """Goes back to the first frame. To be overridden by loop nodes."""
+        pass
 
-        # Validate inputs -----------------------------------------------------
+    def invalidate(self):
+        """Makes the next execution run even if no input changed, after
+        its parameters or the execution plan changed."""
+        self._cache_valid = False
 
-        # Check and update connection states
-        for input_port in self.dip_inputs:
-            cs = input_port.check_connection()
-            if input_port.connection_state != cs:
-                input_port.connection_state = cs
-                self.update_port_state(cs)
+    def release(self):
+        """Releases external resources (captures, files, shared memory).
+        To be overridden by subclasses that own any."""
+        pass
 
-        # Make sure all critical inputs are connected and have data
-        for input_port in self.dip_inputs:
-            if input_port.critical:
-                if input_port.output and input_port.connection_state == ConnectionState.CONNECTED_OK:
-                        # Execute to fulfill dependency
-                        if (input_port.data is None):
-                            # If no data, run dependency and wait
-                            self.update_state(NodeState.WAITING)
-                            input_port.output.node.done_e.clear()
-                            input_port.output.node.start_e.set()
-                            input_port.output.node.done_e.wait()
-                else:
-                        self.update_state(NodeState.MISSING_CRITICAL_INPUT)
-                        return
+    # -------------------------------------------------------------------------
+    def process_data(self):
+        """Executes the dependency flow and the main node function."""
+        # Counters are updated through self.metrics every time: the publisher
+        # swaps it meanwhile, a local reference would lose the updates
+        if self.dip_inputs:
+            self.metrics.frames_in += 1
+
+        skip_every = self.quality.skip_every
+        if skip_every:
+            self._quality_frames += 1
+            if self._quality_frames % skip_every == 0:
+                self.metrics.skipped += 1  # Degraded: the branch below doesn't run either
+                # Nothing else to do before returning: sources and other loop
+                # nodes are always at FULL_QUALITY (QualityController.apply),
+                # so a skipping node has no frame pacing (wait) to keep, and
+                # run() still sets done_e for the nodes waiting on this one
+                return
+
+        # Links are validated when the graph is compiled
+        schedule = self.schedule
+        if schedule.blocked:
+            self.update_state(NodeState.MISSING_CRITICAL_INPUT)
+            return
+
+        if self._cache_valid and not self.inputs_changed():
+            # Static frame: the outputs still hold the results of these inputs
+            self.metrics.unchanged += 1
+            self.trigger_successors(schedule.successors if self.propagates() else ())
+            self.wait()
+            return
+
+        # Make sure all critical inputs have data
+        for input_port in schedule.dependencies:
+            if input_port.data is None:
+                # If no data, run dependency and wait
+                upstream = input_port.output.node
+                self.update_state(NodeState.WAITING)
+                t0 = time.perf_counter_ns()
+                with tracing.span("wait_dependency", upstream.flowdip_name):
+                    upstream.done_e.clear()
+                    upstream.start_e.set()
+                    upstream.done_e.wait()
+                self.metrics.wait.add(time.perf_counter_ns() - t0)
 
         # Run main task
         self.update_state(NodeState.RUNNING)
+        t0, c0 = time.perf_counter_ns(), time.thread_time_ns()
+        self._cache_valid = False
+        for input_port in self.dip_inputs:
+            input_port.fresh = False  # Before reading: a frame written meanwhile stays fresh
         try:
-            self._process_data()
+            with tracing.span("_process_data", self.flowdip_name):
+                self._process_data()
+            self._cache_valid = self._cacheable
         except Exception as e:
-            print(f"Error in node '{self.flowdip_name}': {e}")
+            self.logger.error("Processing failed: %s", e)  # Rate limited when it fails every frame
             self.update_state(NodeState.INTERNAL_ERROR)
+        self.metrics.wall.add(time.perf_counter_ns() - t0)
+        self.metrics.cpu.add(time.thread_time_ns() - c0)
 
         # Propagate execution toward output nodes ----------------------------
 
-        # Once processing is done, trigger all output nodes to process
-        for output_port in self.dip_outputs:
-            output_port.node.done_e.clear()
-            output_port.node.start_e.set()
-
-        # If sync is active. Wait for outputs to finish
-        if self._sync:
-            self.update_state(NodeState.WAITING)
-            for output_port in self.dip_outputs:
-                output_port.node.done_e.wait()
+        successors = schedule.successors if self.propagates() else ()
+        self.trigger_successors(successors)
 
         # If needed, wait to sync with framerate
         self.wait()
 
         self.update_state(NodeState.IDLE)
 
+    def trigger_successors(self, successors):
+        """Triggers the nodes fed by this one."""
+        for node in successors:
+            if node.start_e.is_set():
+                # The previous frame was never picked up
+                node.metrics.dropped += 1
+            node.done_e.clear()
+            node.start_e.set()
+
+        # If sync is active (always while stepping). Wait for outputs to finish
+        if (self._sync or self._steps) and successors:
+            self.update_state(NodeState.WAITING)
+            with tracing.span("wait_downstream"):
+                for node in successors:
+                    node.done_e.wait()
+
+    def inputs_changed(self) -> bool:
+        """Whether a linked input received data since the last execution.
+        Nodes without linked inputs (sources) always run."""
+        linked = False
+        for input_port in self.dip_inputs:
+            if input_port.output is not None:
+                if input_port.fresh:
+                    return True
+                linked = True
+        return not linked
+
+
+    def downstream_outputs(self) -> List[Output]:
+        """Outputs whose connected nodes run after this one. Nodes that
+        execute others in their own thread (e.g. fused chains) override it.
+        Read when the graph is compiled."""
+        return self.dip_outputs
+
+    def propagates(self) -> bool:
+        """Whether the last execution should trigger the successors."""
+        return True
+
+    def output_colorspace(self, output_port: Output, input_colorspace: Optional[str]) -> Optional[str]:
+        """Colorspace of the frames of an output ("BGR", "GRAY"...), None if
+        unknown. Nodes keep the colorspace of their input by default."""
+        return input_colorspace
 
     def wait(self):
         """Video loop nodes may need to wait for a certain amount of time
         after processing to maintain a target framerate."""
         pass # To be overridden by subclasses if needed
 
-    def update_port_data(output_port: Output, data: Any):
-        """Updates the data of an output port."""
+    def update_port_data(self, output_port: Output, data: Any, roi: Optional[Roi] = None):
+        """Updates the data of an output port and its connected inputs.
+        With a ROI, nodes that accept ROIs get the whole frame and the ROI,
+        the others a view of the ROI (link transforms only process it)."""
+        self.metrics.frames_out += 1
         output_port.data = data
-        output_port.input.data = data
+        output_port.roi = roi
+        cropped = data if roi is None or data is None else data[roi_slices(roi)]
+        last_transform = transformed = None
+        for input_port in output_port.targets:
+            transform = input_port.transform
+            if transform is None or data is None:
+                if roi is not None and input_port.node._roi_capable:
+                    input_port.data, input_port.roi = data, roi
+                else:
+                    input_port.data, input_port.roi = cropped, None
+            else:
+                # Targets are sorted by transform: each one runs once
+                if transform is not last_transform:
+                    with tracing.span("link_transform"):
+                        transformed = transform(cropped)
+                    last_transform = transform
+                input_port.data, input_port.roi = transformed, None
+            input_port.fresh = True
 
     # -------------------------------------------------------------------------
     def update_port_state(self, connection_state: ConnectionState):
@@ -186,21 +419,29 @@ class BackEndFlowDiPNode(Thread):
         pass
 
     # -------------------------------------------------------------------------
-    def create_port(self, flowdip_name: str, is_input: bool = True, critical: bool = False) -> Port:
-        """Creates an input or output port with FlowDiP metadata."""
-        port = self.add_input(flowdip_name) if is_input else self.add_output(flowdip_name)
-
+    def create_port(self, flowdip_name: str, is_input: bool = True, critical: bool = False,
+                    datatypes: Optional[List[str]] = None) -> Port:
+        """Creates an input or output port with FlowDiP metadata.
+        Port names must match the ones declared by the frontend node."""
         if is_input:
-            input_port = Input(flowdip_name, critical)
-            input_port.port = port
+            input_port = Input(flowdip_name, critical, datatypes=datatypes)
+            input_port.node = self
             self.dip_inputs.append(input_port)
             return input_port
         else:
-            output_port = Output()
-            output_port.port = port
+            output_port = Output(flowdip_name, datatypes=datatypes)
+            output_port.node = self
             self.dip_outputs.append(output_port)
             return output_port
 
+    def get_port(self, flowdip_name: str, is_input: bool = True) -> Optional[Port]:
+        """Returns the input or output port with the given name, if any."""
+        ports = self.dip_inputs if is_input else self.dip_outputs
+        for port in ports:
+            if port.name == flowdip_name:
+                return port
+        return None
+
     # -------------------------------------------------------------------------
     def _process_data(self):
         """Method to be overridden by subclasses."""
@@ -1,15 +1,27 @@
 import time
 import cv2
 import numpy as np
-from multiprocessing.shared_memory import SharedMemory
 
-from flowdip import Event, EventType, UpdateNodeParamsPayload
-from flowdip.backend.flowdip_be_base import BackEndFlowDiPNode
+from flowdip import Event, EventType, UpdateNodeParamsPayload, tracing
+from flowdip.shm_frames import FrameSegment, segment_capacity
+from flowdip.backend.flowdip_be_base import BackEndFlowDiPNode, InferencedTask, clip_roi, parse_roi, roi_slices
+from flowdip.backend.raw_frames import RawFrameReader, RawFrameWriter
+from flowdip.backend.image_sequence import ImageSequenceReader
+from flowdip.backend.change_detect import ChangeDetector
+from flowdip.backend.buffer_pool import BufferPool
+from flowdip.backend.fusion import compose_lut, run_fused
+from flowdip.backend.tiling import TileScratch, run_tiled, should_tile
+from flowdip.backend.inference import InferenceModel, LetterboxBatch, concatenate_results, postprocess
+from flowdip.backend.pixel_formats import COLOR_CONVERSIONS, configure_decode_format, frame_size, reread_bgr
 import os
 
 class BackMediaPlayer(BackEndFlowDiPNode):
 
     _loop = True
+    # Formats the decoder can produce, negotiated by the graph compiler. GRAY
+    # is the decoder's Y plane when the codec is planar YUV (limited range
+    # luma, no YUV->BGR conversion), converted from BGR otherwise.
+    decode_formats = ("BGR", "GRAY")
 
     def __init__(self, flowdip_name, be_manager=None):
         super().__init__(flowdip_name=flowdip_name, be_manager=be_manager)
@@ -18,63 +30,201 @@ class BackMediaPlayer(BackEndFlowDiPNode):
         self.cap =  None
         self.shm = None
         self.frame_shape = None
-        self.frame_size = None
         self.frame_dtype = None
 
         self.frametime = 0
         self.last_frame_ts = time.time()
+        self._rewind_pending = False  # Applied by the node thread
+        self.decode_format = None  # Format the source is currently producing
+        self.decode_size = None  # (height, width) of the decoded frames
+        self.offline = False  # Run as fast as the graph allows, not at the file framerate
+        self.decode_workers = 0  # GOP-parallel decoder processes (see gop_decoder.py), 0 decodes in this thread
+        self.gop = None
+        self.detector = None  # Static frames are not published (see change_detect.py)
+        self.roi = None  # Valid rectangle of the published frames, also bounds the preview
+
+        self.frame_out = self.create_port("Frame", is_input=False, datatypes=["Frame"])
+        self.frame_out.formats = self.decode_formats
+
+    def output_colorspace(self, output_port, input_colorspace):
+        if output_port.pixel_format is not None:
+            return output_port.pixel_format
+        if self.frame_shape is None:
+            return None  # Known once the source is opened
+        return "GRAY" if len(self.frame_shape) == 2 or self.frame_shape[2] == 1 else "BGR"
 
     def open_video_cap_from_file(self, videopath):
 
         if not videopath:
             raise ValueError("videopath is not set. Please set a valid videopath before updating.")
 
-        if not os.path.isfile(videopath):
-            raise ValueError(f"Failed to open video file at '{self.videopath}'. Please check the file and try again.")
+        if not os.path.exists(videopath):
+            raise ValueError(f"Failed to open video file at '{videopath}'. Please check the file and try again.")
+
+        frame = self.open_source(videopath)
+        self.videopath = videopath
+
+        self.frame_shape = frame.shape
+        self.frame_dtype = frame.dtype
+
+        # Geometry changes within the segment capacity are published in-band
+        if self.be_manager.remote_preview is None and (self.shm is None or not self.shm.fits(frame)):
+            self.allocate_shared_memory(frame)
+
+    def allocate_shared_memory(self, frame):
+        """(Re)creates the preview segment with headroom for frame."""
+        if self.shm is not None:
+            # Readers re-attach by name when they see the segment retired
+            self.shm.retire()
+            self.shm.close()
+            self.shm.unlink()
+            self.logger.info(f"Released previous shared memory block for node {self.flowdip_name}")
+
+        self.shm = FrameSegment.create(self.flowdip_name, segment_capacity(frame.nbytes))
+        self.update_frontend_shared_memory()
+
+    def open_source(self, videopath):
+        """Opens the frame source and returns its first frame.
+        Sources other than video files override this and read_frame."""
+        if self.cap is not None:
+            self.cap.release()
 
         self.cap = cv2.VideoCapture(videopath)
 
         if not self.cap.isOpened():
-            raise ValueError(f"Failed to open video file at '{self.videopath}'. Please check the file and try again.")
-
-        self.videopath = videopath
+            raise ValueError(f"Failed to open video file at '{videopath}'. Please check the file and try again.")
 
         fps = self.cap.get(cv2.CAP_PROP_FPS)
         self.frametime = 1.0 / fps if fps > 0 else 0.033  # Default to ~30 FPS if unknown
 
+        self.apply_decode_format()
+        if self.gop is not None:
+            self.gop.close()
+            self.gop = None
+        if self.decode_workers > 1:
+            from flowdip.backend.gop_decoder import GopDecoder
+            self.gop = GopDecoder(videopath, self.decode_workers, self.decode_format,
+                                  name=f"{self.flowdip_name}.gop")
+
+        frame = self.read_frame()
+        if frame is None:
+            raise ValueError(f"Video file at '{videopath}' contains no readable frames.")
+        return frame
+
+    def apply_decode_format(self):
+        """Configures the decoder for the format negotiated on the output."""
+        self.decode_format = self.frame_out.pixel_format
+        configure_decode_format(self.cap, self.decode_format)
+        self.decode_size = frame_size(self.cap)
+        if self.gop is not None:
+            self.gop.set_format(self.decode_format)
+
+    def is_source_open(self) -> bool:
+        return self.cap is not None and self.cap.isOpened()
+
+    def read_frame(self):
+        """Returns the next frame, or None at the end of the source."""
+        if self.gop is not None:
+            return self.gop.read()
         ret, frame = self.cap.read()
-        frame_shape = frame.shape
-        frame_dtype = frame.dtype
+        if not ret:
+            return None
+        if self.decode_format == "GRAY":
+            if frame.ndim == 2 and frame.shape != self.decode_size:
+                self.logger.warning("Decoder returned %s buffers instead of the luma plane, "
+                                    "converting BGR frames", frame.shape)
+                ret, frame = reread_bgr(self.cap)
+                if not ret:
+                    return None
+            if frame.ndim == 3:
+                # No luma plane available from this decoder
+                frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        return frame
+
+    def seek_source(self, index: int):
+        if self.gop is not None:
+            self.gop.seek(index)
+        else:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, index)
+
+    def rewind(self):
+        self._rewind_pending = True
 
-        if frame_shape != self.frame_shape or frame_dtype != self.frame_dtype:
+    def invalidate(self):
+        super().invalidate()
+        if self.detector is not None:
+            self.detector.reset()  # Republish the next frame
 
-            self.frame_shape = frame_shape
-            self.frame_dtype = frame_dtype
-            self.frame_size = np.prod(self.frame_shape) * np.dtype(self.frame_dtype).itemsize
-            # If there was a previous shared memory block, release it
-            if self.shm is not None:
-                self.shm.close()
-                self.shm.unlink()
-                self.logger.info(f"Released previous shared memory block for node {self.flowdip_name()}")
+    def source_stats(self) -> dict:
+        """Source specific statistics (decode rate, buffering...)."""
+        return self.gop.stats() if self.gop is not None else {}
 
-            # Create fresh new shared memory block
-            self.shm = SharedMemory(name=self.flowdip_name, create=True, size=self.frame_size)
+    def close_source(self):
+        if self.gop is not None:
+            self.gop.close()
+            self.gop = None
+        if self.cap is not None:
+            self.cap.release()
+            self.cap = None
 
-            self.update_frontend_shared_memory()
+    def release(self):
+        self.close_source()
+        if self.shm is not None:
+            self.shm.close()
+            self.shm.unlink()
+            self.shm = None
+            self.logger.info(f"Released shared memory block for node {self.flowdip_name}")
 
     def _process_data(self):
 
-        if self.cap is None or not self.cap.isOpened():
+        if not self.is_source_open():
             if self.videopath:
                 self.open_video_cap_from_file(self.videopath)
             else:
                 raise ValueError("VideoCapture is not opened. Please set a valid videopath before processing data.")
 
-        ret, frame = self.cap.read()
-        
-        # Write frame to shared memory
-        np_frame = np.ndarray(self.frame_shape, dtype=self.frame_dtype, buffer=self.shm.buf)
-        np.copyto(np_frame, frame)
+        if self._rewind_pending:
+            self._rewind_pending = False
+            self.seek_source(0)
+
+        if self.frame_out.pixel_format != self.decode_format:
+            # Renegotiated by the graph compiler
+            self.apply_decode_format()
+
+        frame = self.read_frame()
+        if frame is None:
+            # End of source, pause the loop until the user resumes it
+            self.start_e.clear()
+            return
+
+        roi = clip_roi(self.roi, frame.shape)
+        preview = frame if roi is None else frame[roi_slices(roi)]
+
+        if self.detector is not None:
+            if not self.detector.changed(preview):
+                # Nodes below keep the results of the last published frame
+                self.metrics.unchanged += 1
+                return
+            if self.gop is not None:
+                # Decoder ring slots are reused while the frame stays published
+                frame = frame.copy()
+
+        self.update_port_data(self.frame_out, frame, roi)
+        self.publish_preview(preview)
+
+    def publish_preview(self, preview):
+        remote_preview = self.be_manager.remote_preview
+        if remote_preview is not None:
+            # Remote frontend: sent compressed by the connection
+            with tracing.span("preview_publish"):
+                remote_preview.publish(self.flowdip_name, preview)
+            return
+
+        # Write frame to shared memory, only its ROI is copied and uploaded
+        with tracing.span("shm_write"):
+            if self.shm is None or not self.shm.write(preview):
+                self.allocate_shared_memory(preview)
+                self.shm.write(preview)
 
         # Tell frontend node to update frame
         self.be_manager.publish_event(
@@ -91,12 +241,13 @@ class BackMediaPlayer(BackEndFlowDiPNode):
         current_time = time.time()
         to_wait = 0
 
-        if self.frametime > 0:
+        # Steps and offline runs go as fast as possible
+        if self.frametime > 0 and not self._steps and not self.offline:
             elapsed = current_time - self.last_frame_ts
             to_wait = self.frametime - elapsed
             if to_wait > 0:
-                time.sleep(to_wait)
-                print(f"Waiting {to_wait:.3f} seconds to sync with framerate.")
+                with tracing.span("wait_framerate"):
+                    time.sleep(to_wait)
 
         self.last_frame_ts = current_time + max(to_wait, 0)
 
@@ -106,20 +257,667 @@ class BackMediaPlayer(BackEndFlowDiPNode):
                 event_type=EventType.UPDATE_NODE_PARAMS,
                 payload=UpdateNodeParamsPayload(
                     flowdip_name=self.flowdip_name,
-                    new_params={
-                    "shm_name": self.shm.name,
-                    "shm_shape": self.frame_shape,
-                    "shm_dtype": self.frame_dtype
-                    }
+                    new_params={"shm_name": self.shm.name}
                 )
             )
         )
 
     def update_params(self, params: dict):
+        if "offline" in params:
+            self.offline = bool(params["offline"])
+        if params.get("decode_workers") is not None:
+            # Applied when the file is (re)opened
+            self.decode_workers = int(params["decode_workers"] or 0)
+        if params.get("static_threshold") is not None:
+            threshold = float(params["static_threshold"] or 0)
+            self.detector = ChangeDetector(threshold) if threshold > 0 else None
+        if "roi" in params:
+            try:
+                self.roi = parse_roi(params["roi"])
+            except ValueError as e:
+                self.logger.warning(str(e))
         videopath = params.get('videopath', None)
         if videopath is not None:
             self.open_video_cap_from_file(videopath)
             self.start_e.set()
 
 
+class BackRawFrameSource(BackMediaPlayer):
+    """Replays a FlowDiP raw frame file (see raw_frames.py). Frames are served
+    straight from the page cache: output ports receive memory-mapped views and
+    only the preview copy into shared memory touches the pixels."""
+
+    decode_formats = ()
+
+    def __init__(self, flowdip_name, be_manager=None):
+        super().__init__(flowdip_name=flowdip_name, be_manager=be_manager)
+        self.reader = None
+        self.frame_index = 0
+
+    def open_source(self, videopath):
+        if self.reader is not None:
+            self.reader.close()
+
+        self.reader = RawFrameReader(videopath)
+        if len(self.reader) == 0:
+            raise ValueError(f"Raw frame file at '{videopath}' contains no frames.")
+
+        self.frametime = 1.0 / self.reader.fps if self.reader.fps > 0 else 0.033
+        self.frame_index = 0
+        return self.reader[0]
+
+    def is_source_open(self) -> bool:
+        return self.reader is not None
+
+    def close_source(self):
+        if self.reader is not None:
+            self.reader.close()
+            self.reader = None
+
+    def seek_source(self, index: int):
+        self.frame_index = index
+
+    def read_frame(self):
+        if self.frame_index >= len(self.reader):
+            return None
+        frame = self.reader[self.frame_index]
+        self.frame_index += 1
+        return frame
+
+
+class BackImageSequencePlayer(BackMediaPlayer):
+    """Plays a folder of image files (PNG, JPEG...) as a video. Images are
+    decoded ahead of playback by a thread pool (see image_sequence.py)."""
+
+    decode_formats = ()
+
+    def __init__(self, flowdip_name, be_manager=None):
+        super().__init__(flowdip_name=flowdip_name, be_manager=be_manager)
+        self.reader = None
+        self.fps = 30.0
+        self.workers = None
+        self.prefetch = None
+
+    def open_source(self, videopath):
+        # Selecting any image of the sequence opens its whole folder
+        folder = videopath if os.path.isdir(videopath) else os.path.dirname(videopath)
+
+        if self.reader is not None:
+            self.reader.close()
+
+        self.reader = ImageSequenceReader(folder, workers=self.workers, prefetch=self.prefetch)
+        self.frametime = 1.0 / self.fps if self.fps > 0 else 0.033
+        return self.reader.read()
+
+    def is_source_open(self) -> bool:
+        return self.reader is not None
+
+    def close_source(self):
+        if self.reader is not None:
+            self.reader.close()
+            self.reader = None
+
+    def seek_source(self, index: int):
+        self.reader.seek(index)
+
+    def read_frame(self):
+        return self.reader.read()
+
+    def source_stats(self) -> dict:
+        return self.reader.stats() if self.reader is not None else {}
+
+    def update_params(self, params: dict):
+        if params.get("fps"):
+            self.fps = float(params["fps"])
+            self.frametime = 1.0 / self.fps if self.fps > 0 else 0.033
+        if params.get("workers"):
+            self.workers = int(params["workers"])
+        if params.get("prefetch"):
+            self.prefetch = int(params["prefetch"])
+        super().update_params(params)
+
+
+class BackRawFrameRecorder(BackEndFlowDiPNode):
+    """Records every frame received on its input to a FlowDiP raw frame file.
+    The file is created on the first frame, once its format is known. When
+    the frame shape or dtype changes (ROI, resize parameters, degraded
+    quality upstream), the file is closed and the recording goes on in a new
+    numbered segment: "rec.raw", then "rec.1.raw", "rec.2.raw"..."""
+
+    _degradable = False
+    _cacheable = False  # Static frames are recorded again, the file keeps its timing
+
+    def __init__(self, flowdip_name, be_manager=None):
+        super().__init__(flowdip_name=flowdip_name, be_manager=be_manager)
+        self.frame_in = self.create_port("Frame", is_input=True, critical=True, datatypes=["Frame"])
+        self.record_path = None
+        self.fps = 0.0
+        self.writer = None
+        self.segment = 0  # Number of the file of the recording
+
+    def _process_data(self):
+        frame = self.frame_in.data
+        if frame is None or not self.record_path:
+            return
+
+        if self.writer is not None and (frame.shape != self.writer.shape or frame.dtype != self.writer.dtype):
+            self.close_writer()
+            self.segment += 1
+        if self.writer is None:
+            path = self.record_path
+            if self.segment:
+                root, ext = os.path.splitext(path)
+                path = f"{root}.{self.segment}{ext}"
+            self.writer = RawFrameWriter(path, frame.shape, frame.dtype, self.fps)
+            self.logger.info("Recording %s %s frames to '%s'", frame.shape, frame.dtype, path)
+
+        self.writer.append(frame)
+
+    def close_writer(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.logger.info(f"Recorded {self.writer.frame_count} frames to '{self.writer.path}'")
+            self.writer = None
+
+    def release(self):
+        self.close_writer()
+
+    def update_params(self, params: dict):
+        if "fps" in params:
+            self.fps = float(params["fps"] or 0)
+        if "record_path" in params:
+            # A new path always starts a new recording
+            self.close_writer()
+            self.segment = 0
+            self.record_path = params["record_path"] or None
+
+
+# =============================================================================
+#  Image processing nodes
+# =============================================================================
+
+def coerce_param(param_type: type, value):
+    """Converts a parameter received from the frontend (often a string)."""
+    if param_type is bool and isinstance(value, str):
+        return value.strip().lower() in ("1", "true", "yes", "on")
+    return param_type(value)
+
+
+class BackImageNode(BackEndFlowDiPNode):
+    """Base class for single frame in, single frame out processing nodes.
+
+    Subclasses implement output_format() and _apply(src, dst). Outputs are
+    written with OpenCV/NumPy `dst=` arguments into pooled buffers, so no
+    frame is allocated per call at steady state.
+
+    Parameters are declared in `param_types` as name -> (type, default);
+    they become attributes and are coerced when received from the frontend.
+
+    Elementwise nodes (per-pixel and channel independent, same output format
+    as input) set `_elementwise` so that chains of them can be fused into a
+    single pass (see fusion.py).
+
+    Nodes whose output rows only depend on nearby input rows set
+    `_tile_parallel` and return the number of extra rows they need in
+    tile_halo(). Large frames are then split into strips processed in
+    parallel (see tiling.py). Elementwise nodes are always tile-parallel.
+
+    Frames with a ROI (see Output.roi) are processed as if the ROI were the
+    whole frame: _apply receives views of the ROI of the input and output
+    buffers, and the output carries the same ROI. Nodes that change the
+    frame geometry clear `_roi_capable` and receive a view of the ROI.
+    """
+
+    param_types: dict = {}
+    _elementwise: bool = False
+    _tile_parallel: bool = False
+    _roi_capable = True
+
+    def __init__(self, flowdip_name, be_manager=None):
+        super().__init__(flowdip_name=flowdip_name, be_manager=be_manager)
+        self.frame_in = self.create_port("Frame", is_input=True, critical=True, datatypes=["Frame"])
+        self.frame_out = self.create_port("Frame", is_input=False, datatypes=["Frame"])
+        self.pool = BufferPool()
+
+        # Fusion state, assigned by the backend manager (see fusion.plan_fusion)
+        self.fused_chain = None  # Nodes run by this one, itself included
+        self.fused_into = None   # Head node running this one
+        self.params_version = 0
+        self._fused_lut = None
+        self._fused_lut_key = None
+        self.tile_scratch = TileScratch()
+
+        for name, (_, default) in self.param_types.items():
+            setattr(self, name, default)
+        self.on_params_changed()
+
+    def is_elementwise(self) -> bool:
+        """Whether the node is elementwise with its current parameters."""
+        return self._elementwise
+
+    def is_tile_parallel(self) -> bool:
+        return self._tile_parallel or self.is_elementwise()
+
+    def tile_halo(self) -> int:
+        """Input rows needed above and below a strip to compute its rows."""
+        return 0
+
+    def output_format(self, src: np.ndarray):
+        """Returns the (shape, dtype) of the output for the given input."""
+        return src.shape, src.dtype
+
+    def _apply(self, src: np.ndarray, dst: np.ndarray):
+        """Writes the result of processing src into dst."""
+        raise NotImplementedError
+
+    def _process_data(self):
+        if self.fused_into is not None:
+            return  # Executed by the head of its fused chain
+        src = self.frame_in.data
+        if src is None:
+            return
+
+        roi = clip_roi(self.frame_in.roi, src.shape)
+        if self.fused_chain:
+            self._process_fused(src, roi)
+            return
+
+        shape, dtype = self.output_format(src)
+        dst = self.pool.acquire(shape, dtype)
+        src_roi, dst_roi = (src, dst) if roi is None else (src[roi_slices(roi)], dst[roi_slices(roi)])
+        if self.is_tile_parallel() and should_tile(src_roi):
+            run_tiled(self._apply, src_roi, dst_roi, self.tile_halo(), self.tile_scratch)
+        else:
+            self._apply(src_roi, dst_roi)
+        self.update_port_data(self.frame_out, dst, roi)
+
+    def _process_fused(self, src: np.ndarray, roi=None):
+        chain = self.fused_chain
+        tail = chain[-1]
+
+        lut = None
+        if src.dtype == np.uint8:
+            # Recompose the LUT only when a parameter of the chain changed
+            key = tuple((id(node), node.params_version) for node in chain)
+            if key != self._fused_lut_key:
+                self._fused_lut = compose_lut(chain)
+                self._fused_lut_key = key
+            lut = self._fused_lut
+
+        dst = tail.pool.acquire(src.shape, src.dtype)
+        if roi is None:
+            run_fused(chain, src, dst, lut)
+        else:
+            run_fused(chain, src[roi_slices(roi)], dst[roi_slices(roi)], lut)
+        self.update_port_data(tail.frame_out, dst, roi)
+
+    def downstream_outputs(self):
+        if self.fused_into is not None:
+            return []
+        if self.fused_chain:
+            return self.fused_chain[-1].dip_outputs
+        return self.dip_outputs
+
+    def on_params_changed(self):
+        """Hook to precompute derived values (kernels, codes...)."""
+        pass
+
+    def update_params(self, params: dict):
+        for name, value in params.items():
+            if name not in self.param_types or value in (None, ""):
+                continue
+            param_type, _ = self.param_types[name]
+            try:
+                setattr(self, name, coerce_param(param_type, value))
+            except (TypeError, ValueError):
+                self.logger.warning(f"Invalid value for parameter '{name}': {value!r}")
+        self.on_params_changed()
+        self.params_version += 1
+
+
+INTERPOLATIONS = {
+    "nearest": cv2.INTER_NEAREST,
+    "linear": cv2.INTER_LINEAR,
+    "cubic": cv2.INTER_CUBIC,
+    "area": cv2.INTER_AREA,
+    "lanczos": cv2.INTER_LANCZOS4,
+}
+
+
+class BackResize(BackImageNode):
+
+    _roi_capable = False  # The output geometry is not the input one
+    param_types = {
+        "width": (int, 640),
+        "height": (int, 480),
+        "interpolation": (str, "linear"),
+    }
+
+    def output_format(self, src):
+        return (self.height, self.width) + src.shape[2:], src.dtype
+
+    def _apply(self, src, dst):
+        cv2.resize(src, (self.width, self.height), dst=dst,
+                   interpolation=INTERPOLATIONS.get(self.interpolation, cv2.INTER_LINEAR))
+
+
+class BackColorConvert(BackImageNode):
+
+    _tile_parallel = True
+    param_types = {
+        "conversion": (str, "BGR2GRAY"),
+    }
+
+    def on_params_changed(self):
+        if self.conversion not in COLOR_CONVERSIONS:
+            self.logger.warning(f"Unknown color conversion '{self.conversion}', using BGR2GRAY")
+            self.conversion = "BGR2GRAY"
+        self.code, self.channels = COLOR_CONVERSIONS[self.conversion]
+        source, self.target_colorspace = self.conversion.split("2")
+        self.frame_in.colorspaces = (source,)
+
+    def output_colorspace(self, output_port, input_colorspace):
+        return self.target_colorspace
+
+    def output_format(self, src):
+        shape = src.shape[:2] if self.channels == 1 else src.shape[:2] + (self.channels,)
+        return shape, src.dtype
+
+    def _apply(self, src, dst):
+        cv2.cvtColor(src, self.code, dst=dst)
+
+
+class BackBlur(BackImageNode):
+
+    _tile_parallel = True
+    param_types = {
+        "mode": (str, "gaussian"),  # gaussian, box, median
+        "ksize": (int, 5),
+        "sigma": (float, 0.0),
+    }
+
+    def on_params_changed(self):
+        # Gaussian and median kernels must be odd
+        self.ksize = max(1, self.ksize | 1)
+
+    def tile_halo(self):
+        return self.ksize // 2
+
+    def _apply(self, src, dst):
+        k = self.ksize
+        if self.mode == "median":
+            cv2.medianBlur(src, k, dst=dst)
+        elif self.mode == "box":
+            cv2.blur(src, (k, k), dst=dst)
+        else:
+            cv2.GaussianBlur(src, (k, k), self.sigma, dst=dst)
+
+
+THRESHOLD_TYPES = {
+    "binary": cv2.THRESH_BINARY,
+    "binary_inv": cv2.THRESH_BINARY_INV,
+    "trunc": cv2.THRESH_TRUNC,
+    "tozero": cv2.THRESH_TOZERO,
+    "tozero_inv": cv2.THRESH_TOZERO_INV,
+}
+
+
+class BackThreshold(BackImageNode):
+
+    param_types = {
+        "thresh": (float, 127.0),
+        "maxval": (float, 255.0),
+        "type": (str, "binary"),
+        "otsu": (bool, False),  # Otsu needs single channel uint8 frames
+    }
+
+    def on_params_changed(self):
+        self.cv_type = THRESHOLD_TYPES.get(self.type, cv2.THRESH_BINARY)
+        if self.otsu:
+            self.cv_type |= cv2.THRESH_OTSU
+        self.frame_in.colorspaces = ("GRAY",) if self.otsu else ()
+
+    def is_elementwise(self):
+        # Otsu computes the threshold from the whole frame histogram
+        return not self.otsu
+
+    def _apply(self, src, dst):
+        cv2.threshold(src, self.thresh, self.maxval, self.cv_type, dst=dst)
+
+
+class BackCrop(BackImageNode):
+    """Crops without copying: the input frame is published with the crop
+    rectangle as its ROI. Nodes that accept ROIs keep working in the
+    coordinates of the whole frame, the others receive a view of the
+    rectangle (see BackEndFlowDiPNode.update_port_data)."""
+
+    param_types = {
+        "x": (int, 0),
+        "y": (int, 0),
+        "width": (int, 0),   # 0 means up to the frame border
+        "height": (int, 0),
+    }
+
+    def crop_roi(self, src, roi):
+        """Crop rectangle within the ROI of the input, None for the whole frame."""
+        h, w = src.shape[:2]
+        x0, y0 = max(self.x, 0), max(self.y, 0)
+        x1 = w if self.width <= 0 else x0 + self.width
+        y1 = h if self.height <= 0 else y0 + self.height
+        if roi is not None:
+            x0, y0 = max(x0, roi[0]), max(y0, roi[1])
+            x1, y1 = min(x1, roi[0] + roi[2]), min(y1, roi[1] + roi[3])
+        return clip_roi((x0, y0, x1 - x0, y1 - y0), src.shape)
+
+    def _process_data(self):
+        src = self.frame_in.data
+        if src is None:
+            return
+        self.update_port_data(self.frame_out, src, self.crop_roi(src, clip_roi(self.frame_in.roi, src.shape)))
+
+
+class BackNormalize(BackImageNode):
+    """Either stretches the frame to [alpha, beta] (minmax) or applies the
+    saturated linear transform alpha * x + beta (scale)."""
+
+    param_types = {
+        "mode": (str, "minmax"),  # minmax, scale
+        "alpha": (float, 0.0),
+        "beta": (float, 255.0),
+    }
+
+    def is_elementwise(self):
+        return self.mode == "scale"
+
+    def _apply(self, src, dst):
+        if self.mode == "scale":
+            cv2.addWeighted(src, self.alpha, src, 0.0, self.beta, dst=dst)
+        else:
+            cv2.normalize(src, dst, self.alpha, self.beta, cv2.NORM_MINMAX)
+
+
+class BackInvert(BackImageNode):
+
+    _elementwise = True
+
+    def _apply(self, src, dst):
+        cv2.bitwise_not(src, dst=dst)
+
+
+MORPH_OPERATIONS = {
+    "erode": cv2.MORPH_ERODE,
+    "dilate": cv2.MORPH_DILATE,
+    "open": cv2.MORPH_OPEN,
+    "close": cv2.MORPH_CLOSE,
+    "gradient": cv2.MORPH_GRADIENT,
+    "tophat": cv2.MORPH_TOPHAT,
+    "blackhat": cv2.MORPH_BLACKHAT,
+}
+
+MORPH_SHAPES = {
+    "rect": cv2.MORPH_RECT,
+    "ellipse": cv2.MORPH_ELLIPSE,
+    "cross": cv2.MORPH_CROSS,
+}
+
+
+class BackMorphology(BackImageNode):
+
+    _tile_parallel = True
+    param_types = {
+        "operation": (str, "open"),
+        "shape": (str, "rect"),
+        "ksize": (int, 3),
+        "iterations": (int, 1),
+    }
+
+    def on_params_changed(self):
+        self.ksize = max(1, self.ksize)
+        self.op = MORPH_OPERATIONS.get(self.operation, cv2.MORPH_OPEN)
+        self.kernel = cv2.getStructuringElement(
+            MORPH_SHAPES.get(self.shape, cv2.MORPH_RECT), (self.ksize, self.ksize)
+        )
+
+    def tile_halo(self):
+        # Opening/closing (and the hats built on them) apply two passes
+        passes = 2 if self.op in (cv2.MORPH_OPEN, cv2.MORPH_CLOSE,
+                                  cv2.MORPH_TOPHAT, cv2.MORPH_BLACKHAT) else 1
+        return (self.ksize // 2 + 1) * passes * max(1, self.iterations)
+
+    def _apply(self, src, dst):
+        cv2.morphologyEx(src, self.op, self.kernel, dst=dst, iterations=self.iterations)
+
+
+# =============================================================================
+#  Inference nodes
+# =============================================================================
+
+class BackInference(BackEndFlowDiPNode):
+    """Runs an ONNX model on the CPU over micro-batches of frames.
+
+    Frames from up to `n_sources` inputs are letterboxed into a preallocated
+    batch tensor as they arrive. The batch runs when it holds `max_batch`
+    frames or when its oldest frame has waited `max_latency_ms`. Results are
+    structured arrays (see inference.py) tagged with their source input:
+    DETECTION_DTYPE or CLASSIFICATION_DTYPE rows, or SegmentationResults
+    (SEGMENTATION_DTYPE rows indexing one stacked class map buffer).
+    """
+
+    n_sources = 4
+    _cacheable = False  # Deadline wakeups have no fresh input but must flush the partial batch
+
+    def __init__(self, flowdip_name, be_manager=None):
+        super().__init__(flowdip_name=flowdip_name, be_manager=be_manager)
+        self.frame_ins = [self.create_port(f"Frame {i + 1}", is_input=True, datatypes=["Frame"])
+                          for i in range(self.n_sources)]
+        for input_port in self.frame_ins:
+            # Color models: GRAY links get a GRAY2BGR conversion, and sources
+            # only feeding inference keep decoding BGR
+            input_port.colorspaces = ("BGR",)
+        self.results_out = self.create_port("Results", is_input=False, datatypes=["Results"])
+
+        self.model_path = None
+        self.backend = "auto"
+        self.task = InferencedTask.OBJECT_DETECTION
+        self.input_size = 640
+        self.max_batch = 8
+        self.max_latency = 0.020
+        self.score_threshold = 0.25
+        self.nms_threshold = 0.45
+        self.top_k = 1
+
+        self.model = None
+        self.batch = None
+        self.batch_start = None  # Arrival time of the oldest batched frame
+        self._published = False
+        self._inference_frames = 0  # Frames received, for quality.inference_interval
+        self._frame_id = 0  # Frames received, numbers the "frame" field of the results
+
+    def wait_start(self):
+        """Also wakes up when the batch deadline expires so that partial
+        batches never wait for the next frame."""
+        timeout = None
+        if self.batch_start is not None:
+            timeout = max(0.0, self.batch_start + self.max_latency - time.perf_counter())
+        if self.start_e.wait(timeout):
+            self.start_e.clear()
+
+    def _process_data(self):
+        self._published = False
+        if self.model is None:
+            raise ValueError("No model loaded. Please set a valid model_path.")
+
+        results = []
+        interval = self.quality.inference_interval
+        for source, input_port in enumerate(self.frame_ins):
+            frame = input_port.data
+            if frame is None:
+                continue
+            input_port.data = None  # Consumed
+            frame_id = self._frame_id
+            self._frame_id = (frame_id + 1) & 0xFFFFFFFF
+
+            if interval > 1:
+                self._inference_frames += 1
+                if self._inference_frames % interval:
+                    self.metrics.skipped += 1  # Degraded inference rate
+                    continue
+
+            if self.batch.size == 0:
+                self.batch_start = time.perf_counter()
+            self.batch.add(frame, source, frame_id)
+            if self.batch.full():
+                results.append(self.run_batch())
+
+        if self.batch_start is not None and time.perf_counter() - self.batch_start >= self.max_latency:
+            results.append(self.run_batch())
+
+        if results:
+            self.update_port_data(self.results_out, concatenate_results(results))
+            self._published = True
+
+    def run_batch(self):
+        output = self.model.run(self.batch.batch())
+        results = postprocess(self.task, output, self.batch,
+                              self.score_threshold, self.nms_threshold, self.top_k)
+        self.batch.clear()
+        self.batch_start = None
+        return results
+
+    def propagates(self):
+        # Downstream nodes only run when a batch produced results
+        return self._published
+
+    def release(self):
+        self.model = None  # Frees the session and its thread pools
+
+    def update_params(self, params: dict):
+        if params.get("task"):
+            self.task = InferencedTask(params["task"])
+        if params.get("backend"):
+            self.backend = params["backend"]
+        if params.get("input_size"):
+            self.input_size = int(params["input_size"])
+        if params.get("max_batch"):
+            self.max_batch = max(1, int(params["max_batch"]))
+        if params.get("max_latency_ms") not in (None, ""):
+            self.max_latency = float(params["max_latency_ms"]) / 1000.0
+        if params.get("score_threshold") not in (None, ""):
+            self.score_threshold = float(params["score_threshold"])
+        if params.get("nms_threshold") not in (None, ""):
+            self.nms_threshold = float(params["nms_threshold"])
+        if params.get("top_k"):
+            self.top_k = int(params["top_k"])
+
+        if params.get("model_path"):
+            self.model_path = params["model_path"]
+            if not os.path.isfile(self.model_path):
+                raise ValueError(f"Model file '{self.model_path}' does not exist.")
+            self.model = InferenceModel(self.model_path, self.backend)
+            self.logger.info(f"Loaded model '{self.model_path}' with {self.model.backend}")
 
+        # The batch tensor is reallocated only when its geometry changes
+        if self.batch is None or self.batch.max_batch != self.max_batch \
+                or self.batch.input_h != self.input_size:
+            self.batch = LetterboxBatch(self.max_batch, (self.input_size, self.input_size))
+            self.batch_start = None
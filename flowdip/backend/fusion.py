@@ -0,0 +1,104 @@
+import os
+from typing import Iterable, List
+
+import cv2
+import numpy as np
+
+# =============================================================================
+#  Operator fusion for chains of elementwise nodes
+# =============================================================================
+#
+#  A linear chain of elementwise (per-pixel, channel independent) nodes is run
+#  by its head node as a single kernel:
+#    - uint8 frames: the LUTs of every node are composed into one 256 entry
+#      table and applied with a single cv2.LUT pass.
+#    - other dtypes: the chain is applied in place, block of rows by block of
+#      rows, so each block stays in cache while every node processes it.
+#  The other nodes of the chain are skipped, saving a memory pass and a thread
+#  handoff per node.
+#
+#  Set FLOWDIP_FUSION=0 to disable fusion (e.g. to debug a single node).
+# =============================================================================
+
+FUSION_ENABLED = os.environ.get("FLOWDIP_FUSION", "1") != "0"
+FUSION_BLOCK_BYTES = 256 * 1024  # Fits comfortably in L2
+
+
+def _next_in_chain(node):
+    """Returns the node that can be fused after `node`, if any."""
+    if len(node.dip_outputs) != 1:
+        return None
+    consumers = node.dip_outputs[0].inputs
+    # The intermediate result must not be needed anywhere else
+    if len(consumers) != 1:
+        return None
+    successor = consumers[0].node
+    if len(successor.dip_inputs) != 1 or not is_fusible(successor):
+        return None
+    return successor
+
+
+def is_fusible(node) -> bool:
+    return getattr(node, "is_elementwise", None) is not None and node.is_elementwise()
+
+
+def plan_fusion(nodes: Iterable, enabled: bool = FUSION_ENABLED) -> List[list]:
+    """Detects linear chains of elementwise nodes and assigns them to their
+    head node. Returns the list of fused chains (longer than one node)."""
+    nodes = list(nodes)
+    for node in nodes:
+        if hasattr(node, "fused_chain"):
+            node.fused_chain = None
+            node.fused_into = None
+
+    if not enabled:
+        return []
+
+    # Nodes that are the fusible continuation of a fusible predecessor
+    continuations = set()
+    for node in nodes:
+        if is_fusible(node):
+            successor = _next_in_chain(node)
+            if successor is not None:
+                continuations.add(successor)
+
+    chains = []
+    for node in nodes:
+        if not is_fusible(node) or node in continuations:
+            continue
+        chain = [node]
+        successor = _next_in_chain(node)
+        while successor is not None and successor not in chain:
+            chain.append(successor)
+            successor = _next_in_chain(successor)
+        if len(chain) > 1:
+            for member in chain[1:]:
+                member.fused_into = node
+            node.fused_chain = chain
+            chains.append(chain)
+
+    return chains
+
+
+def compose_lut(chain: list) -> np.ndarray:
+    """Builds the uint8 LUT equivalent to applying the whole chain."""
+    lut = np.arange(256, dtype=np.uint8).reshape(1, 256)
+    for node in chain:
+        node._apply(lut, lut)
+    return lut
+
+
+def run_fused(chain: list, src: np.ndarray, dst: np.ndarray, lut: np.ndarray = None):
+    """Applies every node of the chain to src, writing the result into dst."""
+    if src.dtype == np.uint8 and lut is not None:
+        cv2.LUT(src, lut, dst=dst)
+        return
+
+    row_bytes = max(1, src.strides[0])
+    rows = max(1, FUSION_BLOCK_BYTES // row_bytes)
+    for y in range(0, src.shape[0], rows):
+        block_src = src[y:y + rows]
+        block_dst = dst[y:y + rows]
+        for node in chain:
+            node._apply(block_src, block_dst)
+            block_src = block_dst
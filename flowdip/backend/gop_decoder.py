@@ -0,0 +1,256 @@
+import multiprocessing
+import queue
+from collections import deque
+from multiprocessing.shared_memory import SharedMemory
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from flowdip.backend.pixel_formats import configure_decode_format, reread_bgr
+
+# =============================================================================
+#  GOP-parallel video decoding
+# =============================================================================
+#
+#  For offline runs over a single long file. The file is scanned once for its
+#  keyframes (demuxing only, no decoding) and split into keyframe-aligned
+#  segments. Segments are dealt round-robin to worker processes, which seek
+#  to the first frame of each segment and decode it into their own shared
+#  memory ring. The consumer reads the segments back in order.
+#
+#  Each ring holds about one segment. While the consumer drains a segment,
+#  the other workers decode the next ones, so throughput scales with the
+#  number of workers as long as the consumer keeps up. Rings are bounded by
+#  `memory_mb`. A GOP longer than its ring stalls the worker until frames are
+#  consumed.
+#
+#  Frames are handed out as views of the rings. Like the BufferPool of the
+#  processing nodes, a slot is only reused after HOLD_FRAMES newer frames were
+#  read.
+# =============================================================================
+
+HOLD_FRAMES = 3
+DEFAULT_MEMORY_MB = 1024
+_POLL_S = 0.5  # Worker liveness check period while waiting for a frame
+
+
+def scan_keyframes(path: str) -> Tuple[List[int], int]:
+    """Returns (keyframe indices, frame count). Packets are only demuxed.
+    Keyframes are empty if this OpenCV build doesn't report them."""
+    cap = cv2.VideoCapture(path, cv2.CAP_FFMPEG, [cv2.CAP_PROP_FORMAT, -1])
+    if not cap.isOpened():
+        raise ValueError(f"Failed to open video file at '{path}'. Please check the file and try again.")
+
+    has_key_frame = getattr(cv2, "CAP_PROP_LRF_HAS_KEY_FRAME", None)
+    keyframes, count = [], 0
+    try:
+        while cap.grab():
+            if has_key_frame is not None and cap.get(has_key_frame):
+                keyframes.append(count)
+            count += 1
+    finally:
+        cap.release()
+    return keyframes, count
+
+
+def plan_segments(keyframes: List[int], frame_count: int, target: int) -> List[Tuple[int, int]]:
+    """Splits the file into (start, length) segments of at least `target`
+    frames, starting on keyframes. Without keyframes, the segments are cut
+    every `target` frames and each seek decodes from the previous keyframe."""
+    if frame_count <= 0:
+        return []
+    starts = sorted({k for k in keyframes if 0 < k < frame_count}) if keyframes else \
+        list(range(target, frame_count, target))
+
+    segments, segment_start = [], 0
+    for start in starts:
+        if start - segment_start >= target:
+            segments.append((segment_start, start - segment_start))
+            segment_start = start
+    segments.append((segment_start, frame_count - segment_start))
+    return segments
+
+
+def _read_into(cap, out: np.ndarray) -> bool:
+    """Decodes the next frame straight into a ring slot."""
+    ok, frame = cap.read(out)
+    if not ok:
+        return False
+    if frame.ctypes.data != out.ctypes.data:
+        # The decoder didn't produce the ring format (e.g. no luma plane)
+        if frame.ndim == 2 and frame.shape != out.shape:
+            ok, frame = reread_bgr(cap)  # Raw packed buffer, not the Y plane
+            if not ok:
+                return False
+        if frame.ndim == 3 and out.ndim == 2:
+            cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=out)
+        else:
+            np.copyto(out, frame)
+    return True
+
+
+def _decode_segments(path, fmt, shm_name, shape, dtype, slots, segments, free, ready):
+    """Worker process: decodes its segments into the ring. Every segment is
+    terminated by (segment index, -1); errors are sent as (-1, message)."""
+    shm = SharedMemory(name=shm_name)
+    ring = np.ndarray((slots,) + tuple(shape), dtype=dtype, buffer=shm.buf)
+    cap = cv2.VideoCapture(path)
+    slot = 0
+    try:
+        configure_decode_format(cap, fmt)
+        for index, start, length in segments:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+            for _ in range(length):
+                free.acquire()
+                if not _read_into(cap, ring[slot]):
+                    free.release()
+                    break
+                ready.put((index, slot))
+                slot = (slot + 1) % slots
+            ready.put((index, -1))
+    except Exception as e:
+        ready.put((-1, str(e)))
+    finally:
+        cap.release()
+        del ring
+        shm.close()
+
+
+class _Worker:
+
+    def __init__(self, shm, ring, free, ready, process):
+        self.shm = shm
+        self.ring = ring
+        self.free = free      # Free ring slots
+        self.ready = ready    # (segment index, slot) of decoded frames, in order
+        self.process = process
+
+
+class GopDecoder:
+    """Decodes a video file with `workers` processes and returns its frames
+    in order, in the given pixel format ("BGR" or "GRAY")."""
+
+    def __init__(self, path: str, workers: int, fmt: Optional[str] = None,
+                 name: str = "flowdip.gop", memory_mb: int = DEFAULT_MEMORY_MB):
+        self.path = path
+        self.workers = max(1, workers)
+        self.name = name  # Prefix of the shared memory rings
+        self.memory_mb = memory_mb
+        self.keyframes, self.frame_count = scan_keyframes(path)
+        if self.frame_count == 0:
+            raise ValueError(f"Video file at '{path}' contains no readable frames.")
+
+        cap = cv2.VideoCapture(path)
+        self.width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        self.height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        cap.release()
+
+        self.fmt = fmt
+        self.segments: List[Tuple[int, int]] = []
+        self._workers: List[_Worker] = []
+        self._held = deque()  # Workers of the frames handed out, oldest first
+        self.first_segment = 0
+        self.segment = 0      # Segment being read
+        self.next_index = 0   # Next frame handed to the consumer
+        self._skip = 0        # Frames to drop after a seek inside a segment
+        self._start(0)
+
+    def __len__(self) -> int:
+        return self.frame_count
+
+    def _start(self, index: int):
+        self._stop()
+        shape = (self.height, self.width) if self.fmt == "GRAY" else (self.height, self.width, 3)
+        frame_bytes = int(np.prod(shape))
+        slots = max(HOLD_FRAMES + 2, self.memory_mb * 2 ** 20 // (self.workers * frame_bytes))
+        self.segments = plan_segments(self.keyframes, self.frame_count, max(1, slots - HOLD_FRAMES - 1))
+        slots = min(slots, max(length for _, length in self.segments) + HOLD_FRAMES + 1)
+
+        index = max(0, min(index, self.frame_count))
+        self.first_segment = self.segment = next(
+            (i for i, (start, length) in enumerate(self.segments) if index < start + length), len(self.segments))
+        self._skip = index - self.segments[self.segment][0] if self.segment < len(self.segments) else 0
+        self.next_index = index
+
+        # Spawned: forking the multithreaded backend could copy held locks
+        ctx = multiprocessing.get_context("spawn")
+        for w in range(self.workers):
+            assigned = [(i, start, length) for i, (start, length) in enumerate(self.segments)
+                        if i >= self.first_segment and (i - self.first_segment) % self.workers == w]
+            if not assigned:
+                break
+            shm = SharedMemory(name=f"{self.name}.{w}", create=True, size=slots * frame_bytes)
+            ring = np.ndarray((slots,) + shape, dtype=np.uint8, buffer=shm.buf)
+            free, ready = ctx.Semaphore(slots), ctx.Queue()
+            process = ctx.Process(target=_decode_segments, name=f"{self.name}.{w}", daemon=True,
+                                  args=(self.path, self.fmt, shm.name, shape, np.uint8, slots,
+                                        assigned, free, ready))
+            process.start()
+            self._workers.append(_Worker(shm, ring, free, ready, process))
+
+    def _stop(self):
+        self._held.clear()
+        for worker in self._workers:
+            worker.process.terminate()
+            worker.process.join(timeout=1.0)
+            worker.ready.cancel_join_thread()
+            worker.ready.close()
+            worker.ring = None
+            try:
+                worker.shm.close()
+            except BufferError:
+                pass  # Frames still referenced downstream, unmapped once released
+            worker.shm.unlink()
+        self._workers = []
+
+    def _get(self, worker: _Worker):
+        while True:
+            try:
+                return worker.ready.get(timeout=_POLL_S)
+            except queue.Empty:
+                if not worker.process.is_alive() and worker.ready.empty():
+                    raise ValueError(f"Decoder process {worker.process.name} exited unexpectedly.")
+
+    def read(self) -> Optional[np.ndarray]:
+        """Returns the next frame in order, or None at the end of the file."""
+        while self.segment < len(self.segments):
+            worker = self._workers[(self.segment - self.first_segment) % len(self._workers)]
+            index, slot = self._get(worker)
+            if index < 0:
+                raise ValueError(f"Decoder process {worker.process.name} failed: {slot}")
+            if slot < 0:
+                self.segment += 1
+                continue
+
+            # The slot of the oldest frame handed out can be reused
+            self._held.append(worker)
+            if len(self._held) > HOLD_FRAMES:
+                self._held.popleft().free.release()
+
+            if self._skip:
+                self._skip -= 1
+                continue
+            self.next_index += 1
+            return worker.ring[slot]
+        return None
+
+    def seek(self, index: int):
+        """Restarts the workers from the given frame index."""
+        self._start(index)
+
+    def set_format(self, fmt: Optional[str]):
+        """Restarts the workers at the current position in another format."""
+        if fmt != self.fmt:
+            self.fmt = fmt
+            self._start(self.next_index)
+
+    def stats(self) -> dict:
+        try:
+            depth = sum(worker.ready.qsize() for worker in self._workers)
+        except NotImplementedError:  # macOS
+            depth = 0
+        return {"prefetch_depth": depth, "decode_workers": len(self._workers)}
+
+    def close(self):
+        self._stop()
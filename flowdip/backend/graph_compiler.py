@@ -0,0 +1,195 @@
+from collections import deque
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Tuple
+
+from flowdip.backend.flowdip_be_base import ConnectionState, Input, NodeSchedule, Output
+
+# pixel_formats loads OpenCV: imported on the first compilation, not with the backend
+if TYPE_CHECKING:
+    from flowdip.backend.pixel_formats import FormatConversion
+
+# =============================================================================
+#  Graph compilation
+# =============================================================================
+#
+#  Run by the backend manager whenever the topology or a parameter changes.
+#  Every link is validated once here:
+#    - datatypes: the output and input must share a datatype ("Frame"...)
+#    - colorspaces: inputs may restrict the colorspaces they accept (e.g.
+#      Otsu threshold needs GRAY frames). Colorspaces are propagated along
+#      the graph in topological order; they also fix the channel count, so
+#      a 3 channel frame can't reach a single channel input.
+#    - pixel formats: outputs that can produce several formats (e.g. a video
+#      decoder, BGR or its luma plane) get the cheapest one every consumer
+#      explicitly accepts, or their default one. A conversion is inserted on
+#      the links whose format is still not accepted, when one exists.
+#  The result is frozen into a NodeSchedule per node (critical dependencies,
+#  successors, blocked flag) and a tuple of valid targets per output, so the
+#  per-frame path only iterates over precomputed tuples.
+# =============================================================================
+
+
+@dataclass
+class ExecutionPlan:
+    order: Tuple[Any, ...] = ()  # Nodes in topological order
+    schedules: Dict[Any, NodeSchedule] = field(default_factory=dict)
+    colorspaces: Dict[Output, Optional[str]] = field(default_factory=dict)
+    formats: Dict[Output, str] = field(default_factory=dict)  # Negotiated outputs only
+    conversions: Dict[Input, "FormatConversion"] = field(default_factory=dict)
+    errors: List[str] = field(default_factory=list)
+
+
+def link_state(input_port: Input, colorspace: Optional[str]) -> ConnectionState:
+    """Validates the link of an input given the colorspace of its output."""
+    state = input_port.check_connection()
+    if state != ConnectionState.CONNECTED_OK:
+        return state
+    if input_port.colorspaces and colorspace is not None and colorspace not in input_port.colorspaces:
+        return ConnectionState.INCOMPATIBLE_CONNECTION
+    return ConnectionState.CONNECTED_OK
+
+
+def _combine(verdicts: list) -> Optional[bool]:
+    if False in verdicts:
+        return False
+    if verdicts and all(verdicts):
+        return True
+    return None
+
+
+def _format_verdict(input_port: Input, fmt: str, visiting: frozenset) -> Optional[bool]:
+    """Whether the consumers reached through an input explicitly accept a
+    format (True), reject it (False) or take whatever they get (None).
+    Formats are followed through the nodes that keep them (Blur, Resize...)."""
+    if input_port.check_connection() != ConnectionState.CONNECTED_OK:
+        return None
+    if input_port.colorspaces:
+        return fmt in input_port.colorspaces
+
+    node = input_port.node
+    if node in visiting:
+        return None
+    verdicts = []
+    for output_port in node.dip_outputs:
+        if node.output_colorspace(output_port, fmt) != fmt:
+            verdicts.append(None)  # The node produces its own format
+            continue
+        for target in output_port.inputs:
+            verdicts.append(_format_verdict(target, fmt, visiting | {node}))
+    return _combine(verdicts)
+
+
+def negotiate_format(output_port: Output) -> Optional[str]:
+    """Picks the format of a negotiable output (None if it isn't one)."""
+    from flowdip.backend.pixel_formats import cheapest_format
+
+    if not output_port.formats:
+        return None
+    accepted = [fmt for fmt in output_port.formats
+                if _combine([_format_verdict(input_port, fmt, frozenset({output_port.node}))
+                             for input_port in output_port.inputs])]
+    return cheapest_format(accepted) if accepted else output_port.formats[0]
+
+
+def topological_order(nodes: Iterable) -> Tuple[list, list]:
+    """Returns (ordered nodes, nodes in cycles)."""
+    nodes = list(nodes)
+    members = set(nodes)
+    indegree = {node: 0 for node in nodes}
+    for node in nodes:
+        for input_port in node.dip_inputs:
+            if input_port.output is not None and input_port.output.node in members:
+                indegree[node] += 1
+
+    ready = deque(node for node in nodes if indegree[node] == 0)
+    order = []
+    while ready:
+        node = ready.popleft()
+        order.append(node)
+        for output_port in node.dip_outputs:
+            for input_port in output_port.inputs:
+                successor = input_port.node
+                if successor in indegree:
+                    indegree[successor] -= 1
+                    if indegree[successor] == 0:
+                        ready.append(successor)
+
+    ordered = set(order)
+    return order, [node for node in nodes if node not in ordered]
+
+
+def compile_graph(nodes: Iterable) -> ExecutionPlan:
+    """Validates every link and installs the schedules of the given nodes.
+    Fusion (see fusion.py) must be planned first: successors follow the
+    nodes' downstream_outputs()."""
+    from flowdip.backend.pixel_formats import find_conversion, install_transform
+
+    order, cyclic = topological_order(nodes)
+    plan = ExecutionPlan(order=tuple(order))
+    for node in cyclic:
+        plan.errors.append(f"Node '{node.flowdip_name}' is part of a cycle and will not run.")
+
+    # Negotiate pixel formats ---------------------------------------------------
+    for node in order + cyclic:
+        for output_port in node.dip_outputs:
+            output_port.pixel_format = negotiate_format(output_port)  # Read by the node thread
+            if output_port.pixel_format is not None:
+                plan.formats[output_port] = output_port.pixel_format
+
+    # Validate links and propagate colorspaces --------------------------------
+    for node in order + cyclic:
+        input_colorspace = None
+        for input_port in node.dip_inputs:
+            colorspace = plan.colorspaces.get(input_port.output) if input_port.output else None
+            conversion = None
+            if (colorspace is not None and input_port.colorspaces
+                    and colorspace not in input_port.colorspaces
+                    and input_port.check_connection() == ConnectionState.CONNECTED_OK):
+                conversion = find_conversion(colorspace, input_port.colorspaces)
+                if conversion is not None:
+                    plan.conversions[input_port] = conversion
+                    colorspace = conversion.target
+            input_port.conversion = conversion
+            install_transform(input_port)
+            state = link_state(input_port, colorspace)
+            if state == ConnectionState.INCOMPATIBLE_CONNECTION:
+                plan.errors.append(
+                    f"Incompatible link {input_port.output.node.flowdip_name}.{input_port.output.name} "
+                    f"({colorspace or ', '.join(input_port.output.datatypes)}) -> "
+                    f"{node.flowdip_name}.{input_port.name}")
+            elif state == ConnectionState.CONNECTED_OK and input_colorspace is None:
+                input_colorspace = colorspace
+            if input_port.connection_state != state:
+                input_port.connection_state = state
+                node.update_port_state(state)
+
+        for output_port in node.dip_outputs:
+            plan.colorspaces[output_port] = node.output_colorspace(output_port, input_colorspace)
+
+    # Freeze schedules -----------------------------------------------------------
+    for node in order + cyclic:
+        for output_port in node.dip_outputs:
+            targets = [input_port for input_port in output_port.inputs
+                       if input_port.connection_state == ConnectionState.CONNECTED_OK]
+            # Grouped by transform, so update_port_data transforms once per variant
+            targets.sort(key=lambda input_port: input_port.transform.key if input_port.transform else "")
+            output_port.targets = tuple(targets)
+
+    for node in order + cyclic:
+        critical = [input_port for input_port in node.dip_inputs if input_port.critical]
+        successors = []
+        for output_port in node.downstream_outputs():
+            for input_port in output_port.targets:
+                if input_port.node not in successors:
+                    successors.append(input_port.node)
+
+        schedule = NodeSchedule(
+            dependencies=tuple(critical),
+            successors=tuple(successors),
+            blocked=node in cyclic or any(input_port.connection_state != ConnectionState.CONNECTED_OK
+                                          for input_port in critical),
+        )
+        plan.schedules[node] = schedule
+        node.schedule = schedule  # Single attribute swap, safe while running
+
+    return plan
@@ -0,0 +1,124 @@
+import os
+import re
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import cv2
+import numpy as np
+
+# =============================================================================
+#  Image sequence reader
+# =============================================================================
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp", ".tif", ".tiff", ".webp")
+
+# Files are read with a single large read; posix_fadvise (when available)
+# tells the kernel to prefetch the whole file sequentially.
+_FADVISE = getattr(os, "posix_fadvise", None)
+
+
+def _natural_key(filename: str):
+    """Sort key so that 'frame_10.png' comes after 'frame_9.png'."""
+    return [int(tok) if tok.isdigit() else tok.lower() for tok in re.split(r"(\d+)", filename)]
+
+
+def list_image_files(folder: str) -> List[str]:
+    files = [f for f in os.listdir(folder) if f.lower().endswith(IMAGE_EXTENSIONS)]
+    return [os.path.join(folder, f) for f in sorted(files, key=_natural_key)]
+
+
+def read_file(path: str) -> np.ndarray:
+    """Reads a whole file with one sequential read into a fresh buffer."""
+    with open(path, "rb", buffering=0) as f:
+        size = os.fstat(f.fileno()).st_size
+        if _FADVISE is not None:
+            _FADVISE(f.fileno(), 0, size, os.POSIX_FADV_SEQUENTIAL)
+        buf = np.empty(size, dtype=np.uint8)
+        view = memoryview(buf)
+        read = 0
+        while read < size:
+            n = f.readinto(view[read:])
+            if not n:
+                break
+            read += n
+    return buf[:read]
+
+
+class ImageSequenceReader:
+    """Decodes a folder of images ahead of the consumer with a thread pool.
+
+    cv2.imdecode releases the GIL, so decoding scales with the number of
+    workers. Decoded frames are kept in a bounded reorder buffer (at most
+    `prefetch` frames in flight) and always handed out in file order.
+    """
+
+    def __init__(self, folder: str, workers: Optional[int] = None, prefetch: Optional[int] = None):
+        self.files = list_image_files(folder)
+        if not self.files:
+            raise ValueError(f"No image files found in '{folder}'.")
+
+        self.workers = workers or os.cpu_count() or 1
+        self.prefetch = max(1, prefetch or 2 * self.workers)
+        self.executor = ThreadPoolExecutor(max_workers=self.workers,
+                                           thread_name_prefix="flowdip-imgseq")
+
+        self.next_index = 0      # Next frame handed to the consumer
+        self.submit_index = 0    # Next frame submitted for decoding
+        self.pending: Dict[int, Future] = {}
+
+        # Decode throughput over a sliding window of completion times
+        self._decode_times = deque(maxlen=64)
+        self._decoded_bytes = deque(maxlen=64)
+
+    def __len__(self) -> int:
+        return len(self.files)
+
+    def _decode(self, index: int) -> np.ndarray:
+        data = read_file(self.files[index])
+        frame = cv2.imdecode(data, cv2.IMREAD_COLOR)
+        if frame is None:
+            raise ValueError(f"Failed to decode image '{self.files[index]}'.")
+        self._decode_times.append(time.perf_counter())
+        self._decoded_bytes.append(data.nbytes)
+        return frame
+
+    def _fill(self):
+        """Keeps the reorder buffer full."""
+        while self.submit_index < len(self.files) and len(self.pending) < self.prefetch:
+            self.pending[self.submit_index] = self.executor.submit(self._decode, self.submit_index)
+            self.submit_index += 1
+
+    def read(self) -> Optional[np.ndarray]:
+        """Returns the next frame in order, or None at the end of the sequence."""
+        if self.next_index >= len(self.files):
+            return None
+
+        self._fill()
+        future = self.pending.pop(self.next_index)
+        self.next_index += 1
+        self._fill()
+        return future.result()
+
+    def seek(self, index: int):
+        """Restarts decoding from the given frame index."""
+        for future in self.pending.values():
+            future.cancel()
+        self.pending.clear()
+        self.next_index = self.submit_index = max(0, min(index, len(self.files)))
+
+    def stats(self) -> dict:
+        """Current prefetch depth (decoded frames waiting) and decode throughput."""
+        depth = sum(1 for f in self.pending.values() if f.done())
+        fps = mbps = 0.0
+        if len(self._decode_times) > 1:
+            span = self._decode_times[-1] - self._decode_times[0]
+            if span > 0:
+                fps = (len(self._decode_times) - 1) / span
+                mbps = sum(list(self._decoded_bytes)[1:]) / span / 1e6
+        return {"prefetch_depth": depth, "decode_fps": fps, "decode_mbps": mbps}
+
+    def close(self):
+        self.seek(0)
+        self.executor.shutdown(wait=False, cancel_futures=True)
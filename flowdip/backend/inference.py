@@ -0,0 +1,290 @@
+from typing import NamedTuple, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from flowdip.backend.flowdip_be_base import InferencedTask
+
+# =============================================================================
+#  CPU inference helpers
+# =============================================================================
+#
+#  Models are ONNX files run with onnxruntime when it is installed, or with
+#  OpenCV DNN otherwise. Frames are letterboxed into a preallocated NCHW
+#  float32 batch tensor and results are returned as NumPy structured arrays
+#  (one row per detection / prediction), never as lists of Python objects.
+#  Segmentation class maps are stacked into one flat uint8 buffer, indexed by
+#  a SEGMENTATION_DTYPE row per frame (SegmentationResults).
+# =============================================================================
+
+DETECTION_DTYPE = np.dtype([
+    ("source", "u2"),     # Input index of the node the frame came from
+    ("frame", "u4"),      # Number of the frame among those received by the node
+    ("class_id", "i4"),
+    ("score", "f4"),
+    ("x1", "f4"), ("y1", "f4"), ("x2", "f4"), ("y2", "f4"),  # Frame pixels
+])
+
+CLASSIFICATION_DTYPE = np.dtype([
+    ("source", "u2"),
+    ("frame", "u4"),
+    ("class_id", "i4"),
+    ("score", "f4"),
+])
+
+SEGMENTATION_DTYPE = np.dtype([
+    ("source", "u2"),
+    ("frame", "u4"),
+    ("offset", "u8"),  # Start of the class map in SegmentationResults.maps
+    ("height", "u4"), ("width", "u4"),  # Class map size, at model resolution
+])
+
+LETTERBOX_PAD_VALUE = 114
+
+
+class SegmentationResults(NamedTuple):
+    """Class maps of a set of frames, stacked in one buffer."""
+    rows: np.ndarray  # SEGMENTATION_DTYPE, one row per frame
+    maps: np.ndarray  # uint8, the class maps of the rows one after the other
+
+    def class_map(self, index: int) -> np.ndarray:
+        """(height, width) view of the class map of rows[index]."""
+        row = self.rows[index]
+        offset, height, width = int(row["offset"]), int(row["height"]), int(row["width"])
+        return self.maps[offset:offset + height * width].reshape(height, width)
+
+
+class InferenceModel:
+    """Thin wrapper over onnxruntime / OpenCV DNN with a common run()."""
+
+    def __init__(self, model_path: str, backend: str = "auto"):
+        self.model_path = model_path
+        self.session = None
+        self.net = None
+        self.fixed_batch: Optional[int] = None  # Set if the model batch size is static
+
+        if backend in ("auto", "onnxruntime"):
+            try:
+                import onnxruntime as ort
+            except ImportError:
+                if backend == "onnxruntime":
+                    raise ValueError("onnxruntime is not installed.")
+            else:
+                self.session = ort.InferenceSession(model_path, providers=["CPUExecutionProvider"])
+                model_input = self.session.get_inputs()[0]
+                self.input_name = model_input.name
+                if isinstance(model_input.shape[0], int):
+                    self.fixed_batch = model_input.shape[0]
+                self.backend = "onnxruntime"
+                return
+
+        self.net = cv2.dnn.readNetFromONNX(model_path)
+        self.net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
+        self.net.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
+        self.output_names = self.net.getUnconnectedOutLayersNames()
+        self.backend = "opencv"
+
+    def run(self, tensor: np.ndarray) -> np.ndarray:
+        """Runs the model on a NCHW batch and returns its first output."""
+        if self.fixed_batch and tensor.shape[0] != self.fixed_batch:
+            # Static batch models are fed in chunks
+            chunks = [self.run(tensor[i:i + self.fixed_batch])
+                      for i in range(0, tensor.shape[0], self.fixed_batch)]
+            return np.concatenate(chunks)
+
+        if self.session is not None:
+            return self.session.run(None, {self.input_name: tensor})[0]
+
+        self.net.setInput(tensor)
+        return self.net.forward(self.output_names[0])
+
+
+class LetterboxBatch:
+    """Preallocated batch tensor filled with letterboxed, normalized frames.
+
+    Each frame is resized (keeping its aspect ratio) into a padded uint8
+    canvas, then converted BGR->RGB, HWC->CHW and scaled to float32 in a
+    single vectorized pass written directly into its slot of the tensor.
+    """
+
+    def __init__(self, max_batch: int, input_size: Tuple[int, int],
+                 mean: Tuple[float, float, float] = (0.0, 0.0, 0.0),
+                 std: Tuple[float, float, float] = (1.0, 1.0, 1.0)):
+        self.max_batch = max_batch
+        self.input_h, self.input_w = input_size
+        self.tensor = np.empty((max_batch, 3, self.input_h, self.input_w), dtype=np.float32)
+        self.canvas = np.full((self.input_h, self.input_w, 3), LETTERBOX_PAD_VALUE, dtype=np.uint8)
+
+        # Per channel x * scale + offset, equivalent to (x / 255 - mean) / std
+        std = np.asarray(std, dtype=np.float32)
+        self.scale = (1.0 / (255.0 * std)).reshape(3, 1, 1)
+        self.offset = (-np.asarray(mean, dtype=np.float32) / std).reshape(3, 1, 1)
+        self.normalize_offset = bool(np.any(self.offset))
+
+        # Letterbox geometry of each slot, to map results back to the frame
+        self.ratio = np.ones(max_batch, dtype=np.float32)
+        self.pad_x = np.zeros(max_batch, dtype=np.float32)
+        self.pad_y = np.zeros(max_batch, dtype=np.float32)
+        self.sources = np.zeros(max_batch, dtype=np.uint16)
+        self.frame_ids = np.zeros(max_batch, dtype=np.uint32)
+        self.frame_sizes = np.zeros((max_batch, 2), dtype=np.int32)  # (h, w)
+        self.size = 0
+
+        self._canvas_geometry = None
+
+    def add(self, frame: np.ndarray, source: int, frame_id: int = 0) -> int:
+        """Letterboxes a frame into the next free slot and returns its index."""
+        slot = self.size
+        h, w = frame.shape[:2]
+        ratio = min(self.input_h / h, self.input_w / w)
+        new_w, new_h = max(1, round(w * ratio)), max(1, round(h * ratio))
+        pad_x, pad_y = (self.input_w - new_w) // 2, (self.input_h - new_h) // 2
+
+        if self._canvas_geometry != (new_w, new_h):
+            # Only the padding changes with the geometry, the image area is
+            # fully overwritten by every resize
+            self.canvas.fill(LETTERBOX_PAD_VALUE)
+            self._canvas_geometry = (new_w, new_h)
+
+        if frame.ndim == 2:
+            frame = cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR)
+        cv2.resize(frame, (new_w, new_h),
+                   dst=self.canvas[pad_y:pad_y + new_h, pad_x:pad_x + new_w],
+                   interpolation=cv2.INTER_LINEAR)
+
+        # BGR->RGB, HWC->CHW and scaling in one pass into the tensor slot
+        np.multiply(self.canvas[:, :, ::-1].transpose(2, 0, 1), self.scale,
+                    out=self.tensor[slot], casting="unsafe")
+        if self.normalize_offset:
+            np.add(self.tensor[slot], self.offset, out=self.tensor[slot])
+
+        self.ratio[slot] = ratio
+        self.pad_x[slot] = pad_x
+        self.pad_y[slot] = pad_y
+        self.sources[slot] = source
+        self.frame_ids[slot] = frame_id
+        self.frame_sizes[slot] = (h, w)
+        self.size += 1
+        return slot
+
+    def full(self) -> bool:
+        return self.size >= self.max_batch
+
+    def batch(self) -> np.ndarray:
+        return self.tensor[:self.size]
+
+    def clear(self):
+        self.size = 0
+
+
+# =============================================================================
+#  Post-processing
+# =============================================================================
+
+def decode_detections(output: np.ndarray, batch: LetterboxBatch,
+                      score_threshold: float, nms_threshold: float) -> np.ndarray:
+    """Decodes YOLO style outputs, either (N, 4 + C, A) (v8+) or
+    (N, A, 5 + C) (v5, with objectness) into a DETECTION_DTYPE array."""
+    results = []
+    for slot in range(batch.size):
+        pred = output[slot]
+        if pred.shape[0] < pred.shape[1]:
+            pred = pred.T  # (4 + C, A) -> (A, 4 + C)
+            boxes, class_scores = pred[:, :4], pred[:, 4:]
+        else:
+            boxes, class_scores = pred[:, :4], pred[:, 5:] * pred[:, 4:5]
+
+        class_ids = class_scores.argmax(axis=1)
+        scores = class_scores[np.arange(len(class_ids)), class_ids]
+        keep = scores >= score_threshold
+        if not np.any(keep):
+            continue
+        boxes, scores, class_ids = boxes[keep], scores[keep], class_ids[keep]
+
+        # (cx, cy, w, h) in model space -> (x, y, w, h) in frame space
+        ratio = batch.ratio[slot]
+        xywh = np.empty_like(boxes)
+        xywh[:, 0] = (boxes[:, 0] - boxes[:, 2] / 2 - batch.pad_x[slot]) / ratio
+        xywh[:, 1] = (boxes[:, 1] - boxes[:, 3] / 2 - batch.pad_y[slot]) / ratio
+        xywh[:, 2:] = boxes[:, 2:] / ratio
+
+        # Class aware NMS in one call: boxes of different classes never suppress each other
+        kept = cv2.dnn.NMSBoxesBatched(xywh.tolist(), scores.tolist(), class_ids.tolist(),
+                                       score_threshold, nms_threshold)
+        kept = np.asarray(kept, dtype=np.int64).reshape(-1)
+
+        h, w = batch.frame_sizes[slot]
+        rows = np.empty(len(kept), dtype=DETECTION_DTYPE)
+        rows["source"] = batch.sources[slot]
+        rows["frame"] = batch.frame_ids[slot]
+        rows["class_id"] = class_ids[kept]
+        rows["score"] = scores[kept]
+        rows["x1"] = np.clip(xywh[kept, 0], 0, w)
+        rows["y1"] = np.clip(xywh[kept, 1], 0, h)
+        rows["x2"] = np.clip(xywh[kept, 0] + xywh[kept, 2], 0, w)
+        rows["y2"] = np.clip(xywh[kept, 1] + xywh[kept, 3], 0, h)
+        results.append(rows)
+
+    if not results:
+        return np.empty(0, dtype=DETECTION_DTYPE)
+    return np.concatenate(results)
+
+
+def decode_classifications(output: np.ndarray, batch: LetterboxBatch, top_k: int = 1) -> np.ndarray:
+    """Top-k classes of each frame as a CLASSIFICATION_DTYPE array."""
+    logits = output[:batch.size].reshape(batch.size, -1)
+    top_k = min(top_k, logits.shape[1])
+    top = np.argpartition(-logits, top_k - 1, axis=1)[:, :top_k]
+    top_scores = np.take_along_axis(logits, top, axis=1)
+    order = np.argsort(-top_scores, axis=1)
+
+    rows = np.empty(batch.size * top_k, dtype=CLASSIFICATION_DTYPE)
+    rows["source"] = np.repeat(batch.sources[:batch.size], top_k)
+    rows["frame"] = np.repeat(batch.frame_ids[:batch.size], top_k)
+    rows["class_id"] = np.take_along_axis(top, order, axis=1).reshape(-1)
+    rows["score"] = np.take_along_axis(top_scores, order, axis=1).reshape(-1)
+    return rows
+
+
+def decode_segmentation(output: np.ndarray, batch: LetterboxBatch) -> SegmentationResults:
+    """Per-frame uint8 class maps (N, C, H, W logits), cropped from the
+    letterbox padding. Maps stay at model resolution."""
+    class_maps = output[:batch.size].argmax(axis=1).astype(np.uint8)
+    out_h, out_w = class_maps.shape[1:]
+    sy, sx = out_h / batch.input_h, out_w / batch.input_w
+
+    rows = np.empty(batch.size, dtype=SEGMENTATION_DTYPE)
+    rows["source"] = batch.sources[:batch.size]
+    rows["frame"] = batch.frame_ids[:batch.size]
+    crops = []
+    for slot in range(batch.size):
+        h, w = batch.frame_sizes[slot] * batch.ratio[slot]
+        y0, x0 = int(batch.pad_y[slot] * sy), int(batch.pad_x[slot] * sx)
+        crops.append(class_maps[slot, y0:y0 + int(h * sy), x0:x0 + int(w * sx)])
+        rows["height"][slot], rows["width"][slot] = crops[-1].shape
+
+    sizes = rows["height"].astype(np.uint64) * rows["width"]
+    rows["offset"] = np.cumsum(sizes) - sizes
+    maps = np.empty(int(sizes.sum()), dtype=np.uint8)
+    for crop, offset in zip(crops, rows["offset"]):
+        maps[offset:offset + crop.size].reshape(crop.shape)[:] = crop
+    return SegmentationResults(rows, maps)
+
+
+def concatenate_results(results: list):
+    """Merges the results of several batches (arrays or SegmentationResults)."""
+    if not isinstance(results[0], SegmentationResults):
+        return np.concatenate(results)
+    rows = np.concatenate([result.rows for result in results])
+    sizes = np.cumsum([0] + [result.maps.size for result in results[:-1]], dtype=np.uint64)
+    rows["offset"] += np.repeat(sizes, [len(result.rows) for result in results])
+    return SegmentationResults(rows, np.concatenate([result.maps for result in results]))
+
+
+def postprocess(task: InferencedTask, output: np.ndarray, batch: LetterboxBatch,
+                score_threshold: float = 0.25, nms_threshold: float = 0.45, top_k: int = 1):
+    if task == InferencedTask.OBJECT_DETECTION:
+        return decode_detections(output, batch, score_threshold, nms_threshold)
+    if task == InferencedTask.IMAGE_CLASSIFICATION:
+        return decode_classifications(output, batch, top_k)
+    return decode_segmentation(output, batch)
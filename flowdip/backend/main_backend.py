@@ -1,111 +1,502 @@
-from hmac import new
-import logging
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
 from threading import Thread
 from multiprocessing import Queue
-from flowdip import Request, RequestType, Event, EventType, CreateNodePayload, DeleteNodePayload
-from typing import Set
+from flowdip import tracing
+from flowdip import (
+    Request, RequestType, Event, EventType, CreateNodePayload,
+    DeleteNodePayload, ConnectPortsPayload, NodeMetricsPayload, BatchPayload,
+    RunNodePayload, RequestDonePayload, get_logger
+)
+from typing import TYPE_CHECKING, Dict, Optional, Set
 from flowdip.backend.flowdip_be_base import BackEndFlowDiPNode
+from flowdip.backend.graph_compiler import ExecutionPlan, compile_graph
+from flowdip.backend.metrics import MetricsPublisher
+from flowdip.backend.quality import QUALITY_ENABLED, QualityController
+from flowdip.registry import get_registry
+
+# Fusion, remote previews, sharding and GOP decoding load OpenCV: they are
+# imported by the code paths using them, not when the backend starts
+if TYPE_CHECKING:
+    from flowdip.backend.remote_preview import PreviewEncoder
+    from flowdip.backend.sharding import ShardContext
 
 # ----------------------------------------------------------------------
-# Logger configuration
+# Logger configuration (levels: FLOWDIP_LOG, see flowdip/logs.py)
 # ----------------------------------------------------------------------
-logger = logging.getLogger("Backend Manager")
-logger.setLevel(logging.DEBUG)  # You can adjust this to INFO, WARNING, etc.
-
-# Add a handler with formatting if it does not already exist
-if not logger.handlers:
-    ch = logging.StreamHandler()
-    ch.setLevel(logging.DEBUG)
-    formatter = logging.Formatter(
-        "[%(asctime)s] [%(name)s] [%(levelname)s] %(message)s"
-    )
-    ch.setFormatter(formatter)
-    logger.addHandler(ch)
+logger = get_logger("Backend Manager")
+
+# Threads of the control loop for blocking request work (file opens, model loads...)
+CONTROL_WORKERS = int(os.environ.get("FLOWDIP_CONTROL_WORKERS", "4"))
+
+# Backend processes (see sharding.py)
+SHARDS = max(1, int(os.environ.get("FLOWDIP_SHARDS", "1")))
+SHARD_PARAM = "shard"  # other_params key of user pins
 
 # ----------------------------------------------------------------------
 # Back End Manager
 # ----------------------------------------------------------------------
 class BackEndManager(Thread):
-    """Handles the backend request queue."""
+    """Handles the backend request queue.
+
+    Requests are handled by an asyncio loop in the manager thread, each one
+    in its own task. Requests on the same nodes keep their order (see
+    submit), the others run concurrently: blocking work (node
+    construction, parameter updates opening files or loading models, node
+    shutdown) goes to a thread pool, so a slow node doesn't hold back the
+    requests of the others. Graph changes and plan compilation stay on the
+    loop thread. Requests with a request_id are answered by a REQUEST_DONE
+    event once applied.
+    """
 
-    def __init__(self, req_queue: Queue, event_queue: Queue):
+    def __init__(self, req_queue: Queue, event_queue: Queue, fusion: Optional[bool] = None,
+                 metrics_interval: float = 1.0, adaptive_quality: bool = QUALITY_ENABLED,
+                 remote_preview: Optional["PreviewEncoder"] = None, shards: int = 1,
+                 shard_context: Optional["ShardContext"] = None, control_workers: int = CONTROL_WORKERS):
         super().__init__()
         self.req_queue = req_queue
         self.event_queue = event_queue
         self._running = True
         self.nodes: Set[BackEndFlowDiPNode] = set()
-        self.logger = logger  # Use the global logger defined above
+        self.nodes_by_name: Dict[str, BackEndFlowDiPNode] = {}
+        # Use the global logger defined above, or a child of it in shard workers
+        self.logger = logger if shard_context is None else get_logger(f"Backend Manager.shard{shard_context.index}")
+        self.fusion = fusion  # Fuse chains of elementwise nodes (None: FLOWDIP_FUSION)
+        self.plan = ExecutionPlan()
+        self.metrics_publisher = MetricsPublisher(self, metrics_interval)
+        # Degrades analytics branches when nodes can't keep up with paced sources
+        self.quality = QualityController(logger=self.logger) if adaptive_quality else None
+        # Set when the frontend is remote: previews are sent compressed instead of shared
+        self.remote_preview = remote_preview
+        # Cross-shard data plane, set in sharded backends (see sharding.py)
+        self.shard_context = shard_context
+        # Set on the facade of a sharded backend: places nodes and forwards their requests
+        self.router = None
+        if shards > 1:
+            from flowdip.backend.sharding import ShardRouter
+            self.router = ShardRouter(self, shards)
+        # Control loop, see run
+        self.control_workers = control_workers
+        self.executor: Optional[ThreadPoolExecutor] = None  # Blocking work of the requests
+        self._tasks: Set[asyncio.Task] = set()
+        self._node_tails: Dict[str, asyncio.Future] = {}  # Completion of the last request on each node
 
     def run(self):
         self.logger.info("Backend Manager started.")
-        while self._running:
-            req = self.req_queue.get()
-            self.logger.debug(f"Received request: {req}")
-            if req.request_type == RequestType.SHUTDOWN:
-                self.logger.info("Shutdown request received. Stopping manager.")
-                self._running = False
-            else:
-                self.handle_request(req)
+        if self.router is not None:
+            self.router.start()
+        if self.shard_context is not None:
+            self.shard_context.start(self)
+        self.metrics_publisher.start()
+        asyncio.run(self._serve())
+        self.metrics_publisher.stop()
+        self.stop_nodes()
+        if self.router is not None:
+            self.router.stop()
+        if self.shard_context is not None:
+            self.shard_context.stop()
+        # Every shard writes its own file
+        label = "backend" if self.shard_context is None else f"backend-shard{self.shard_context.index}"
+        trace_path = tracing.dump(label)
+        if trace_path:
+            self.logger.info(f"Execution trace written to {trace_path}")
         self.logger.info("Backend Manager stopped.")
 
+    async def _serve(self):
+        loop = asyncio.get_running_loop()
+        self.executor = ThreadPoolExecutor(max_workers=self.control_workers,
+                                           thread_name_prefix="flowdip-control")
+        # The request queue is read by a thread of its own, never blocked by requests
+        receiver = ThreadPoolExecutor(max_workers=1, thread_name_prefix="flowdip-requests")
+        try:
+            while self._running:
+                req = await loop.run_in_executor(receiver, self.req_queue.get)
+                self.logger.debug("Received request: %s", req)
+                if req.request_type == RequestType.SHUTDOWN:
+                    self.logger.info("Shutdown request received. Stopping manager.")
+                    self._running = False
+                else:
+                    self.handle_request(req)
+            # Requests already started are completed
+            if self._tasks:
+                await asyncio.gather(*self._tasks, return_exceptions=True)
+        finally:
+            receiver.shutdown(wait=False)
+            self.executor.shutdown(wait=True)
+
     def handle_request(self, request: Request):
+        """Starts handling a request. Called in the control loop."""
+        if self.router is not None:
+            self.router.dispatch(request)
+        else:
+            self.submit(request)
+
+    def submit(self, request: Request):
+        """Schedules a request on the nodes of this process. Called in the
+        control loop. The request starts once the requests received before
+        it on the same nodes are done."""
+        loop = asyncio.get_running_loop()
+        names = self._request_nodes(request)
+        previous = {self._node_tails[name] for name in names if name in self._node_tails}
+        done = loop.create_future()
+        for name in names:
+            self._node_tails[name] = done
+        task = loop.create_task(self._run_request(request, previous, done, names))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run_request(self, request: Request, previous: Set[asyncio.Future],
+                           done: asyncio.Future, names: Set[str]):
+        error = None
+        try:
+            if previous:
+                await asyncio.wait(previous)
+            await self.handle_local_request(request)
+        except Exception as e:
+            error = str(e)
+            self.logger.error(error)
+        finally:
+            done.set_result(None)
+            for name in names:
+                if self._node_tails.get(name) is done:
+                    del self._node_tails[name]
+        self.request_done(request, error)
+
+    def request_done(self, request: Request, error: Optional[str] = None):
+        """Answers a request that carries a correlation id."""
+        if request.request_id:
+            self.publish_event(Event(
+                event_type=EventType.REQUEST_DONE,
+                payload=RequestDonePayload(request_id=request.request_id, error=error)
+            ))
+
+    async def _blocking(self, func, *args):
+        """Runs blocking work in the executor of the control loop."""
+        return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+
+    @staticmethod
+    def _request_nodes(request: Request) -> Set[str]:
+        """Names of the nodes a request works on."""
+        payload = request.payload
+        if request.request_type == RequestType.BATCH:
+            return set().union(*(BackEndManager._request_nodes(sub) for sub in payload.requests))
+        if request.request_type in (RequestType.CONNECT_PORTS, RequestType.DISCONNECT_PORTS):
+            return {payload.output_flowdip_name, payload.input_flowdip_name}
+        if request.request_type in (RequestType.CREATE_NODE, RequestType.DELETE_NODE,
+                                    RequestType.RUN_NODE, RequestType.UPDATE_NODE_PARAMS):
+            return {payload.flowdip_name}
+        return set()
+
+    async def handle_local_request(self, request: Request):
+        """Applies a request to the nodes of this process."""
         req_type = request.request_type
         req_payload = request.payload
-        self.logger.debug(f"Handling request type: {req_type}, payload: {req_payload}")
+        self.logger.debug("Handling request type: %s, payload: %s", req_type, req_payload)
 
         if req_type == RequestType.CREATE_NODE:
-            self.create_node(req_payload)
+            await self.create_node(req_payload)
+
+        elif req_type == RequestType.DELETE_NODE:
+            await self.delete_node(req_payload)
+
+        elif req_type == RequestType.RUN_NODE:
+            self.run_node(req_payload)
+
+        elif req_type == RequestType.UPDATE_NODE_PARAMS:
+            node = self._require_node(req_payload.flowdip_name)
+            await self._blocking(node.update_params, req_payload.new_params)
+            self.logger.info(f"Node parameters updated: {node}")
+            # Parameters may change whether a node can be fused
+            self.update_execution_plan()
 
-        if req_type == RequestType.UPDATE_NODE_PARAMS:
-            for node in self.nodes:
-                if node.flowdip_name == req_payload.flowdip_name:
-                    node.update_params(req_payload.new_params)
-                    self.logger.info(f"Node parameters updated: {node}")
-                    break
+        elif req_type == RequestType.CONNECT_PORTS:
+            self.connect_ports(req_payload)
+
+        elif req_type == RequestType.DISCONNECT_PORTS:
+            self.disconnect_ports(req_payload)
+
+        elif req_type == RequestType.BATCH:
+            await self.apply_batch(req_payload)
+
+        else:
+            raise ValueError(f"Unsupported request type: {req_type.name}")
+
+    def update_execution_plan(self):
+        """Recomputes the execution plan after a topology or parameter change."""
+        from flowdip.backend.fusion import FUSION_ENABLED, plan_fusion
+
+        chains = plan_fusion(self.nodes, enabled=FUSION_ENABLED if self.fusion is None else self.fusion)
+        for chain in chains:
+            self.logger.info(f"Fused chain: {' -> '.join(node.flowdip_name for node in chain)}")
+        self.plan = compile_graph(self.nodes)
+        for output_port, fmt in self.plan.formats.items():
+            if fmt != output_port.formats[0]:
+                self.logger.info(f"Negotiated {fmt} on {output_port.node.flowdip_name}.{output_port.name}")
+        for input_port, conversion in self.plan.conversions.items():
+            self.logger.info(f"Inserted {conversion.name} conversion before "
+                             f"{input_port.node.flowdip_name}.{input_port.name}")
+        for error in self.plan.errors:
+            self.logger.warning(error)
+        if self.quality is not None:
+            self.quality.apply(self.nodes)
+        for node in self.nodes:
+            node.invalidate()  # Cached outputs may not match the new plan or parameters
+
+    def set_fusion(self, enabled: bool):
+        """Enables or disables operator fusion (useful to debug single nodes)."""
+        self.fusion = enabled
+        self.update_execution_plan()
 
     def publish_event(self, ev: Event):
+        if self.router is not None and ev.event_type == EventType.REQUEST_DONE:
+            ev = self.router.complete(ev)  # Answered once every shard applied its part
+            if ev is None:
+                return
         self.event_queue.put(ev)
 
-    def create_node(self, req_payload: CreateNodePayload):
-        # Unpack payload
-        node_class_name = req_payload.node_class_name
+    def publish_metrics(self, metrics: dict):
+        """Called by the metrics publisher thread once per interval."""
+        if self.quality is not None and metrics:
+            self.quality.update(list(self.nodes), metrics)
+        if self.remote_preview is not None:
+            self.remote_preview.adapt()
+        if self.router is not None:
+            metrics.update(self.router.take_metrics())
+            self.router.update_costs(metrics)
+        if metrics:
+            self.publish_event(Event(
+                event_type=EventType.NODE_METRICS,
+                payload=NodeMetricsPayload(metrics=metrics, interval=self.metrics_publisher.interval)
+            ))
+
+    async def create_node(self, req_payload: CreateNodePayload):
+        try:
+            # Constructors may open captures or load models
+            new_node = await self._blocking(self._instantiate_node, req_payload)
+        except (ValueError, ImportError, AttributeError, TypeError) as e:
+            raise ValueError(f"Cannot create node '{req_payload.flowdip_name}': {e}") from e
+
+        self._add_node(new_node)
+        self.update_execution_plan()
+        new_node.start()
+        self.logger.info(f"Node created and added: {new_node}")
+
+    def _instantiate_node(self, req_payload: CreateNodePayload) -> BackEndFlowDiPNode:
+        """Builds a node without starting its thread."""
+        node_type = req_payload.node_type
         flowdip_name = req_payload.flowdip_name
-        other_params = req_payload.other_params if req_payload.other_params else {}
+        other_params = dict(req_payload.other_params) if req_payload.other_params else {}
+        other_params.pop(SHARD_PARAM, None)  # Placement, handled by the router
 
-        self.logger.info(f"Creating node: class={node_class_name}, name={flowdip_name}")
+        self.logger.info(f"Creating node: type={node_type}, name={flowdip_name}")
+        if flowdip_name in self.nodes_by_name:
+            raise ValueError(f"Node '{flowdip_name}' already exists.")
 
+        # Imports the node module on first use
         node_class = None
-        for cls in BackEndFlowDiPNode.__subclasses__():
-            if cls.__name__ == node_class_name:
-                node_class = cls
-                new_node = node_class(flowdip_name=flowdip_name, **other_params, be_manager=self)
-                self.nodes.add(new_node)
-                new_node.start()
-                self.logger.info(f"Node created and added: {new_node}")
-                break
-
-        if node_class is None:
-            self.logger.error(f"Node class '{node_class_name}' not found among Base Node subclasses.")
-
-    def delete_node(self, req_payload: DeleteNodePayload):
+        if node_type.startswith("~"):  # Ring proxies of cross-shard links
+            from flowdip.backend.sharding import INTERNAL_NODES
+            node_class = INTERNAL_NODES.get(node_type)
+        node_class = node_class or get_registry().backend_class(node_type)
+        return node_class(flowdip_name=flowdip_name, **other_params, be_manager=self)
+
+    def _add_node(self, node: BackEndFlowDiPNode):
+        self.nodes.add(node)
+        self.nodes_by_name[node.flowdip_name] = node
+
+    def _remove_node(self, node: BackEndFlowDiPNode):
+        self.nodes.discard(node)
+        self.nodes_by_name.pop(node.flowdip_name, None)
+
+    async def apply_batch(self, req_payload: BatchPayload):
+        """Applies many requests as one operation (session load, paste...).
+
+        Node threads are started and the execution plan is rebuilt once,
+        after every request succeeded. If one fails, the nodes and links
+        added by the batch are removed again and ValueError is raised;
+        parameter updates of nodes that existed before the batch are not
+        reverted.
+        """
+        created = []
+        undo = []  # Callables reverting each applied change, in order
+        try:
+            for request in req_payload.requests:
+                req_type, payload = request.request_type, request.payload
+
+                if req_type == RequestType.CREATE_NODE:
+                    node = await self._blocking(self._instantiate_node, payload)
+                    self._add_node(node)
+                    created.append(node)
+                    undo.append(lambda node=node: self._remove_node(node))
+
+                elif req_type == RequestType.UPDATE_NODE_PARAMS:
+                    node = self._require_node(payload.flowdip_name)
+                    await self._blocking(node.update_params, payload.new_params)
+
+                elif req_type in (RequestType.CONNECT_PORTS, RequestType.DISCONNECT_PORTS):
+                    output_port, input_port = self._get_link_ports(payload)
+                    previous = input_port.output
+                    if req_type == RequestType.CONNECT_PORTS:
+                        input_port.connect(output_port)
+                    elif previous is output_port:
+                        input_port.disconnect()
+                    undo.append(lambda port=input_port, previous=previous:
+                                port.connect(previous) if previous is not None else port.disconnect())
+
+                else:
+                    raise ValueError(f"{req_type.name} requests cannot be batched.")
+
+        except Exception as e:
+            for action in reversed(undo):
+                action()
+            raise ValueError(f"Batch of {len(req_payload.requests)} requests failed, rolled back: {e}") from e
+
+        self.update_execution_plan()
+        for node in created:
+            node.start()
+        self.logger.info(f"Batch applied: {len(req_payload.requests)} requests, {len(created)} nodes created")
+
+    def get_node(self, flowdip_name: str) -> Optional[BackEndFlowDiPNode]:
+        return self.nodes_by_name.get(flowdip_name)
+
+    def _require_node(self, flowdip_name: str) -> BackEndFlowDiPNode:
+        node = self.nodes_by_name.get(flowdip_name)
+        if node is None:
+            raise ValueError(f"Node '{flowdip_name}' not found.")
+        return node
+
+    def _get_link_ports(self, req_payload: ConnectPortsPayload):
+        """Resolves the (output, input) backend ports of a link payload."""
+        out_node = self.get_node(req_payload.output_flowdip_name)
+        in_node = self.get_node(req_payload.input_flowdip_name)
+        if out_node is None or in_node is None:
+            raise ValueError(f"Cannot resolve link nodes: {req_payload}")
+
+        output_port = out_node.get_port(req_payload.output_port_name, is_input=False)
+        input_port = in_node.get_port(req_payload.input_port_name, is_input=True)
+        if output_port is None or input_port is None:
+            raise ValueError(f"Cannot resolve link ports: {req_payload}")
+
+        return output_port, input_port
+
+    def connect_ports(self, req_payload: ConnectPortsPayload):
+        output_port, input_port = self._get_link_ports(req_payload)
+        input_port.connect(output_port)
+        self.logger.info(f"Ports connected: {req_payload}")
+        self.update_execution_plan()
+
+    def disconnect_ports(self, req_payload: ConnectPortsPayload):
+        output_port, input_port = self._get_link_ports(req_payload)
+        if input_port.output is output_port:
+            input_port.disconnect()
+            self.logger.info(f"Ports disconnected: {req_payload}")
+            self.update_execution_plan()
+
+    def run_node(self, req_payload: RunNodePayload):
+        node = self._require_node(req_payload.flowdip_name)
+        self.logger.info(f"Transport {req_payload.command.name} on {req_payload.flowdip_name}")
+        node.transport(req_payload.command, req_payload.frames)
+
+    async def delete_node(self, req_payload: DeleteNodePayload):
         flowdip_name = req_payload.flowdip_name
 
         self.logger.info(f"Deleting node: name={flowdip_name}")
 
-        # Find and remove the node from the set
-        node_to_remove = None
-        for node in self.nodes:
-            if node.flowdip_name == flowdip_name:
-                node_to_remove = node
-                break
+        node_to_remove = self._require_node(flowdip_name)
+        self._remove_node(node_to_remove)
+        for input_port in node_to_remove.dip_inputs:
+            input_port.disconnect()
+        for output_port in node_to_remove.dip_outputs:
+            for input_port in list(output_port.inputs):
+                input_port.disconnect()
+        # No other node may trigger or wait for it once it is stopped
+        self.update_execution_plan()
+        await self._blocking(node_to_remove.stop)  # Joins the node thread
+        self.logger.info(f"Node deleted: {node_to_remove}")
+
+    def stop_nodes(self):
+        """Stops every node, sources first, and releases their resources."""
+        ordered = list(self.plan.order) + [node for node in self.nodes if node not in self.plan.schedules]
+        for node in ordered:
+            node.stop()
+        self.nodes.clear()
+        self.nodes_by_name.clear()
+        self.plan = ExecutionPlan()
+
+
+SHM_DIR = "/dev/shm"
+SHM_PREFIX = "flowdip."
 
-        if node_to_remove:
-            self.nodes.remove(node_to_remove)
-            self.logger.info(f"Node deleted: {node_to_remove}")
-        else:
-            self.logger.warning(f"Node not found for deletion: {flowdip_name}")
 
-def main(request_queue, response_queue):
-    be_manager = BackEndManager(request_queue, response_queue)
+def cleanup_orphaned_segments(shm_dir: str = SHM_DIR, prefix: str = SHM_PREFIX) -> int:
+    """Unlinks FlowDiP shared memory segments left by crashed sessions, i.e.
+    segments not mapped by any running process. Linux only. Returns the
+    number of segments removed."""
+    if not os.path.isdir(shm_dir) or not os.path.isdir("/proc"):
+        return 0
+
+    segments = [name for name in os.listdir(shm_dir) if name.startswith(prefix)]
+    if not segments:
+        return 0
+
+    mapped = set()
+    for pid in os.listdir("/proc"):
+        if not pid.isdigit():
+            continue
+        try:
+            with open(f"/proc/{pid}/maps", "r", encoding="utf-8", errors="replace") as f:
+                for line in f:
+                    if prefix in line:
+                        mapped.add(os.path.basename(line.split(maxsplit=5)[-1].strip()))
+        except OSError:
+            continue  # Process exited or not readable
+
+    removed = 0
+    for name in segments:
+        if name in mapped:
+            continue
+        try:
+            os.unlink(os.path.join(shm_dir, name))
+            removed += 1
+        except OSError as e:
+            logger.warning(f"Cannot remove orphaned shared memory segment '{name}': {e}")
+    if removed:
+        logger.info(f"Removed {removed} orphaned shared memory segment(s)")
+    return removed
+
+def main(request_queue, response_queue, remote: bool = False, preview_codec: str = "jpeg",
+         preview_bandwidth: float = 0.0):
+    """Runs a backend session. With a remote frontend, response_queue is the
+    outgoing end of a transport.SocketChannel."""
+    cleanup_orphaned_segments()
+    shards = SHARDS
+    if remote and shards > 1:
+        logger.warning("Sharding is not supported with a remote frontend, running a single backend process")
+        shards = 1
+    remote_preview = None
+    if remote:
+        from flowdip.backend.remote_preview import PreviewEncoder
+        remote_preview = PreviewEncoder(response_queue, preview_codec, max_bandwidth=preview_bandwidth,
+                                        logger=logger)
+    be_manager = BackEndManager(request_queue, response_queue, remote_preview=remote_preview, shards=shards)
     be_manager.start()
     be_manager.join()
+
+
+def serve(address: str, preview_codec: str = "jpeg", preview_bandwidth: float = 0.0):
+    """Serves remote frontends, one session at a time, until interrupted."""
+    from flowdip.transport import accept, listen
+
+    server = listen(address)
+    try:
+        while True:
+            channel = accept(server, eof_message=Request(request_type=RequestType.SHUTDOWN, payload=None))
+            main(channel.incoming, channel.outgoing, remote=True,
+                 preview_codec=preview_codec, preview_bandwidth=preview_bandwidth)
+            channel.flush()
+            channel.close()
+    except KeyboardInterrupt:
+        logger.info("Backend server interrupted.")
+    finally:
+        server.close()
@@ -0,0 +1,125 @@
+import time
+from threading import Thread, Event as ThreadEvent
+from typing import Any, List
+
+# =============================================================================
+#  Per-node metrics
+# =============================================================================
+#
+#  Counters are plain attributes updated by the node thread without locks.
+#  The publisher swaps each node's NodeMetrics object for a fresh one once per
+#  interval and summarizes the old one, so the hot path only pays a few
+#  integer additions per frame. Updates must go through `node.metrics` each
+#  time, never through a reference kept across a frame: those made after
+#  the swap would land in the summarized object and be lost.
+# =============================================================================
+
+# Log2 buckets in microseconds: bucket b holds durations in [2^(b-1), 2^b) us
+HISTOGRAM_BUCKETS = 24
+
+
+class LatencyHistogram:
+    """Log2 bucketed histogram of durations in nanoseconds."""
+
+    __slots__ = ("counts", "count", "total_ns", "max_ns")
+
+    def __init__(self):
+        self.counts = [0] * HISTOGRAM_BUCKETS
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+
+    def add(self, ns: int):
+        bucket = (ns // 1000).bit_length()
+        self.counts[bucket if bucket < HISTOGRAM_BUCKETS else HISTOGRAM_BUCKETS - 1] += 1
+        self.count += 1
+        self.total_ns += ns
+        if ns > self.max_ns:
+            self.max_ns = ns
+
+    def percentile(self, p: float) -> float:
+        """Upper bound (ms) of the bucket containing the p-th percentile."""
+        if self.count == 0:
+            return 0.0
+        target = p / 100.0 * self.count
+        seen = 0
+        for bucket, n in enumerate(self.counts):
+            seen += n
+            if seen >= target:
+                return min((1 << bucket) / 1000.0, self.max_ns / 1e6)
+        return self.max_ns / 1e6
+
+    def summary(self) -> dict:
+        mean = self.total_ns / self.count / 1e6 if self.count else 0.0
+        return {
+            "mean_ms": mean,
+            "p50_ms": self.percentile(50),
+            "p95_ms": self.percentile(95),
+            "max_ms": self.max_ns / 1e6,
+            "histogram": list(self.counts),
+        }
+
+
+class NodeMetrics:
+    """Counters of one node over one publishing interval."""
+
+    __slots__ = ("frames_in", "frames_out", "dropped", "skipped", "unchanged", "wall", "cpu", "wait")
+
+    def __init__(self):
+        self.frames_in = 0     # Executions triggered by upstream frames
+        self.frames_out = 0    # Frames published on output ports
+        self.dropped = 0       # Triggers overwritten before the node consumed them
+        self.skipped = 0       # Frames not processed by choice (quality controller)
+        self.unchanged = 0     # Static frames: not published by sources, not reprocessed below
+        self.wall = LatencyHistogram()  # _process_data wall time
+        self.cpu = LatencyHistogram()   # _process_data thread CPU time
+        self.wait = LatencyHistogram()  # Time waiting for dependencies
+
+    def summary(self, interval: float) -> dict:
+        return {
+            "fps_in": self.frames_in / interval,
+            "fps_out": self.frames_out / interval,
+            "frames_in": self.frames_in,
+            "frames_out": self.frames_out,
+            "dropped": self.dropped,
+            "skipped": self.skipped,
+            "unchanged": self.unchanged,
+            "busy": self.wall.total_ns / 1e9 / interval,  # Fraction of the interval in _process_data
+            "wall": self.wall.summary(),
+            "cpu": self.cpu.summary(),
+            "wait": self.wait.summary(),
+        }
+
+
+class MetricsPublisher(Thread):
+    """Publishes the metrics of every node as a single aggregated event at
+    a fixed rate."""
+
+    def __init__(self, be_manager: Any, interval: float = 1.0):
+        super().__init__(daemon=True, name="flowdip-metrics")
+        self.be_manager = be_manager
+        self.interval = interval
+        self._stop_e = ThreadEvent()
+
+    def run(self):
+        last = time.perf_counter()
+        while not self._stop_e.wait(self.interval):
+            now = time.perf_counter()
+            self.be_manager.publish_metrics(collect_metrics(list(self.be_manager.nodes), now - last))
+            last = now
+
+    def stop(self):
+        self._stop_e.set()
+
+
+def collect_metrics(nodes: List[Any], interval: float) -> dict:
+    """Swaps the metrics of every node and returns their summaries."""
+    metrics = {}
+    for node in nodes:
+        current, node.metrics = node.metrics, NodeMetrics()
+        summary = current.summary(interval)
+        source_stats = getattr(node, "source_stats", None)
+        if source_stats is not None:
+            summary["source"] = source_stats()
+        metrics[node.flowdip_name] = summary
+    return metrics
@@ -0,0 +1,125 @@
+from typing import Dict, Iterable, Optional, Tuple
+
+import cv2
+
+# =============================================================================
+#  Pixel formats and conversions
+# =============================================================================
+#
+#  Pixel formats are the "colorspaces" of the graph compiler: "BGR", "GRAY"...
+#  Inputs list the formats they accept (Input.colorspaces) and negotiable
+#  outputs the formats they can produce (Output.formats, default first).
+#  When compiling, each negotiable output picks the cheapest format that
+#  every consumer explicitly accepts, and a conversion is inserted on the
+#  links whose format is still not accepted (see graph_compiler.py).
+# =============================================================================
+
+# Supported conversions: "<input colorspace>2<output colorspace>" -> (OpenCV code, output channels)
+COLOR_CONVERSIONS = {
+    "BGR2GRAY": (cv2.COLOR_BGR2GRAY, 1),
+    "BGR2RGB": (cv2.COLOR_BGR2RGB, 3),
+    "BGR2HSV": (cv2.COLOR_BGR2HSV, 3),
+    "BGR2LAB": (cv2.COLOR_BGR2LAB, 3),
+    "BGR2YCrCb": (cv2.COLOR_BGR2YCrCb, 3),
+    "GRAY2BGR": (cv2.COLOR_GRAY2BGR, 3),
+    "RGB2BGR": (cv2.COLOR_RGB2BGR, 3),
+    "HSV2BGR": (cv2.COLOR_HSV2BGR, 3),
+}
+
+# Bytes per pixel, the cost of producing and moving a frame in each format
+FORMAT_COST = {"GRAY": 1, "BGR": 3, "RGB": 3, "HSV": 3, "LAB": 3, "YCrCb": 3}
+
+# FourCCs of decoded pixel formats whose first plane is the luma (Y) plane
+LUMA_PLANE_FOURCCS = {"I420", "IYUV", "YV12", "NV12", "NV21", "Y42B", "422P", "444P", "Y800", "GREY"}
+
+
+class FormatConversion:
+    """Conversion inserted on a link by the graph compiler."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.code, self.channels = COLOR_CONVERSIONS[name]
+        self.source, self.target = name.split("2")
+
+    def __call__(self, frame):
+        return cv2.cvtColor(frame, self.code)
+
+    def __repr__(self):
+        return f"FormatConversion({self.name})"
+
+
+class LinkTransform:
+    """What a producer applies to a frame before handing it to an input:
+    the format conversion inserted by the graph compiler, then the downscale
+    of the quality controller (see quality.py)."""
+
+    def __init__(self, conversion: Optional[FormatConversion], scale: float):
+        self.conversion = conversion
+        self.scale = scale
+        self.key = f"{conversion.name if conversion else ''}@{scale:g}"
+
+    def __call__(self, frame):
+        if self.conversion is not None:
+            frame = self.conversion(frame)
+        if self.scale != 1.0:
+            frame = cv2.resize(frame, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
+        return frame
+
+    def __repr__(self):
+        return f"LinkTransform({self.key})"
+
+
+_conversions: Dict[str, FormatConversion] = {}
+_transforms: Dict[str, LinkTransform] = {}
+
+
+def install_transform(input_port):
+    """Updates the transform of an input from its conversion and scale.
+    Instances are shared, so producers transform once for all the inputs
+    that need the same frame."""
+    conversion, scale = input_port.conversion, input_port.scale
+    if conversion is None and scale == 1.0:
+        input_port.transform = None
+        return
+    transform = LinkTransform(conversion, scale)
+    input_port.transform = _transforms.setdefault(transform.key, transform)
+
+
+def find_conversion(source: str, accepted: Iterable[str]) -> Optional[FormatConversion]:
+    """Cheapest conversion from source to one of the accepted formats."""
+    targets = [target for target in accepted if f"{source}2{target}" in COLOR_CONVERSIONS]
+    if not targets:
+        return None
+    name = f"{source}2{min(targets, key=lambda target: FORMAT_COST.get(target, 3))}"
+    if name not in _conversions:
+        _conversions[name] = FormatConversion(name)
+    return _conversions[name]
+
+
+def cheapest_format(formats: Iterable[str]) -> str:
+    return min(formats, key=lambda fmt: FORMAT_COST.get(fmt, 3))
+
+
+def configure_decode_format(cap, fmt: Optional[str]) -> bool:
+    """Configures a cv2.VideoCapture to decode GRAY frames as the Y plane
+    when the codec is planar YUV (limited range luma, no YUV->BGR pass).
+    Returns False if frames will need a BGR2GRAY conversion instead."""
+    fourcc = int(cap.get(cv2.CAP_PROP_CODEC_PIXEL_FORMAT)).to_bytes(4, "little")
+    luma_plane = fmt == "GRAY" and fourcc.decode("ascii", "replace") in LUMA_PLANE_FOURCCS
+    cap.set(cv2.CAP_PROP_CONVERT_RGB, 0 if luma_plane else 1)
+    return luma_plane or fmt != "GRAY"
+
+
+def frame_size(cap) -> Tuple[int, int]:
+    """(height, width) of the frames of a cv2.VideoCapture."""
+    return int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)), int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+
+
+def reread_bgr(cap):
+    """Switches a capture configured for the luma plane back to BGR frames
+    and decodes its last frame again, as cap.read() does. For the decoders
+    that return the raw packed buffer ((H * 3 / 2, W) I420, 1 x N...)
+    rather than the (H, W) Y plane when CONVERT_RGB is off."""
+    cap.set(cv2.CAP_PROP_CONVERT_RGB, 1)
+    cap.set(cv2.CAP_PROP_POS_FRAMES, max(0, cap.get(cv2.CAP_PROP_POS_FRAMES) - 1))
+    return cap.read()
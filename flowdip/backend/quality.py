@@ -0,0 +1,200 @@
+import os
+from dataclasses import dataclass, fields, replace
+from typing import Iterable, Optional, Sequence, Tuple
+
+# =============================================================================
+#  Adaptive quality
+# =============================================================================
+#
+#  Live pipelines must keep up with their paced sources. Once per metrics
+#  interval the controller compares the load of every node with the frame
+#  budget of the sources and steps through degradation levels:
+#    - skip_every: branch heads (nodes fed by a source) drop every Nth frame,
+#      so the whole branch below them does less work.
+#    - scale: frames entering branch heads are downscaled (coordinates
+#      computed downstream are then in the downscaled frame).
+#    - inference_interval: inference nodes run on one frame out of N.
+#  Sources, their previews and nodes that must see every frame (recorders,
+#  see BackEndFlowDiPNode._degradable) always run at full quality.
+#
+#  The load of a node is the fraction of the interval it would spend in
+#  _process_data if it handled every trigger it received, including the ones
+#  it dropped while busy. Each node runs in its own thread, so the pipeline
+#  keeps real time as long as every node stays below 1. The controller
+#  degrades when the busiest node exceeds `degrade_at` and recovers, more
+#  slowly, below `recover_at`.
+#
+#  The levels after full quality are set with FLOWDIP_QUALITY_LEVELS, ";"
+#  separated, each a comma separated list of QualityLevel fields:
+#
+#    FLOWDIP_QUALITY_LEVELS="skip_every=3; skip_every=2,scale=0.5,inference_interval=3"
+#
+#  Set FLOWDIP_QUALITY=0 to disable it.
+# =============================================================================
+
+QUALITY_ENABLED = os.environ.get("FLOWDIP_QUALITY", "1") != "0"
+
+
+@dataclass(frozen=True)
+class QualityLevel:
+    name: str
+    skip_every: int = 0           # Drop every Nth frame at branch heads, 0 keeps them all
+    scale: float = 1.0            # Resolution of the frames entering branch heads
+    inference_interval: int = 1   # Run inference on one frame out of N
+
+
+FULL_QUALITY = QualityLevel("full")
+
+DEFAULT_LEVELS = (
+    FULL_QUALITY,
+    QualityLevel("skip 1/4", skip_every=4),
+    QualityLevel("skip 1/3, 75%", skip_every=3, scale=0.75),
+    QualityLevel("skip 1/2, 50%", skip_every=2, scale=0.5, inference_interval=2),
+    QualityLevel("minimum", skip_every=2, scale=0.5, inference_interval=4),
+)
+
+
+def parse_levels(spec: str) -> Tuple[QualityLevel, ...]:
+    """Parses a FLOWDIP_QUALITY_LEVELS value into the level table, full
+    quality first."""
+    types = {level_field.name: level_field.type for level_field in fields(QualityLevel)}
+    levels = [FULL_QUALITY]
+    for item in spec.split(";"):
+        item = item.strip()
+        if not item:
+            continue
+        values = {}
+        for setting in item.split(","):
+            key, sep, value = (part.strip() for part in setting.partition("="))
+            if not sep or key not in types or key == "name":
+                raise ValueError(f"Invalid setting '{setting.strip()}' in '{item}'.")
+            try:
+                values[key] = types[key](value)
+            except ValueError:
+                raise ValueError(f"Invalid value '{value}' for {key} in '{item}'.") from None
+        level = QualityLevel(", ".join(f"{key}={value}" for key, value in values.items()), **values)
+        # skip_every=1 would drop every frame
+        if level.skip_every < 0 or level.skip_every == 1:
+            raise ValueError(f"skip_every must be 0 or at least 2 in '{item}'.")
+        if not 0.0 < level.scale <= 1.0:
+            raise ValueError(f"scale must be in (0, 1] in '{item}'.")
+        if level.inference_interval < 1:
+            raise ValueError(f"inference_interval must be at least 1 in '{item}'.")
+        levels.append(level)
+    return tuple(levels)
+
+
+def configured_levels(logger=None) -> Tuple[QualityLevel, ...]:
+    """Level table set by FLOWDIP_QUALITY_LEVELS, DEFAULT_LEVELS if unset
+    or invalid."""
+    spec = os.environ.get("FLOWDIP_QUALITY_LEVELS", "")
+    if spec.strip():
+        try:
+            return parse_levels(spec)
+        except ValueError as e:
+            if logger is not None:
+                logger.warning(f"Ignoring FLOWDIP_QUALITY_LEVELS: {e}")
+    return DEFAULT_LEVELS
+
+
+def frame_budget(nodes: Iterable) -> Optional[float]:
+    """Frame time (s) of the fastest playing paced source, None if no
+    source is bound to real time (paused, offline or unpaced)."""
+    budgets = [node.frametime for node in nodes
+               if node._loop and node.start_e.is_set()
+               and getattr(node, "frametime", 0) > 0 and not getattr(node, "offline", False)]
+    return min(budgets) if budgets else None
+
+
+def node_load(summary: dict) -> float:
+    """Load of a node from its metrics summary (see metrics.py)."""
+    busy, frames = summary.get("busy", 0.0), summary["frames_in"]
+    return busy * (frames + summary["dropped"]) / frames if frames else busy
+
+
+class QualityController:
+
+    def __init__(self, levels: Optional[Sequence[QualityLevel]] = None, degrade_at: float = 0.9,
+                 recover_at: float = 0.5, degrade_after: int = 2, recover_after: int = 3, logger=None):
+        if levels is None:
+            levels = configured_levels(logger)
+        if not levels:
+            raise ValueError("At least one quality level is required.")
+        self.levels = tuple(levels)
+        self.degrade_at = degrade_at
+        self.recover_at = recover_at
+        self.degrade_after = degrade_after    # Overloaded intervals before stepping down
+        self.recover_after = recover_after    # Intervals with headroom before stepping up
+        self.logger = logger
+        self.index = 0
+        self._overloaded = 0
+        self._headroom = 0
+
+    @property
+    def level(self) -> QualityLevel:
+        return self.levels[self.index]
+
+    def update(self, nodes: Iterable, metrics: dict) -> bool:
+        """Feeds the metrics of one interval. Returns True on a transition."""
+        nodes = list(nodes)
+        budget = frame_budget(nodes)
+        if budget is None:
+            # Nothing to keep up with: the counters restart on the next run
+            self._overloaded = self._headroom = 0
+            return False
+
+        loads = {node.flowdip_name: node_load(metrics[node.flowdip_name])
+                 for node in nodes if not node._loop and node.flowdip_name in metrics}
+        if not loads:
+            return False
+        busiest = max(loads, key=loads.get)
+        load = loads[busiest]
+
+        if load > self.degrade_at and self.index < len(self.levels) - 1:
+            self._overloaded += 1
+            self._headroom = 0
+            if self._overloaded >= self.degrade_after:
+                return self._set_level(self.index + 1, nodes, f"{busiest} load {load:.0%}", budget)
+        elif load < self.recover_at and self.index > 0:
+            self._headroom += 1
+            self._overloaded = 0
+            if self._headroom >= self.recover_after:
+                return self._set_level(self.index - 1, nodes, f"max load {load:.0%}", budget)
+        else:
+            self._overloaded = self._headroom = 0
+        return False
+
+    def _set_level(self, index: int, nodes: list, reason: str, budget: float) -> bool:
+        previous = self.level
+        self.index = index
+        self._overloaded = self._headroom = 0
+        if self.logger is not None:
+            self.logger.info(f"Quality {previous.name} -> {self.level.name} "
+                             f"({reason}, frame budget {budget * 1000:.1f} ms)")
+        self.apply(nodes)
+        for node in nodes:
+            node.invalidate()  # Static scenes are reprocessed at the new level
+        return True
+
+    def apply(self, nodes: Iterable):
+        """Installs the current level on the nodes and on the links leaving
+        the sources. Called on transitions and after each compilation."""
+        # Imported here: this module is also loaded by the frontend (without OpenCV)
+        from flowdip.backend.pixel_formats import install_transform
+
+        level = self.level
+        inner_level = replace(level, skip_every=0, scale=1.0)
+        for node in nodes:
+            head = False
+            for input_port in node.dip_inputs:
+                from_source = input_port.output is not None and input_port.output.node._loop
+                scale = level.scale if from_source and node._degradable else 1.0
+                head = head or from_source
+                if input_port.scale != scale:
+                    input_port.scale = scale
+                    install_transform(input_port)
+
+            if not node._degradable or node._loop:
+                node.quality = FULL_QUALITY
+            else:
+                node.quality = level if head else inner_level
@@ -0,0 +1,132 @@
+import os
+import struct
+from typing import Optional, Tuple
+
+import numpy as np
+
+# =============================================================================
+#  FlowDiP raw frame container
+# =============================================================================
+#
+#  Layout:  [ header (HEADER_SIZE bytes) ][ frame 0 ][ frame 1 ] ... [ frame N-1 ]
+#
+#  Every frame has the same shape and dtype and is stored C-contiguous, so the
+#  whole payload can be mapped as a single (N, *shape) array with np.memmap.
+#  The header is padded to a full page so that frames start page-aligned.
+# =============================================================================
+
+RAW_MAGIC = b"FDRAWFRM"
+RAW_VERSION = 1
+HEADER_SIZE = 4096
+MAX_NDIM = 4
+
+# magic, version, header size, frame count, fps, ndim, shape[4], dtype
+_HEADER_STRUCT = struct.Struct("<8sIIQdI4I16s")
+
+
+def pack_header(shape: Tuple[int, ...], dtype, fps: float, frame_count: int = 0) -> bytes:
+    """Builds a padded raw container header."""
+    if len(shape) > MAX_NDIM:
+        raise ValueError(f"Frames with more than {MAX_NDIM} dimensions are not supported.")
+    padded_shape = tuple(shape) + (0,) * (MAX_NDIM - len(shape))
+    header = _HEADER_STRUCT.pack(
+        RAW_MAGIC, RAW_VERSION, HEADER_SIZE, frame_count, float(fps),
+        len(shape), *padded_shape, np.dtype(dtype).str.encode("ascii")
+    )
+    return header.ljust(HEADER_SIZE, b"\0")
+
+
+def unpack_header(data: bytes) -> dict:
+    """Parses a raw container header. Raises ValueError if it is not valid."""
+    if len(data) < _HEADER_STRUCT.size:
+        raise ValueError("Raw frame file is too short to contain a header.")
+    (magic, version, header_size, frame_count, fps,
+     ndim, s0, s1, s2, s3, dtype) = _HEADER_STRUCT.unpack_from(data)
+    if magic != RAW_MAGIC:
+        raise ValueError("Not a FlowDiP raw frame file (bad magic).")
+    if version != RAW_VERSION:
+        raise ValueError(f"Unsupported raw frame file version: {version}.")
+    return {
+        "header_size": header_size,
+        "frame_count": frame_count,
+        "fps": fps,
+        "shape": (s0, s1, s2, s3)[:ndim],
+        "dtype": np.dtype(dtype.rstrip(b"\0").decode("ascii")),
+    }
+
+
+class RawFrameWriter:
+    """Appends fixed-size frames to a raw container file."""
+
+    def __init__(self, path: str, shape: Tuple[int, ...], dtype, fps: float = 0.0):
+        self.path = path
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.fps = fps
+        self.frame_count = 0
+        self.frame_size = int(np.prod(self.shape)) * self.dtype.itemsize
+
+        self._file = open(path, "wb")
+        self._file.write(pack_header(self.shape, self.dtype, self.fps))
+
+    def append(self, frame: np.ndarray):
+        if frame.shape != self.shape or frame.dtype != self.dtype:
+            raise ValueError(
+                f"Frame {frame.shape}/{frame.dtype} does not match the recording "
+                f"format {self.shape}/{self.dtype}."
+            )
+        # Contiguous frames are written straight from their buffer
+        self._file.write(np.ascontiguousarray(frame).data)
+        self.frame_count += 1
+
+    def close(self):
+        if self._file is None:
+            return
+        # Store the final frame count. Readers also derive it from the file
+        # size, so interrupted recordings remain readable.
+        self._file.seek(0)
+        self._file.write(pack_header(self.shape, self.dtype, self.fps, self.frame_count))
+        self._file.close()
+        self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class RawFrameReader:
+    """Memory-maps a raw container. Frames are served as read-only views of
+    the page cache, without decoding or copying."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            header = unpack_header(f.read(_HEADER_STRUCT.size))
+
+        self.shape: Tuple[int, ...] = header["shape"]
+        self.dtype: np.dtype = header["dtype"]
+        self.fps: float = header["fps"]
+        self.frame_size = int(np.prod(self.shape)) * self.dtype.itemsize
+
+        payload = os.path.getsize(path) - header["header_size"]
+        self.frame_count = payload // self.frame_size if self.frame_size else 0
+
+        self.frames: Optional[np.memmap] = None
+        if self.frame_count > 0:
+            self.frames = np.memmap(
+                path, dtype=self.dtype, mode="r",
+                offset=header["header_size"],
+                shape=(self.frame_count,) + self.shape,
+            )
+
+    def __len__(self) -> int:
+        return self.frame_count
+
+    def __getitem__(self, index: int) -> np.ndarray:
+        return self.frames[index]
+
+    def close(self):
+        # The mapping is released once no served frame references it anymore
+        self.frames = None
@@ -0,0 +1,116 @@
+import zlib
+from typing import Dict
+
+import cv2
+import numpy as np
+
+from flowdip import Event, EventType, FramePayload
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:
+    lz4_frame = None
+
+# =============================================================================
+#  Remote previews
+# =============================================================================
+#
+#  When the frontend runs on another machine (see flowdip/transport.py),
+#  sources hand their preview frames to the PreviewEncoder instead of their
+#  shared memory segment. Frames are downscaled in the node thread, which
+#  also copies them out of the pipeline buffers. They are encoded by the
+#  sender thread of the connection, and only when actually sent: frames
+#  replaced while still pending on a slow link are never encoded.
+#
+#  JPEG quality adapts to the link once per metrics interval (AIMD): it is
+#  cut when frames were coalesced or the bandwidth cap exceeded, and raised
+#  step by step otherwise. At the minimum quality the preview width is
+#  halved, and restored once the quality is back to its maximum. "lz4"
+#  ("zlib" without the lz4 package) sends lossless frames instead, only
+#  their width adapts.
+# =============================================================================
+
+CODECS = ("jpeg", "lz4", "zlib")
+
+MIN_WIDTH = 240
+QUALITY_STEP = 5
+QUALITY_CUT = 0.75
+
+
+class PreviewEncoder:
+
+    def __init__(self, outbox, codec: str = "jpeg", max_width: int = 960, max_bandwidth: float = 0.0,
+                 quality: int = 80, min_quality: int = 20, max_quality: int = 90, logger=None):
+        if codec not in CODECS:
+            raise ValueError(f"Unknown preview codec '{codec}', expected one of {', '.join(CODECS)}.")
+        if codec == "lz4" and lz4_frame is None:
+            if logger is not None:
+                logger.warning("lz4 is not installed, sending zlib compressed previews")
+            codec = "zlib"
+        self.outbox = outbox  # transport.Outbox of the connection
+        self.codec = codec
+        self.max_width = max_width
+        self.width = max_width  # Current preview width
+        self.max_bandwidth = max_bandwidth  # Bytes/s, 0 for no cap
+        self.quality = quality
+        self.min_quality = min_quality
+        self.max_quality = max_quality
+        self.logger = logger
+        self._seq: Dict[str, int] = {}
+
+    def publish(self, flowdip_name: str, frame: np.ndarray):
+        """Queues a preview frame. Called by the source thread."""
+        h, w = frame.shape[:2]
+        if w > self.width:
+            size = (self.width, max(1, round(h * self.width / w)))
+            frame = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+        else:
+            frame = frame.copy()  # The pipeline reuses its buffers
+        if frame.dtype != np.uint8:
+            frame = cv2.normalize(frame, None, 0, 255, cv2.NORM_MINMAX, cv2.CV_8U)
+        self.outbox.put_latest(flowdip_name, lambda: self.encode(flowdip_name, frame))
+
+    def encode(self, flowdip_name: str, frame: np.ndarray) -> Event:
+        """Builds the NEW_FRAME event. Called by the sender thread."""
+        if frame.ndim == 3 and frame.shape[2] == 1:
+            frame = frame[:, :, 0]
+        pixfmt = "GRAY" if frame.ndim == 2 else "BGR"
+
+        if self.codec == "jpeg":
+            ok, buffer = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+            if not ok:
+                raise ValueError(f"JPEG encoding of a {frame.shape} frame failed.")
+            data = buffer.tobytes()
+        elif self.codec == "lz4":
+            data = lz4_frame.compress(np.ascontiguousarray(frame).data)
+        else:
+            data = zlib.compress(np.ascontiguousarray(frame).data, 1)
+
+        seq = self._seq[flowdip_name] = self._seq.get(flowdip_name, 0) + 1
+        return Event(
+            event_type=EventType.NEW_FRAME,
+            payload=FramePayload(flowdip_name=flowdip_name, codec=self.codec, pixfmt=pixfmt,
+                                 shape=frame.shape, data=data, seq=seq)
+        )
+
+    def adapt(self):
+        """Adjusts quality and width to the link. Called once per metrics interval."""
+        stats = self.outbox.take_stats()
+        rate = stats["bytes"] / stats["interval"] if stats["interval"] > 0 else 0.0
+        congested = stats["coalesced"] > 0 or (self.max_bandwidth > 0 and rate > self.max_bandwidth)
+
+        quality, width = self.quality, self.width
+        if congested:
+            if self.codec == "jpeg" and self.quality > self.min_quality:
+                self.quality = max(self.min_quality, int(self.quality * QUALITY_CUT))
+            else:
+                self.width = max(MIN_WIDTH, self.width // 2)
+        elif self.codec == "jpeg" and self.quality < self.max_quality:
+            self.quality = min(self.max_quality, self.quality + QUALITY_STEP)
+        elif self.width < self.max_width:
+            self.width = min(self.max_width, self.width * 2)
+
+        if self.logger is not None and (quality, width) != (self.quality, self.width):
+            quality = f" quality {self.quality}," if self.codec == "jpeg" else ""
+            self.logger.debug(f"Preview {self.codec}{quality} width {self.width} "
+                              f"({rate / 1e6:.2f} MB/s, {stats['coalesced']} frames coalesced)")
@@ -0,0 +1,642 @@
+import itertools
+import multiprocessing
+import os
+from collections import deque
+from dataclasses import replace
+from multiprocessing.shared_memory import SharedMemory
+from threading import Lock, Thread
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from flowdip import (
+    BatchPayload, ConnectPortsPayload, CreateNodePayload, DeleteNodePayload, Event, EventType,
+    Request, RequestDonePayload, RequestType
+)
+from flowdip.backend.flowdip_be_base import BackEndFlowDiPNode, Roi
+from flowdip.backend.gop_decoder import HOLD_FRAMES
+from flowdip.backend.main_backend import SHARD_PARAM
+from flowdip.registry import get_registry
+from flowdip.shm_frames import segment_capacity
+
+# =============================================================================
+#  Sharded backends
+# =============================================================================
+#
+#  Every node of a backend runs in its own thread, so one backend process
+#  uses at most one core for Python code. With FLOWDIP_SHARDS=N the backend
+#  manager becomes the facade of N shards: it hosts shard 0 itself and spawns
+#  N-1 worker processes, each running its own BackEndManager. The frontend
+#  still talks to the facade only: the ShardRouter forwards every request to
+#  the shard of its node, worker events are relayed to the frontend and
+#  worker metrics merged into the facade's NODE_METRICS.
+#
+#  Placement, decided when a node is created and never migrated:
+#    - pinned: CreateNodePayload.other_params["shard"] (the "shard" property
+#      of the frontend nodes, "auto" by default).
+#    - sources go to the least loaded shard. The load of a shard is the sum
+#      of the measured `busy` fraction of its nodes, or a static estimate per
+#      capability (STATIC_COSTS) until their first metrics.
+#    - other nodes are held back (with their parameter updates) until their
+#      first link to a placed node, and follow that node, so unpinned chains
+#      stay in the process of their source.
+#
+#  A link between two shards goes through a pair of proxy nodes: a
+#  RingWriter on the producer shard copies each frame into a free slot of its
+#  shared memory ring and sends the slot on the data queue of the consumer
+#  shard, where a RingReader publishes a view of it. Like the GOP decoder
+#  rings, a slot is released back to the writer once the reader published
+#  HOLD_FRAMES newer frames. When every slot is held the writer drops the
+#  frame. Non-array data (detections...) is pickled through the queue.
+#
+#  Quality control runs in each shard on its own nodes. Batches are split
+#  into one batch per shard; a failing shard only rolls back its own part.
+#  A request is answered (REQUEST_DONE) once every shard applied its part;
+#  requests held back with an unplaced node are answered right away.
+# =============================================================================
+
+RING_SLOTS = HOLD_FRAMES + 2
+RING_PREFIX = "flowdip.ring."
+
+# Placement cost (busy fraction) of a node before its first metrics, by capability
+STATIC_COSTS = (("inference", 0.5), ("source", 0.25), ("image", 0.1))
+DEFAULT_COST = 0.1
+
+_ring_ids = itertools.count()
+_proxy_ids = itertools.count()
+
+
+class RingFrame(NamedTuple):
+    """Writer -> reader: a frame stored in a ring slot, or inline data."""
+    target: str         # Reader node
+    source_shard: int
+    writer: str         # Writer node
+    ring: Optional[str]  # Shared memory name, None for inline data
+    slot: int
+    offset: int
+    shape: tuple
+    dtype: str
+    roi: Optional[Roi]
+    inline: Any
+
+
+class RingRelease(NamedTuple):
+    """Reader -> writer: a slot can be reused."""
+    target: str  # Writer node
+    ring: str
+    slot: int
+
+
+def static_cost(node_type: str) -> float:
+    try:
+        capabilities = get_registry().get(node_type).capabilities
+    except ValueError:
+        return DEFAULT_COST
+    for capability, cost in STATIC_COSTS:
+        if capability in capabilities:
+            return cost
+    return DEFAULT_COST
+
+
+# =============================================================================
+#  Cross-shard proxy nodes
+# =============================================================================
+
+class RingWriter(BackEndFlowDiPNode):
+    """Sends the frames of its input to a RingReader of another shard."""
+    _roi_capable = True  # The ROI travels with the whole frame
+    _degradable = False
+
+    def __init__(self, flowdip_name: str, reader: str, target_shard: int, be_manager: Any = None):
+        super().__init__(flowdip_name=flowdip_name, be_manager=be_manager)
+        self.reader = reader
+        self.target_shard = target_shard
+        self.frame_in = self.create_port("frame", is_input=True)
+        self._shm: Optional[SharedMemory] = None
+        self._ring_name: Optional[str] = None
+        self._slot_bytes = 0
+        self._free = deque()  # Free slots, released by the dispatcher thread
+
+    def _allocate(self, nbytes: int):
+        """(Re)creates the ring. Frames in flight in a replaced ring are lost."""
+        self._close_ring()
+        self._slot_bytes = segment_capacity(nbytes)
+        name = f"{RING_PREFIX}{os.getpid()}.{next(_ring_ids)}"
+        self._shm = SharedMemory(name=name, create=True, size=RING_SLOTS * self._slot_bytes)
+        self._ring_name = name
+        self._free = deque(range(RING_SLOTS))
+
+    def _close_ring(self):
+        if self._shm is not None:
+            self._ring_name = None
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+
+    def _process_data(self):
+        data, roi = self.frame_in.data, self.frame_in.roi
+        if data is None:
+            return
+        context = self.be_manager.shard_context
+        if not isinstance(data, np.ndarray) or data.dtype.hasobject:
+            context.send(self.target_shard, RingFrame(
+                self.reader, context.index, self.flowdip_name, None, 0, 0, (), "", roi, data))
+            self.metrics.frames_out += 1
+            return
+
+        if self._shm is None or data.nbytes > self._slot_bytes:
+            self._allocate(data.nbytes)
+        try:
+            slot = self._free.popleft()
+        except IndexError:
+            self.metrics.dropped += 1  # The reader still holds every slot
+            return
+        offset = slot * self._slot_bytes
+        np.copyto(np.ndarray(data.shape, data.dtype, buffer=self._shm.buf, offset=offset), data)
+        context.send(self.target_shard, RingFrame(
+            self.reader, context.index, self.flowdip_name, self._ring_name, slot, offset,
+            data.shape, data.dtype.str, roi, None))
+        self.metrics.frames_out += 1
+
+    def receive(self, message: RingRelease):
+        """Called by the data dispatcher thread."""
+        if message.ring == self._ring_name:
+            self._free.append(message.slot)
+
+    def release(self):
+        self._close_ring()
+
+
+class RingReader(BackEndFlowDiPNode):
+    """Publishes the frames sent by a RingWriter of another shard."""
+    _degradable = False
+
+    def __init__(self, flowdip_name: str, be_manager: Any = None):
+        super().__init__(flowdip_name=flowdip_name, be_manager=be_manager)
+        self.frame_out = self.create_port("frame", is_input=False)
+        self._lock = Lock()
+        self._pending: Optional[RingFrame] = None
+        self._published = False
+        self._held = deque()  # Frames published, oldest first
+        self._rings: Dict[str, SharedMemory] = {}  # Attached rings by name
+
+    def receive(self, message: RingFrame):
+        """Called by the data dispatcher thread."""
+        with self._lock:
+            dropped, self._pending = self._pending, message
+        if dropped is not None:
+            self.metrics.dropped += 1  # Still busy with an older frame
+            self._release_frame(dropped)
+        self.start_e.set()
+
+    def _release_frame(self, message: RingFrame):
+        if message.ring is not None:
+            self.be_manager.shard_context.send(
+                message.source_shard, RingRelease(message.writer, message.ring, message.slot))
+
+    def _process_data(self):
+        with self._lock:
+            message, self._pending = self._pending, None
+        self._published = False
+        if message is None:
+            return
+        if message.ring is None:
+            self.update_port_data(self.frame_out, message.inline, message.roi)
+            self._published = True
+            return
+
+        shm = self._rings.get(message.ring)
+        if shm is None:
+            try:
+                shm = self._rings[message.ring] = SharedMemory(name=message.ring)
+            except FileNotFoundError:
+                return  # The writer replaced its ring meanwhile
+        frame = np.ndarray(message.shape, np.dtype(message.dtype), buffer=shm.buf, offset=message.offset)
+        self.update_port_data(self.frame_out, frame, message.roi)
+        self._published = True
+
+        # The slot of the oldest frame handed out can be reused
+        self._held.append(message)
+        if len(self._held) > HOLD_FRAMES:
+            self._release_frame(self._held.popleft())
+            if len(self._rings) > 1:
+                self._detach(keep={held.ring for held in self._held})
+
+    def _detach(self, keep=frozenset()):
+        for name in [name for name in self._rings if name not in keep]:
+            try:
+                self._rings[name].close()
+            except BufferError:
+                continue  # Frames still referenced downstream, retried later
+            del self._rings[name]
+
+    def propagates(self) -> bool:
+        return self._published
+
+    def release(self):
+        while self._held:
+            self._release_frame(self._held.popleft())
+        self._detach()
+
+
+# Node types the router creates itself, not in the registry
+INTERNAL_NODES = {
+    "~RingWriter": RingWriter,
+    "~RingReader": RingReader,
+}
+
+
+class ShardContext:
+    """Data plane of one shard: sends ring messages to other shards and
+    hands the ones received to their proxy nodes."""
+
+    def __init__(self, index: int, data_queues: List[Any]):
+        self.index = index
+        self.data_queues = data_queues  # One per shard, by index
+        self.manager = None
+        self._thread: Optional[Thread] = None
+
+    def send(self, shard: int, message):
+        self.data_queues[shard].put(message)
+
+    def start(self, manager):
+        self.manager = manager
+        self._thread = Thread(target=self._dispatch, daemon=True, name=f"flowdip-shard{self.index}-data")
+        self._thread.start()
+
+    def _dispatch(self):
+        inbox = self.data_queues[self.index]
+        while True:
+            message = inbox.get()
+            if message is None:
+                break
+            node = self.manager.get_node(message.target)
+            if isinstance(node, (RingWriter, RingReader)):
+                node.receive(message)
+            elif isinstance(message, RingFrame) and message.ring is not None:
+                # Reader not created yet or deleted: give the slot back
+                self.send(message.source_shard, RingRelease(message.writer, message.ring, message.slot))
+
+    def stop(self):
+        if self._thread is not None:
+            self.data_queues[self.index].put(None)
+            self._thread.join(timeout=1.0)
+
+
+def _run_shard(index: int, inbox, events, data_queues):
+    """Worker process: runs the BackEndManager of one shard."""
+    from flowdip import logs
+    from flowdip.backend.main_backend import BackEndManager
+
+    manager = BackEndManager(inbox, events, shard_context=ShardContext(index, data_queues))
+    manager.start()
+    manager.join()
+    logs.flush()  # The process ends with os._exit
+
+
+# =============================================================================
+#  Router (facade side)
+# =============================================================================
+
+class ShardRouter:
+    """Places the nodes of the facade's graph on shards and forwards the
+    requests to them. Runs in the facade's control loop, except
+    update_costs and take_metrics (metrics thread) and complete."""
+
+    def __init__(self, manager, shards: int):
+        self.manager = manager
+        self.logger = manager.logger
+        self.shards = shards
+        # Spawned: forking the multithreaded backend could copy held locks
+        ctx = multiprocessing.get_context("spawn")
+        self.data_queues = [ctx.Queue() for _ in range(shards)]
+        self.inboxes = [None] + [ctx.Queue() for _ in range(1, shards)]
+        self.events = ctx.Queue()  # Events of every worker
+        self.processes = [
+            ctx.Process(target=_run_shard, name=f"flowdip-shard{index}", daemon=False,
+                        args=(index, self.inboxes[index], self.events, self.data_queues))
+            for index in range(1, shards)
+        ]
+        manager.shard_context = ShardContext(0, self.data_queues)
+
+        self.placement: Dict[str, int] = {}  # Placed node -> shard
+        self.costs: Dict[str, float] = {}    # Placed node -> busy fraction (measured or static)
+        self.deferred: Dict[str, List[Request]] = {}  # Unplaced node -> its requests so far
+        self.pending_links: List[Request] = []  # Links between two unplaced nodes
+        # Input (node, port) -> (link, ring key or None for links within a shard)
+        self.links: Dict[Tuple[str, str], Tuple[ConnectPortsPayload, Optional[str]]] = {}
+        # Ring key -> [links using it, producer shard, consumer shard, name prefix of its proxy nodes]
+        self.rings: Dict[str, list] = {}
+        self._batch: Optional[List[List[Request]]] = None
+        self._batch_deletes: Optional[List[List[Request]]] = None  # Sent after the batch of their shard
+        self._metrics: dict = {}
+        self._metrics_lock = Lock()
+        self._expected: Dict[int, list] = {}  # Request id -> [answers left, first error]
+        self._expected_lock = Lock()
+        self._forwarder = Thread(target=self._forward_events, daemon=True, name="flowdip-shard-events")
+
+    def start(self):
+        for process in self.processes:
+            process.start()
+        self._forwarder.start()
+        self.logger.info(f"Sharded backend: {self.shards} shards")
+
+    def stop(self):
+        for inbox in self.inboxes[1:]:
+            inbox.put(Request(request_type=RequestType.SHUTDOWN, payload=None))
+        for process in self.processes:
+            process.join(timeout=5.0)
+            if process.is_alive():
+                self.logger.warning(f"{process.name} did not stop, terminating it")
+                process.terminate()
+                process.join()
+        self.events.put(None)
+        self._forwarder.join(timeout=1.0)
+
+    # -------------------------------------------------------------------------
+    def _forward_events(self):
+        while True:
+            event = self.events.get()
+            if event is None:
+                break
+            if event.event_type == EventType.NODE_METRICS:
+                with self._metrics_lock:
+                    self._metrics.update(event.payload.metrics)
+            else:
+                self.manager.publish_event(event)
+
+    def complete(self, event: Event) -> Optional[Event]:
+        """Merges the REQUEST_DONE answers of a request split across
+        shards. Returns the event to publish, if any."""
+        request_id = event.payload.request_id
+        with self._expected_lock:
+            expected = self._expected.get(request_id)
+            if expected is None:
+                return event
+            expected[0] -= 1
+            expected[1] = expected[1] or event.payload.error
+            if expected[0] > 0:
+                return None
+            del self._expected[request_id]
+        return Event(event_type=EventType.REQUEST_DONE,
+                     payload=RequestDonePayload(request_id=request_id, error=expected[1]))
+
+    def take_metrics(self) -> dict:
+        """Worker metrics received since the last call."""
+        with self._metrics_lock:
+            metrics, self._metrics = self._metrics, {}
+        return metrics
+
+    def update_costs(self, metrics: dict):
+        for name, summary in metrics.items():
+            if name in self.costs:
+                self.costs[name] = summary["busy"]
+
+    def shard_load(self, shard: int) -> float:
+        return sum(cost for name, cost in self.costs.items() if self.placement.get(name) == shard)
+
+    def least_loaded(self) -> int:
+        return min(range(self.shards), key=lambda shard: (self.shard_load(shard), shard))
+
+    # -------------------------------------------------------------------------
+    def dispatch(self, request: Request):
+        if request.request_type != RequestType.BATCH:
+            self._route(request)
+            return
+
+        self._batch = [[] for _ in range(self.shards)]
+        self._batch_deletes = [[] for _ in range(self.shards)]
+        try:
+            for sub_request in request.payload.requests:
+                self._route(sub_request)
+        finally:
+            batches, self._batch = self._batch, None
+            deletes, self._batch_deletes = self._batch_deletes, None
+        shards = [shard for shard, requests in enumerate(batches) if requests]
+        if request.request_id:
+            if not shards:
+                self.manager.request_done(request)
+            elif len(shards) > 1:
+                with self._expected_lock:
+                    self._expected[request.request_id] = [len(shards), None]
+        for shard in shards:
+            self._send(shard, Request(request_type=RequestType.BATCH, payload=BatchPayload(batches[shard]),
+                                      request_id=request.request_id))
+        # Deletes can't be batched: they follow the batch on the same ordered path
+        for shard, requests in enumerate(deletes):
+            for delete in requests:
+                self._send(shard, delete)
+
+    def _send(self, shard: int, request: Request):
+        if self._batch is not None:
+            if request.request_type == RequestType.DELETE_NODE:
+                self._batch_deletes[shard].append(request)
+            else:
+                self._batch[shard].append(request)
+        elif shard == 0:
+            self.manager.submit(request)
+        else:
+            self.inboxes[shard].put(request)
+
+    def _accept(self, request: Request) -> Request:
+        """Answers a request held back by the router, returns it without its id."""
+        self.manager.request_done(request)
+        return replace(request, request_id=0)
+
+    def _fail(self, request: Request, error: str):
+        self.logger.warning(error)
+        self.manager.request_done(request, error)
+
+    def _route(self, request: Request):
+        req_type, payload = request.request_type, request.payload
+
+        if req_type == RequestType.CREATE_NODE:
+            self._create(request)
+        elif req_type == RequestType.DELETE_NODE:
+            self._delete(request)
+        elif req_type == RequestType.CONNECT_PORTS:
+            self._connect(request)
+        elif req_type == RequestType.DISCONNECT_PORTS:
+            self._disconnect(request)
+        elif req_type in (RequestType.UPDATE_NODE_PARAMS, RequestType.RUN_NODE):
+            name = payload.flowdip_name
+            if name in self.deferred:
+                if req_type == RequestType.UPDATE_NODE_PARAMS:
+                    self.deferred[name].append(self._accept(request))
+                    return
+                self._place(name, self.least_loaded())  # Runs on its own
+            shard = self.placement.get(name)
+            if shard is None:
+                self._fail(request, f"Node '{name}' not found.")
+                return
+            self._send(shard, request)
+        else:
+            self._fail(request, f"Unsupported request type: {req_type.name}")
+
+    # -------------------------------------------------------------------------
+    def _pinned_shard(self, name: str, pin: Any) -> Optional[int]:
+        if pin is None or str(pin).strip().lower() in ("", "auto"):
+            return None
+        try:
+            shard = int(pin)
+        except (TypeError, ValueError):
+            shard = -1
+        if not 0 <= shard < self.shards:
+            self.logger.warning(f"Node '{name}' is pinned to shard {pin!r}, but shards are "
+                                f"0 to {self.shards - 1}: placing it automatically")
+            return None
+        return shard
+
+    def _create(self, request: Request):
+        payload = request.payload
+        name = payload.flowdip_name
+        if name in self.placement or name in self.deferred:
+            self._fail(request, f"Cannot create node '{name}': Node '{name}' already exists.")
+            return
+
+        other_params = dict(payload.other_params or {})
+        shard = self._pinned_shard(name, other_params.pop(SHARD_PARAM, None))
+        request = replace(request, payload=replace(payload, other_params=other_params))
+        if shard is None:
+            try:
+                is_source = get_registry().has_capability(payload.node_type, "source")
+            except ValueError:
+                is_source = False  # Reported by the shard that creates it
+            if is_source:
+                shard = self.least_loaded()
+
+        if shard is None:
+            self.deferred[name] = [self._accept(request)]
+            self.logger.debug("Node '%s' is placed on its first link", name)
+        else:
+            self.deferred[name] = [request]
+            self._place(name, shard)
+
+    def _place(self, name: str, shard: int):
+        requests = self.deferred.pop(name)
+        self.placement[name] = shard
+        self.costs[name] = static_cost(requests[0].payload.node_type)
+        self.logger.info(f"Node '{name}' placed on shard {shard}")
+        for request in requests:
+            self._send(shard, request)
+
+        # Links waiting for one of their nodes
+        links, self.pending_links = self.pending_links, []
+        for request in links:
+            self._connect(request)
+
+    def _delete(self, request: Request):
+        name = request.payload.flowdip_name
+        if self.deferred.pop(name, None) is not None:
+            self.pending_links = [link for link in self.pending_links
+                                  if name not in (link.payload.output_flowdip_name,
+                                                  link.payload.input_flowdip_name)]
+            self.manager.request_done(request)
+            return
+        shard = self.placement.pop(name, None)
+        if shard is None:
+            self._fail(request, f"Node '{name}' not found.")
+            return
+        self.costs.pop(name, None)
+        self._send(shard, request)
+
+        # Its links go away with it, and so do the rings nobody uses anymore
+        for key, (link, ring) in list(self.links.items()):
+            if name in (link.output_flowdip_name, link.input_flowdip_name):
+                del self.links[key]
+                if ring is not None:
+                    self._release_ring(ring)
+
+    def _connect(self, request: Request):
+        link = request.payload
+        out_name, in_name = link.output_flowdip_name, link.input_flowdip_name
+        out_shard, in_shard = self.placement.get(out_name), self.placement.get(in_name)
+        if out_shard is None and in_shard is None:
+            if out_name in self.deferred and in_name in self.deferred:
+                self.pending_links.append(self._accept(request))
+            else:
+                self._fail(request, f"Cannot resolve link nodes: {link}")
+            return
+        if out_shard is None or in_shard is None:
+            if (out_name if out_shard is None else in_name) not in self.deferred:
+                self._fail(request, f"Cannot resolve link nodes: {link}")
+                return
+            if out_shard is None:
+                out_shard = in_shard
+                self._place(out_name, out_shard)
+            else:
+                in_shard = out_shard
+                self._place(in_name, in_shard)
+
+        # A link replaces the previous link of its input
+        key = (in_name, link.input_port_name)
+        previous = self.links.pop(key, None)
+        if previous is not None and previous[1] is not None:
+            self._release_ring(previous[1])
+
+        if out_shard == in_shard:
+            self._send(in_shard, request)
+            self.links[key] = (link, None)
+            return
+
+        ring = self._acquire_ring(out_name, link.output_port_name, out_shard, in_shard)
+        self._send(in_shard, Request(request_type=RequestType.CONNECT_PORTS, payload=ConnectPortsPayload(
+            f"{self.rings[ring][3]}.rx", "frame", in_name, link.input_port_name), request_id=request.request_id))
+        self.links[key] = (link, ring)
+
+    def _disconnect(self, request: Request):
+        link = request.payload
+        key = (link.input_flowdip_name, link.input_port_name)
+        for pending in self.pending_links:
+            if pending.payload == link:
+                self.pending_links.remove(pending)
+                self.manager.request_done(request)
+                return
+        record = self.links.get(key)
+        if record is None or (record[0].output_flowdip_name, record[0].output_port_name) != \
+                (link.output_flowdip_name, link.output_port_name):
+            self._fail(request, f"Cannot resolve link: {link}")
+            return
+
+        del self.links[key]
+        ring = record[1]
+        in_shard = self.placement[link.input_flowdip_name]
+        if ring is None:
+            self._send(in_shard, request)
+            return
+        self._send(in_shard, Request(request_type=RequestType.DISCONNECT_PORTS, payload=ConnectPortsPayload(
+            f"{self.rings[ring][3]}.rx", "frame", link.input_flowdip_name, link.input_port_name), request_id=request.request_id))
+        self._release_ring(ring)
+
+    def _acquire_ring(self, out_name: str, out_port: str, out_shard: int, in_shard: int) -> str:
+        """Ring key of an output toward a shard. All the consumers of the
+        output on that shard share its proxy nodes."""
+        ring = f"~{out_name}.{out_port}@{in_shard}"
+        if ring in self.rings:
+            self.rings[ring][0] += 1
+            return ring
+
+        # Numbered proxies: a ring recreated right after its release never
+        # collides with the old proxy nodes still being deleted
+        nodes = f"{ring}#{next(_proxy_ids)}"
+        self.rings[ring] = [1, out_shard, in_shard, nodes]
+        self._send(in_shard, Request(request_type=RequestType.CREATE_NODE, payload=CreateNodePayload(
+            "~RingReader", f"{nodes}.rx")))
+        self._send(out_shard, Request(request_type=RequestType.CREATE_NODE, payload=CreateNodePayload(
+            "~RingWriter", f"{nodes}.tx", {"reader": f"{nodes}.rx", "target_shard": in_shard})))
+        self._send(out_shard, Request(request_type=RequestType.CONNECT_PORTS, payload=ConnectPortsPayload(
+            out_name, out_port, f"{nodes}.tx", "frame")))
+        self.logger.info(f"Linked {out_name}.{out_port} from shard {out_shard} to shard {in_shard}")
+        return ring
+
+    def _release_ring(self, ring: str):
+        entry = self.rings[ring]
+        entry[0] -= 1
+        if entry[0] > 0:
+            return
+        del self.rings[ring]
+        _, out_shard, in_shard, nodes = entry
+        self._send(out_shard, Request(request_type=RequestType.DELETE_NODE,
+                                      payload=DeleteNodePayload(f"{nodes}.tx")))
+        self._send(in_shard, Request(request_type=RequestType.DELETE_NODE,
+                                     payload=DeleteNodePayload(f"{nodes}.rx")))
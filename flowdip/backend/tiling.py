@@ -0,0 +1,81 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional
+
+import numpy as np
+
+from flowdip.backend.buffer_pool import BufferPool
+
+# =============================================================================
+#  Tiled execution of a single frame
+# =============================================================================
+#
+#  Tile-parallel nodes are split into horizontal strips processed on a shared
+#  thread pool. OpenCV and NumPy release the GIL, so strips run truly in
+#  parallel. Neighbourhood filters declare a halo: each strip is processed
+#  with `halo` extra rows above and below into a scratch buffer, and only its
+#  own rows are copied to the output. Elementwise nodes have no halo and write
+#  straight into their rows of the output buffer.
+#
+#  FLOWDIP_TILE_THREADS sets the number of threads (1 disables tiling).
+# =============================================================================
+
+TILE_THREADS = int(os.environ.get("FLOWDIP_TILE_THREADS", 0)) or os.cpu_count() or 1
+TILE_MIN_BYTES = 2 * 1024 * 1024  # Smaller frames are not worth splitting
+TILE_MIN_ROWS = 32
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def get_tile_executor() -> ThreadPoolExecutor:
+    """Returns the thread pool shared by every tile-parallel node."""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=TILE_THREADS, thread_name_prefix="flowdip-tile")
+    return _executor
+
+
+def should_tile(src: np.ndarray) -> bool:
+    return TILE_THREADS > 1 and src.nbytes >= TILE_MIN_BYTES and src.shape[0] >= 2 * TILE_MIN_ROWS
+
+
+def strip_bounds(rows: int, n_strips: int) -> List[tuple]:
+    """Splits [0, rows) into n_strips contiguous (start, stop) ranges."""
+    n_strips = max(1, min(n_strips, rows // TILE_MIN_ROWS))
+    step = -(-rows // n_strips)  # Ceil division
+    return [(y, min(rows, y + step)) for y in range(0, rows, step)]
+
+
+class TileScratch:
+    """Per-node scratch buffers for strips with a halo, reused across frames."""
+
+    def __init__(self):
+        self.pools: List[BufferPool] = []
+
+    def acquire(self, index: int, shape, dtype) -> np.ndarray:
+        while len(self.pools) <= index:
+            self.pools.append(BufferPool(depth=1))
+        return self.pools[index].acquire(shape, dtype)
+
+
+def run_tiled(apply: Callable[[np.ndarray, np.ndarray], None],
+              src: np.ndarray, dst: np.ndarray, halo: int = 0,
+              scratch: Optional[TileScratch] = None, n_strips: int = TILE_THREADS):
+    """Runs apply(src, dst) strip by strip on the tile thread pool.
+    The output must have the same number of rows as the input."""
+    rows = src.shape[0]
+    bounds = strip_bounds(rows, n_strips)
+
+    def process_strip(index, y0, y1):
+        if halo <= 0:
+            apply(src[y0:y1], dst[y0:y1])
+            return
+        a, b = max(0, y0 - halo), min(rows, y1 + halo)
+        tmp = scratch.acquire(index, (b - a,) + dst.shape[1:], dst.dtype)
+        apply(src[a:b], tmp)
+        np.copyto(dst[y0:y1], tmp[y0 - a:y1 - a])
+
+    executor = get_tile_executor()
+    futures = [executor.submit(process_strip, i, y0, y1) for i, (y0, y1) in enumerate(bounds)]
+    for future in futures:
+        future.result()  # Propagates strip errors
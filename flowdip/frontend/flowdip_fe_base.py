@@ -1,11 +1,16 @@
-from platform import node
 import uuid
 
 from NodeGraphQt import NodeBaseWidget, BaseNode, NodeGraph
+from NodeGraphQt.constants import NodePropWidgetEnum
 from PySide6.QtCore import Qt, QMetaObject
+from PySide6.QtGui import QColor
+from PySide6.QtWidgets import QGraphicsSimpleTextItem
 from typing import Optional, Any, TYPE_CHECKING
 from flowdip.backend.flowdip_be_base import NodeState
-from flowdip import Request, RequestType, CreateNodePayload, DeleteNodePayload
+from flowdip import (
+    Request, RequestType, CreateNodePayload, DeleteNodePayload,
+    UpdateNodeParamsPayload, ConnectPortsPayload
+)
 from flowdip import get_logger
 
 # =============================================================================
@@ -19,6 +24,10 @@ class FlowDiPNodeGraph(NodeGraph):
         self.fe_manager = fe_manager
         self.logger = get_logger(self.__class__.__name__)  # logger by class name
 
+        self.port_connected.connect(self.on_port_connected)
+        self.port_disconnected.connect(self.on_port_disconnected)
+        self.property_changed.connect(self.on_property_changed)
+
     def create_node(
         self,
         node_type: str,
@@ -38,6 +47,35 @@ class FlowDiPNodeGraph(NodeGraph):
 
         return node
 
+    def _deserialize(self, data, relative_pos=False, pos=None, adjust_graph_style=True):
+        """Session loads, pastes and duplicates add nodes without emitting
+        signals: their backend nodes, parameters and links are requested
+        here in a single batch."""
+        nodes = super()._deserialize(data, relative_pos, pos, adjust_graph_style)
+        new_nodes = [node for node in nodes if isinstance(node, FrontFlowDiPNode)]
+        if not new_nodes:
+            return nodes
+
+        with self.fe_manager.batch():
+            for node in new_nodes:
+                node.request_backend_node(self.fe_manager)
+                params = {name: node.get_property(name) for name in node.be_params
+                          if node.has_property(name)}
+                if params:
+                    node.request_params_update(params)
+
+            new_ids = {node.id for node in new_nodes}
+            for node in new_nodes:
+                for input_port in node.input_ports():
+                    for output_port in input_port.connected_ports():
+                        self.publish_link_request(RequestType.CONNECT_PORTS, input_port, output_port)
+                # Links towards nodes that already existed
+                for output_port in node.output_ports():
+                    for input_port in output_port.connected_ports():
+                        if input_port.node().id not in new_ids:
+                            self.publish_link_request(RequestType.CONNECT_PORTS, input_port, output_port)
+        return nodes
+
     def cut_nodes(self, nodes=None):
         super().cut_nodes(nodes)
         self.logger.info(f"[Node Graph] : Nodes cut event triggered")
@@ -67,17 +105,57 @@ class FlowDiPNodeGraph(NodeGraph):
             self.delete_backend_node(node)
         return super().delete_nodes(nodes, push_undo)
 
+    def on_port_connected(self, input_port, output_port):
+        self.publish_link_request(RequestType.CONNECT_PORTS, input_port, output_port)
+
+    def on_port_disconnected(self, input_port, output_port):
+        self.publish_link_request(RequestType.DISCONNECT_PORTS, input_port, output_port)
+
+    def publish_link_request(self, request_type: RequestType, input_port, output_port):
+        """Mirrors a port (dis)connection between FlowDiP nodes in the backend."""
+        in_node = input_port.node()
+        out_node = output_port.node()
+        if not (isinstance(in_node, FrontFlowDiPNode) and isinstance(out_node, FrontFlowDiPNode)):
+            return
+
+        self.logger.info(f"[Node Graph] : {request_type.name} {out_node.name()}.{output_port.name()}"
+                         f" -> {in_node.name()}.{input_port.name()}")
+        self.fe_manager.publish_request(Request(
+            request_type=request_type,
+            payload=ConnectPortsPayload(
+                output_flowdip_name=out_node.flowdip_name,
+                output_port_name=output_port.name(),
+                input_flowdip_name=in_node.flowdip_name,
+                input_port_name=input_port.name(),
+            )
+        ))
+
+    def on_property_changed(self, node, name: str, value):
+        """Forwards backend-relevant node properties to the backend node."""
+        if isinstance(node, FrontFlowDiPNode) and name in node.be_params:
+            node.request_params_update({name: value})
+
+    def update_node_metrics(self, metrics: dict):
+        """Shows the latest backend metrics as overlays on their nodes.
+        The node with the highest processing time is flagged as bottleneck."""
+        nodes = [node for node in self.all_nodes()
+                 if isinstance(node, FrontFlowDiPNode) and node.flowdip_name in metrics]
+        if not nodes:
+            return
+
+        bottleneck = max(nodes, key=lambda n: metrics[n.flowdip_name]["wall"]["mean_ms"])
+        for node in nodes:
+            node.update_metrics(metrics[node.flowdip_name], bottleneck=node is bottleneck)
+
     def delete_backend_node(self, node):
         """Requests the backend manager to delete the corresponding backend node."""
         if isinstance(node, FrontFlowDiPNode):
             self.logger.info(f"Requesting backend to delete node: {node.name()}")
             self.fe_manager.publish_request(Request(
                 request_type=RequestType.DELETE_NODE,
-                payload=DeleteNodePayload(
-                    node_class_name=node.be_node_class.__name__,
-                    flowdip_name=node.flowdip_name
-                )
+                payload=DeleteNodePayload(flowdip_name=node.flowdip_name)
             ))
+            node.release()
 
 
 # =============================================================================
@@ -100,7 +178,7 @@ class FlowDiPNodeWidget(NodeBaseWidget):
         return self.value
 
     def set_value(self, value):
-        self.logger.debug(f"Value set on widget {self.get_name()}: {value}")
+        self.logger.debug("Value set on widget %s: %s", self.get_name(), value)
         self.value = value
 
 class FrontFlowDiPNode(BaseNode):
@@ -111,19 +189,26 @@ class FrontFlowDiPNode(BaseNode):
 
     # Overwritable class attributes
     widget_class = None
-    be_node_class = None
+    node_type: Optional[str] = None  # Name in flowdip.registry, None for base classes
+    be_params: tuple = ()  # Node properties mirrored to the backend node
 
     def __init__(self):
         super().__init__()
         self.active_theme = None
         self.fe_manager = None
+        self.metrics_item = None
         self.flowdip_name = self.generate_flowdip_name()
         # logger uses node's name instead of class name
         self.logger = get_logger(self.name())
+        # Backend process of the node in sharded backends, see backend/sharding.py
+        self.create_property("shard", "auto", widget_type=NodePropWidgetEnum.QLINE_EDIT.value,
+                             widget_tooltip="Backend shard (FLOWDIP_SHARDS > 1): a number, or auto",
+                             tab="Backend")
 
-        self.embedded_widget = self.widget_class(flowdip_node=self)
+        self.embedded_widget = None
 
         if self.widget_class is not None:
+            self.embedded_widget = self.widget_class(flowdip_node=self)
             widget = FlowDiPNodeWidget(
                 name=self.name(),
                 parent=self.view,
@@ -137,19 +222,52 @@ class FrontFlowDiPNode(BaseNode):
         self.fe_manager = fe_manager
         self.logger.info(f"Requesting backend node for {self.name()}")
 
-        if self.be_node_class is not None:
+        if self.node_type is not None:
             self.fe_manager.publish_request(Request(
                 request_type=RequestType.CREATE_NODE,
                 payload=CreateNodePayload(
-                    node_class_name=self.be_node_class.__name__,
+                    node_type=self.node_type,
                     flowdip_name=self.flowdip_name,
+                    other_params={"shard": self.get_property("shard")},
                 )
             ))
 
+    def request_params_update(self, new_params: dict):
+        """Sends new parameters to the corresponding backend node."""
+        if self.fe_manager and self.node_type:
+            self.fe_manager.publish_request(Request(
+                request_type=RequestType.UPDATE_NODE_PARAMS,
+                payload=UpdateNodeParamsPayload(
+                    flowdip_name=self.flowdip_name,
+                    new_params=new_params
+                )
+            ))
+
+    def update_metrics(self, metrics: dict, bottleneck: bool = False):
+        """Displays processing metrics in an overlay below the node."""
+        if self.metrics_item is None:
+            self.metrics_item = QGraphicsSimpleTextItem(self.view)
+
+        wall = metrics["wall"]
+        text = (f"{wall['mean_ms']:.1f} ms (p95 {wall['p95_ms']:.1f})"
+                f"  cpu {metrics['cpu']['mean_ms']:.1f} ms"
+                f"  {max(metrics['fps_in'], metrics['fps_out']):.1f} fps")
+        if metrics["wait"]["mean_ms"] > 0:
+            text += f"  wait {metrics['wait']['mean_ms']:.1f} ms"
+        if metrics["dropped"]:
+            text += f"  dropped {metrics['dropped']}"
+
+        theme = self.active_theme or {}
+        color = theme.get("node_error", (220, 20, 60)) if bottleneck or metrics["dropped"] \
+            else theme.get("text", (224, 224, 224))
+        self.metrics_item.setBrush(QColor(*color))
+        self.metrics_item.setText(text)
+        self.metrics_item.setPos(0, self.view.boundingRect().height() + 4)
+
     def update_state(self, state: NodeState):
         """Updates the node color and state according to the current state."""
         self.state = state
-        self.logger.debug(f"Updating state of {self.flowdip_name} to {state.name}")
+        self.logger.debug("Updating state of %s to %s", self.flowdip_name, state.name)
 
         if state == NodeState.IDLE:
             self.set_color(*self.default_color)
@@ -180,3 +298,8 @@ class FrontFlowDiPNode(BaseNode):
 
     def update_params(self, new_params: dict):
         pass # To be optionally overridden in subclasses
+
+    def release(self):
+        """Releases frontend resources (e.g. shared memory views) when the
+        node is deleted. To be optionally overridden in subclasses."""
+        pass
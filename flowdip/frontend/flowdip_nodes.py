@@ -1,12 +1,11 @@
-import cv2
 import numpy as np
-from multiprocessing.shared_memory import SharedMemory
 
 from typing import Optional
 from flowdip.frontend.qtwidgets.ui_local_media_player import LocalMediaPlayerWidget
-from flowdip.backend.flowdip_nodes import BackMediaPlayer
+from flowdip.backend.flowdip_be_base import InferencedTask
 from flowdip.frontend.flowdip_fe_base import FrontFlowDiPNode
-from flowdip import Request, RequestType, UpdateNodeParamsPayload
+from flowdip import Request, RequestType, RunNodePayload, TransportCommand
+from flowdip.shm_frames import FrameGeometry, FrameSegment
 # =============================================================================
 #  Specific nodes
 # =============================================================================
@@ -16,45 +15,51 @@ class FrontMediaPlayer(FrontFlowDiPNode):
     NODE_NAME = "Media Player"
 
     widget_class = LocalMediaPlayerWidget
-    be_node_class = BackMediaPlayer
+    node_type = "MediaPlayer"
+    be_params = ("offline", "decode_workers", "static_threshold", "roi")
     loop = True
+    file_filter = "Video files (*.mp4 *.avi *.mov *.mkv *.wmv *.flv);;All files (*)"
 
     def __init__(self):
         super().__init__()
         self.add_output("Frame")
         self.add_output("Sound")
+        self.add_checkbox("offline", "", text="Offline (unpaced)", state=False)
+        if "decode_workers" in self.be_params:
+            self.add_text_input("decode_workers", "Decode workers", text="0")
+        # Mean absolute difference (gray levels) below which a frame is static, 0 disables
+        self.add_text_input("static_threshold", "Static threshold", text="0")
+        # Valid rectangle of the frames, only this region is processed and previewed
+        self.add_text_input("roi", "ROI (x,y,w,h)", text="")
 
         self.frame_shape: Optional[tuple] = None
         self.frame_dtype: Optional[str] = None
+        self.pixfmt: Optional[str] = None
+        self.frame_seq = 0  # Sequence of the frame in shared_frame
         self.shm_name: Optional[str] = None
-        self.shm = None
+        self.shm: Optional[FrameSegment] = None
         self.shared_frame = None
 
     def update_videopath(self, videopath: str):
         """Update the videopath in the backend node."""
-        if self.fe_manager and self.be_node_class:
-            self.fe_manager.publish_request(
-                Request(
-                    request_type=RequestType.UPDATE_NODE_PARAMS,
-                    payload=UpdateNodeParamsPayload(
-                        flowdip_name=self.flowdip_name,
-                        new_params={"videopath": videopath}
-                    )
-                )
-            )
+        self.request_params_update({"videopath": videopath})
+
+    def transport(self, command: TransportCommand, frames: int = 1):
+        """Sends a play/pause/stop/step command to the backend node."""
+        if self.fe_manager is None:
+            return
+        self.fe_manager.publish_request(Request(
+            request_type=RequestType.RUN_NODE,
+            payload=RunNodePayload(flowdip_name=self.flowdip_name, command=command, frames=frames)
+        ))
 
     def update_params(self, new_params: dict):
         """Update node parameters."""
         if "shm_name" in new_params.keys():
             """Update shared memory parameters event"""
-            self.logger.info(f"Updating shared memory parameters for node {self.name()}")
-            self.shm_name = new_params.get("shm_name", self.shm_name)
-            self.frame_shape = new_params.get("shm_shape", self.frame_shape)
-            self.frame_dtype = new_params.get("shm_dtype", self.frame_dtype)
-            if self.shm is None and self.shm_name and self.frame_shape and self.frame_dtype:
-                self.shm = SharedMemory(name=self.shm_name)
-                self.logger.info(f"Attached to shared memory block {self.shm_name} for node {self.name()}")
-                self.shared_frame = np.ndarray(self.frame_shape, dtype=self.frame_dtype, buffer=self.shm.buf)
+            shm_name = new_params["shm_name"]
+            if self.shm is None or shm_name != self.shm_name:
+                self.attach_shared_memory(shm_name)
         else:
             # Update frame event
             #self.logger.info(f"Received frame update for node {self.name()}")
@@ -62,6 +67,265 @@ class FrontMediaPlayer(FrontFlowDiPNode):
             #    self.logger.debug(f"Output frame updated for node {self.name()}")
             #else:
             #    self.logger.warning(f"Shared frame is not set for node {self.name()}. Cannot update output.")
+            if not self.refresh_shared_frame():
+                return
             self.embedded_widget.video_display.update_frame()
             self.embedded_widget.update()
 
+    def update_remote_frame(self, payload):
+        """Shows a preview frame sent by a remote backend."""
+        # Imported here: local sessions never load it
+        from flowdip.frontend.remote_frames import decode_frame
+
+        try:
+            frame, pixfmt = decode_frame(payload)
+        except ValueError as e:
+            self.logger.warning(str(e))
+            return
+        self.shared_frame = frame
+        self.set_geometry(FrameGeometry(payload.seq, frame.shape, frame.strides, frame.dtype, pixfmt))
+        self.embedded_widget.video_display.update_frame()
+        self.embedded_widget.update()
+
+    def attach_shared_memory(self, shm_name: str) -> bool:
+        self.release()
+        try:
+            self.shm = FrameSegment.attach(shm_name)
+        except (FileNotFoundError, ValueError) as e:
+            # Being replaced by the backend, retried on the next frame
+            self.logger.warning(f"Cannot attach to shared memory block {shm_name}: {e}")
+            return False
+        self.shm_name = shm_name
+        self.logger.info(f"Attached to shared memory block {shm_name} for node {self.name()}")
+        return True
+
+    def refresh_shared_frame(self) -> bool:
+        """Reads the geometry of the last frame from the segment header.
+        Returns False if there is no complete frame to show."""
+        if self.shm is None:
+            return self.shm_name is not None and self.attach_shared_memory(self.shm_name)
+
+        geometry = self.shm.read_geometry()
+        if geometry is not None and geometry.retired:
+            if not self.attach_shared_memory(self.shm_name):
+                return False
+            geometry = self.shm.read_geometry()
+        if geometry is None:
+            return False
+
+        if geometry.shape != self.frame_shape or geometry.dtype != self.frame_dtype:
+            self.shared_frame = self.shm.view(geometry)
+        self.set_geometry(geometry)
+        return True
+
+    def set_geometry(self, geometry: Optional[FrameGeometry]):
+        self.frame_shape = geometry.shape if geometry else None
+        self.frame_dtype = geometry.dtype if geometry else None
+        self.pixfmt = geometry.pixfmt if geometry else None
+        self.frame_seq = geometry.seq if geometry else 0
+
+    def release(self):
+        """Detaches from the preview shared memory. The backend owns the
+        segment and unlinks it."""
+        if self.shm is not None:
+            shm = self.shm
+            # Clear the geometry first: the preview stops reading the buffer
+            self.set_geometry(None)
+            self.shared_frame = None
+            self.shm = None
+            try:
+                shm.close()
+            except BufferError:
+                self.logger.warning(f"Shared memory of node {self.name()} is still referenced")
+
+
+class FrontRawFrameSource(FrontMediaPlayer):
+
+    NODE_NAME = "Raw Frame Player"
+
+    node_type = "RawFrameSource"
+    be_params = ("offline", "static_threshold", "roi")
+    file_filter = "FlowDiP raw frames (*.fdraw);;All files (*)"
+
+
+class FrontImageSequencePlayer(FrontMediaPlayer):
+
+    NODE_NAME = "Image Sequence Player"
+
+    node_type = "ImageSequencePlayer"
+    be_params = ("fps", "offline", "static_threshold", "roi")
+    file_filter = "Images (*.png *.jpg *.jpeg *.bmp *.tif *.tiff *.webp);;All files (*)"
+
+    def __init__(self):
+        super().__init__()
+        self.add_text_input("fps", "FPS", text="30")
+
+
+class FrontRawFrameRecorder(FrontFlowDiPNode):
+
+    NODE_NAME = "Raw Frame Recorder"
+
+    node_type = "RawFrameRecorder"
+    be_params = ("record_path", "fps")
+
+    def __init__(self):
+        super().__init__()
+        self.add_input("Frame")
+        self.add_text_input("record_path", "Record to", text="")
+        self.add_text_input("fps", "FPS", text="30")
+
+
+# =============================================================================
+#  Image processing nodes
+# =============================================================================
+
+class FrontImageNode(FrontFlowDiPNode):
+    """Frontend base for single frame in, single frame out nodes."""
+
+    NODE_NAME = "Image Node"
+
+    def __init__(self):
+        super().__init__()
+        self.add_input("Frame")
+        self.add_output("Frame")
+
+
+class FrontResize(FrontImageNode):
+
+    NODE_NAME = "Resize"
+
+    node_type = "Resize"
+    be_params = ("width", "height", "interpolation")
+
+    def __init__(self):
+        super().__init__()
+        self.add_text_input("width", "Width", text="640")
+        self.add_text_input("height", "Height", text="480")
+        self.add_combo_menu("interpolation", "Interpolation",
+                            items=["linear", "nearest", "cubic", "area", "lanczos"])
+
+
+class FrontColorConvert(FrontImageNode):
+
+    NODE_NAME = "Color Convert"
+
+    node_type = "ColorConvert"
+    be_params = ("conversion",)
+
+    def __init__(self):
+        super().__init__()
+        self.add_combo_menu("conversion", "Conversion",
+                            items=["BGR2GRAY", "BGR2RGB", "BGR2HSV", "BGR2LAB",
+                                   "BGR2YCrCb", "GRAY2BGR", "RGB2BGR", "HSV2BGR"])
+
+
+class FrontBlur(FrontImageNode):
+
+    NODE_NAME = "Blur"
+
+    node_type = "Blur"
+    be_params = ("mode", "ksize", "sigma")
+
+    def __init__(self):
+        super().__init__()
+        self.add_combo_menu("mode", "Mode", items=["gaussian", "box", "median"])
+        self.add_text_input("ksize", "Kernel size", text="5")
+        self.add_text_input("sigma", "Sigma", text="0")
+
+
+class FrontThreshold(FrontImageNode):
+
+    NODE_NAME = "Threshold"
+
+    node_type = "Threshold"
+    be_params = ("thresh", "maxval", "type", "otsu")
+
+    def __init__(self):
+        super().__init__()
+        self.add_text_input("thresh", "Threshold", text="127")
+        self.add_text_input("maxval", "Max value", text="255")
+        self.add_combo_menu("type", "Type",
+                            items=["binary", "binary_inv", "trunc", "tozero", "tozero_inv"])
+        self.add_checkbox("otsu", "", text="Otsu", state=False)
+
+
+class FrontCrop(FrontImageNode):
+
+    NODE_NAME = "Crop"
+
+    node_type = "Crop"
+    be_params = ("x", "y", "width", "height")
+
+    def __init__(self):
+        super().__init__()
+        self.add_text_input("x", "X", text="0")
+        self.add_text_input("y", "Y", text="0")
+        self.add_text_input("width", "Width", text="0")
+        self.add_text_input("height", "Height", text="0")
+
+
+class FrontNormalize(FrontImageNode):
+
+    NODE_NAME = "Normalize"
+
+    node_type = "Normalize"
+    be_params = ("mode", "alpha", "beta")
+
+    def __init__(self):
+        super().__init__()
+        self.add_combo_menu("mode", "Mode", items=["minmax", "scale"])
+        self.add_text_input("alpha", "Alpha", text="0")
+        self.add_text_input("beta", "Beta", text="255")
+
+
+class FrontInvert(FrontImageNode):
+
+    NODE_NAME = "Invert"
+
+    node_type = "Invert"
+
+
+class FrontMorphology(FrontImageNode):
+
+    NODE_NAME = "Morphology"
+
+    node_type = "Morphology"
+    be_params = ("operation", "shape", "ksize", "iterations")
+
+    def __init__(self):
+        super().__init__()
+        self.add_combo_menu("operation", "Operation",
+                            items=["open", "close", "erode", "dilate", "gradient", "tophat", "blackhat"])
+        self.add_combo_menu("shape", "Kernel shape", items=["rect", "ellipse", "cross"])
+        self.add_text_input("ksize", "Kernel size", text="3")
+        self.add_text_input("iterations", "Iterations", text="1")
+
+
+# =============================================================================
+#  Inference nodes
+# =============================================================================
+
+class FrontInference(FrontFlowDiPNode):
+
+    NODE_NAME = "Inference"
+
+    node_type = "Inference"
+    n_sources = 4  # Matches BackInference.n_sources
+    be_params = ("model_path", "task", "backend", "input_size", "max_batch",
+                 "max_latency_ms", "score_threshold", "nms_threshold", "top_k")
+
+    def __init__(self):
+        super().__init__()
+        for i in range(self.n_sources):
+            self.add_input(f"Frame {i + 1}")
+        self.add_output("Results")
+
+        self.add_text_input("model_path", "Model (ONNX)", text="")
+        self.add_combo_menu("task", "Task", items=[task.value for task in InferencedTask])
+        self.add_combo_menu("backend", "Backend", items=["auto", "onnxruntime", "opencv"])
+        self.add_text_input("input_size", "Input size", text="640")
+        self.add_text_input("max_batch", "Max batch", text="8")
+        self.add_text_input("max_latency_ms", "Max latency (ms)", text="20")
+        self.add_text_input("score_threshold", "Score threshold", text="0.25")
+        self.add_text_input("nms_threshold", "NMS threshold", text="0.45")
+        self.add_text_input("top_k", "Top K", text="1")
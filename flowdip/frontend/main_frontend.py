@@ -1,7 +1,9 @@
-from PySide6.QtCore import QThread
+import itertools
+from contextlib import contextmanager
+from PySide6.QtCore import QThread, Signal
 from PySide6.QtWidgets import QApplication
 from multiprocessing import Queue
-from flowdip import Event, EventType, Request, RequestType
+from flowdip import Event, EventType, Request, RequestType, BatchPayload, get_logger, tracing
 from flowdip.frontend.constants import GLOBAL_STYLESHEET
 from flowdip.frontend.mainwindow import MainWindow
 from flowdip.frontend.flowdip_fe_base import FlowDiPNodeGraph
@@ -13,12 +15,20 @@ from flowdip.frontend.flowdip_fe_base import FlowDiPNodeGraph
 class FrontEndManager(QThread):
     """Handles frontend events."""
 
+    # Emitted from the manager thread, delivered in the GUI thread
+    metrics_received = Signal(object)
+
     def __init__(self, req_queue: Queue, event_queue: Queue):
         super().__init__()
         self.req_queue = req_queue
         self.event_queue = event_queue
         self._running = True
         self.graph = None  # type: FlowDiPNodeGraph
+        self._batch = None  # Requests collected inside batch()
+        self._batch_depth = 0
+        self._request_ids = itertools.count(1)
+        self.pending = {}  # Requests sent and not answered yet, by request id
+        self.logger = get_logger(self.__class__.__name__)
 
     def run(self):
         while self._running:
@@ -29,8 +39,36 @@ class FrontEndManager(QThread):
                 self.handle_event(ev)
 
     def publish_request(self, req: Request):
+        if self._batch is not None:
+            self._batch.append(req)
+        else:
+            self._send(req)
+
+    def _send(self, req: Request):
+        """Sends a request with a correlation id, answered by REQUEST_DONE."""
+        req.request_id = next(self._request_ids)
+        self.pending[req.request_id] = req
         self.req_queue.put(req)
 
+    @contextmanager
+    def batch(self):
+        """Collects the requests published inside the block and sends them
+        as a single BATCH request, applied atomically by the backend."""
+        if self._batch_depth == 0:
+            self._batch = []
+        self._batch_depth += 1
+        try:
+            yield
+        finally:
+            self._batch_depth -= 1
+            if self._batch_depth == 0:
+                requests, self._batch = self._batch, None
+                if requests:
+                    self._send(Request(
+                        request_type=RequestType.BATCH,
+                        payload=BatchPayload(requests=requests)
+                    ))
+
     def handle_event(self, ev: Event):
 
         if ev.event_type == EventType.UPDATE_NODE_PARAMS:
@@ -40,6 +78,21 @@ class FrontEndManager(QThread):
                     node.update_params(ev.payload.new_params)
                     break
 
+        elif ev.event_type == EventType.NEW_FRAME:
+            # Preview of a remote backend (see flowdip/transport.py)
+            for node in self.graph.all_nodes():
+                if node.flowdip_name == ev.payload.flowdip_name:
+                    node.update_remote_frame(ev.payload)
+                    break
+
+        elif ev.event_type == EventType.NODE_METRICS:
+            self.metrics_received.emit(ev.payload.metrics)
+
+        elif ev.event_type == EventType.REQUEST_DONE:
+            req = self.pending.pop(ev.payload.request_id, None)
+            if req is not None and ev.payload.error is not None:
+                self.logger.warning(f"{req.request_type.name} request failed: {ev.payload.error}")
+
 # ----------------------------------------------------------------------
 # Application Entry Point
 # ----------------------------------------------------------------------
@@ -56,6 +109,7 @@ def main(request_queue, response_queue):
     window = MainWindow(fe_manager)
 
     fe_manager.graph = window.graph
+    fe_manager.metrics_received.connect(window.graph.update_node_metrics)
 
     fe_manager.start()
 
@@ -71,3 +125,4 @@ def main(request_queue, response_queue):
     fe_manager.req_queue.put(Request(request_type=RequestType.SHUTDOWN, payload=None))
 
     fe_manager.wait()
+    tracing.dump("frontend")
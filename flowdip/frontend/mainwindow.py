@@ -7,8 +7,8 @@ from flowdip.frontend.constants import (
 )
 from flowdip.frontend.utils import set_context_menu_stylesheet
 
-from flowdip.frontend.flowdip_fe_base import FlowDiPNodeGraph
-import flowdip.frontend.flowdip_nodes as FlowDiPNodes
+from flowdip.frontend.flowdip_fe_base import FlowDiPNodeGraph, FrontFlowDiPNode
+from flowdip.registry import get_registry
 from PySide6.QtCore import Qt
 from PySide6.QtGui import QCursor
 from PySide6.QtWidgets import (
@@ -37,10 +37,13 @@ class MainWindow(QMainWindow):
         self.graph.set_grid_color(*grid)
         self.graph.node_created.connect(self.update_node)
 
-        # Register FlowDiP nodes
-        for node_class in FlowDiPNodes.__dict__.values():
-            if isinstance(node_class, type) and issubclass(node_class, FlowDiPNodes.FrontFlowDiPNode):
-                self.graph.register_node(node_class)
+        # Register FlowDiP nodes (built-in and plugins)
+        registry = get_registry()
+        for spec in registry.specs():
+            try:
+                self.graph.register_node(registry.frontend_class(spec.name))
+            except (ImportError, AttributeError) as e:
+                self.graph.logger.error(f"Cannot register node type '{spec.name}': {e}")
 
         # Viewer setup
         self.viewer = self.graph.widget
@@ -58,7 +61,7 @@ class MainWindow(QMainWindow):
         self._create_nodes_palette()
 
     def update_node(self, node: BaseNode):
-        if isinstance(node, FlowDiPNodes.FrontFlowDiPNode):
+        if isinstance(node, FrontFlowDiPNode):
 
             node.active_theme = ACTIVE_THEME
             node.set_color(*ACTIVE_THEME["node_bg"])
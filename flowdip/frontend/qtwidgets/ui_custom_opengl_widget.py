@@ -1,8 +1,19 @@
 import numpy as np
 from PySide6.QtOpenGLWidgets import QOpenGLWidget
-from OpenGL import GL
 import time
 
+from flowdip import tracing
+
+GL = None  # PyOpenGL is slow to import: loaded when the first widget initializes
+
+
+def _import_gl():
+    global GL
+    if GL is None:
+        from OpenGL import GL as gl_module
+        GL = gl_module
+    return GL
+
 
 class CustomOpenGLWidget(QOpenGLWidget):
     """QOpenGLWidget for displaying RGB/BGR frames from shared memory, preserving aspect ratio."""
@@ -15,6 +26,7 @@ class CustomOpenGLWidget(QOpenGLWidget):
         self.frame_texture = None
         self.frame_shape = None
         self.frame_dtype = None
+        self.pixfmt = None
         self.texture_created = False
         self.texture_updated = False
 
@@ -31,6 +43,7 @@ class CustomOpenGLWidget(QOpenGLWidget):
     # --------------------------------------------------------------
     def initializeGL(self):
         """Initialize OpenGL context and configure the texture object."""
+        _import_gl()
         GL.glEnable(GL.GL_TEXTURE_2D)
 
         # Create texture
@@ -75,43 +88,55 @@ class CustomOpenGLWidget(QOpenGLWidget):
         if self.texture_updated:
             return
 
-        frame_shape = self.flowdip_node.frame_shape
-        frame_dtype = self.flowdip_node.frame_dtype
+        # The geometry is read from the frame itself, it may be replaced meanwhile
+        frame = self.flowdip_node.shared_frame
+        frame_seq = self.flowdip_node.frame_seq
+        pixfmt = self.flowdip_node.pixfmt
 
-        if frame_shape is None or frame_dtype is None:
-            raise ValueError("Frame shape or dtype is None. Cannot update texture.")
+        if frame is None:
+            raise ValueError("No frame available. Cannot update texture.")
+        frame_shape, frame_dtype = frame.shape, frame.dtype
 
         # Detect size or dtype change -> reallocate GPU texture
-        if frame_shape != self.frame_shape or frame_dtype != self.frame_dtype:
+        if frame_shape != self.frame_shape or frame_dtype != self.frame_dtype or pixfmt != self.pixfmt:
             self.frame_shape = frame_shape
             self.frame_dtype = frame_dtype
+            self.pixfmt = pixfmt
             self.texture_created = False
 
-        height, width, nchannels = self.frame_shape
+        height, width = self.frame_shape[:2]
+        if frame.ndim == 2:
+            gl_format = GL.GL_LUMINANCE
+        else:
+            gl_format = GL.GL_RGB if pixfmt == "RGB" else GL.GL_BGR
 
         GL.glBindTexture(GL.GL_TEXTURE_2D, self.frame_texture)
         GL.glPixelStorei(GL.GL_UNPACK_ALIGNMENT, 1)
 
-        if not self.texture_created:
-            # Allocate new GPU texture
-            GL.glTexImage2D(
-                GL.GL_TEXTURE_2D, 0, GL.GL_RGB,
-                width, height, 0,
-                GL.GL_BGR, GL.GL_UNSIGNED_BYTE,
-                self.flowdip_node.shm.buf
-            )
-            self.texture_created = True
-        else:
-            # Update existing texture
-            GL.glTexSubImage2D(
-                GL.GL_TEXTURE_2D, 0, 0, 0,
-                width, height,
-                GL.GL_BGR, GL.GL_UNSIGNED_BYTE,
-                self.flowdip_node.shm.buf
-            )
+        with tracing.span("texture_upload"):
+            if not self.texture_created:
+                # Allocate new GPU texture
+                GL.glTexImage2D(
+                    GL.GL_TEXTURE_2D, 0, GL.GL_RGB,
+                    width, height, 0,
+                    gl_format, GL.GL_UNSIGNED_BYTE,
+                    frame
+                )
+                self.texture_created = True
+            else:
+                # Update existing texture
+                GL.glTexSubImage2D(
+                    GL.GL_TEXTURE_2D, 0, 0, 0,
+                    width, height,
+                    gl_format, GL.GL_UNSIGNED_BYTE,
+                    frame
+                )
 
         GL.glBindTexture(GL.GL_TEXTURE_2D, 0)
-        self.texture_updated = True
+        # A frame written during the upload may be torn, upload again.
+        # Remote frames are decoded into their own arrays
+        shm = self.flowdip_node.shm
+        self.texture_updated = shm is None or shm.seq == frame_seq
 
     # --------------------------------------------------------------
     # Rendering routine
@@ -137,7 +162,7 @@ class CustomOpenGLWidget(QOpenGLWidget):
         widget_width = self.width()
         widget_height = self.height()
 
-        frame_h, frame_w, _ = self.frame_shape
+        frame_h, frame_w = self.frame_shape[:2]
         frame_aspect = frame_w / frame_h
         widget_aspect = widget_width / widget_height
 
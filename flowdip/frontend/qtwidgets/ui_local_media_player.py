@@ -11,6 +11,7 @@ from PySide6.QtWidgets import (
     QCheckBox, QFileDialog
 )
 
+from flowdip import TransportCommand
 from flowdip.frontend.qtwidgets.ui_custom_opengl_widget import CustomOpenGLWidget
 
 class LocalMediaPlayerWidget(QWidget):
@@ -18,6 +19,7 @@ class LocalMediaPlayerWidget(QWidget):
         self.flowdip_node = flowdip_node  # Reference to the associated FlowDiP node
         super().__init__(parent)
         self.video_display = None
+        self.playing = False
         self.setupUi(self)
         self.setupConnections()
 
@@ -121,19 +123,51 @@ class LocalMediaPlayerWidget(QWidget):
     def setupConnections(self):
         """Connect button events."""
         self.tb_filepath.clicked.connect(self.select_video_file)
+        self.btn_playpause.clicked.connect(self.toggle_play)
+        self.btn_stop.clicked.connect(self.stop)
+        self.btn_next_frame.clicked.connect(self.next_frame)
+
+    def set_playing(self, playing: bool):
+        self.playing = playing
+        text = "Pause" if playing else "Play"
+        icon = "media-playback-pause" if playing else "media-playback-start"
+        self.btn_playpause.setText(QCoreApplication.translate("LocalMediaPlayerWidget", text, None))
+        self.btn_playpause.setIcon(QIcon.fromTheme(icon))
+
+    def send_transport(self, command: TransportCommand, frames: int = 1):
+        if self.flowdip_node is not None:
+            self.flowdip_node.transport(command, frames)
+
+    def toggle_play(self):
+        self.send_transport(TransportCommand.PAUSE if self.playing else TransportCommand.PLAY)
+        self.set_playing(not self.playing)
+
+    def stop(self):
+        self.send_transport(TransportCommand.STOP)
+        self.set_playing(False)
+
+    def next_frame(self):
+        """Runs exactly one frame through the graph and stays paused."""
+        self.send_transport(TransportCommand.STEP, 1)
+        self.set_playing(False)
 
     def select_video_file(self):
         """Open a file dialog and update the QLineEdit with the selected path."""
+        file_filter = "Video files (*.mp4 *.avi *.mov *.mkv *.wmv *.flv);;All files (*)"
+        if self.flowdip_node is not None:
+            file_filter = self.flowdip_node.file_filter
+
         file_path, _ = QFileDialog.getOpenFileName(
             self,
             "Select video file",
             "",
-            "Video files (*.mp4 *.avi *.mov *.mkv *.wmv *.flv);;All files (*)"
+            file_filter
         )
         if file_path:
             self.le_filepath.setText(file_path)
             if self.flowdip_node:
                 self.flowdip_node.update_videopath(file_path)
+                self.set_playing(True)  # Sources start playing when opened
 
 
 if __name__ == "__main__":
@@ -0,0 +1,51 @@
+import zlib
+from typing import Tuple
+
+import numpy as np
+from PySide6.QtGui import QImage
+
+from flowdip import FramePayload
+
+# =============================================================================
+#  Preview frames of a remote backend
+# =============================================================================
+#
+#  Decodes the NEW_FRAME payloads built by backend/remote_preview.py. JPEG is
+#  decoded by Qt, so the frontend still doesn't need OpenCV; color frames
+#  come out as RGB.
+# =============================================================================
+
+
+def decode_frame(payload: FramePayload) -> Tuple[np.ndarray, str]:
+    """Returns (frame, pixel format)."""
+    if payload.codec == "jpeg":
+        image = QImage.fromData(payload.data, "JPG")
+        if image.isNull():
+            raise ValueError(f"Invalid JPEG preview frame from node '{payload.flowdip_name}'.")
+        if image.format() == QImage.Format.Format_Grayscale8:
+            channels, pixfmt = 1, "GRAY"
+        else:
+            image = image.convertToFormat(QImage.Format.Format_RGB888)
+            channels, pixfmt = 3, "RGB"
+        width, height = image.width(), image.height()
+        # Rows are padded to 4 bytes
+        rows = np.frombuffer(image.constBits(), dtype=np.uint8, count=image.sizeInBytes())
+        rows = rows.reshape(height, image.bytesPerLine())[:, :width * channels]
+        frame = rows.reshape((height, width, channels) if channels > 1 else (height, width)).copy()
+        return frame, pixfmt
+
+    if payload.codec == "lz4":
+        try:
+            import lz4.frame as lz4_frame
+        except ImportError:
+            raise ValueError("The backend sends lz4 previews but lz4 is not installed.")
+        raw = lz4_frame.decompress(payload.data)
+    elif payload.codec == "zlib":
+        raw = zlib.decompress(payload.data)
+    else:
+        raise ValueError(f"Unknown preview codec '{payload.codec}'.")
+
+    frame = np.frombuffer(raw, dtype=np.uint8)
+    if frame.size != int(np.prod(payload.shape)):
+        raise ValueError(f"Preview frame of node '{payload.flowdip_name}' does not match its shape.")
+    return frame.reshape(payload.shape), payload.pixfmt
@@ -0,0 +1,223 @@
+"""
+Logging of the FlowDiP processes.
+
+Loggers returned by flowdip.get_logger don't write to stderr themselves:
+records are put on a bounded in-memory queue and written by a background
+thread (one per process), so a node thread only pays a level check and,
+for enabled records, a queue put. Messages are formatted by the writer
+thread too: log with %-style arguments, not f-strings, on hot paths:
+
+    self.logger.debug("Frame %d decoded in %.1f ms", index, ms)
+
+Levels are set per logger with FLOWDIP_LOG, a comma separated list of a
+default level and "pattern=LEVEL" rules matched (fnmatch) against logger
+names, the last matching rule wins. Node loggers are named after their
+node, "flowdip.<Type>.<uuid>":
+
+    FLOWDIP_LOG="WARNING,Backend Manager*=INFO,flowdip.MediaPlayer.*=DEBUG"
+
+The default level is INFO. Repeated messages (same logger, level and
+format string) are rate limited: at most RATE_BURST of them per
+FLOWDIP_LOG_RATE seconds (5 by default, 0 disables it) go through, the
+next one let through reports how many were suppressed meanwhile. When the queue is full,
+records are dropped and counted instead of blocking the caller.
+
+Only the standard library is imported, the launcher uses this module too.
+"""
+import atexit
+import fnmatch
+import logging
+import os
+import queue
+import sys
+import threading
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, List, Optional, Tuple
+
+LOG_FORMAT = "[%(asctime)s] [%(name)s] [%(levelname)s] %(message)s"
+DEFAULT_LEVEL = logging.INFO
+QUEUE_SIZE = 10000
+RATE_BURST = 10  # Messages of a kind let through per rate limit window
+MAX_RATE_KEYS = 1024  # Kinds of messages tracked by the rate limiter
+
+# Records only carry what LOG_FORMAT prints: no thread, process or
+# multiprocessing lookups (logging cookbook, "Optimization")
+logging.logThreads = False
+logging.logProcesses = False
+logging.logMultiprocessing = False
+
+
+def parse_levels(spec: str) -> Tuple[int, List[Tuple[str, int]]]:
+    """Parses a FLOWDIP_LOG value into (default level, [(pattern, level)])."""
+    default, rules = DEFAULT_LEVEL, []
+    for item in spec.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        pattern, sep, name = item.rpartition("=")
+        level = logging.getLevelName(name.strip().upper())
+        if not isinstance(level, int):
+            raise ValueError(f"Invalid log level '{name.strip()}' in '{item}'.")
+        if sep:
+            rules.append((pattern.strip(), level))
+        else:
+            default = level
+    return default, rules
+
+
+class RateLimitFilter(logging.Filter):
+    """Lets at most `burst` messages of a kind through per `interval`
+    seconds. Suppressed messages are counted on the next one let through
+    (`suppressed` attribute of the record)."""
+
+    def __init__(self, interval: float, burst: int = RATE_BURST):
+        super().__init__()
+        self.interval = interval
+        self.burst = burst
+        self._windows: Dict[tuple, list] = {}  # Kind -> [window start, let through, suppressed]
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.interval <= 0:
+            return True
+        key = (record.name, record.levelno, str(record.msg))
+        now = record.created
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now - window[0] >= self.interval:
+                if window is None and len(self._windows) >= MAX_RATE_KEYS:
+                    self._prune(now)
+                suppressed = window[2] if window is not None else 0
+                window = self._windows[key] = [now, 0, 0]
+            else:
+                suppressed = 0
+            if window[1] >= self.burst:
+                window[2] += 1
+                return False
+            window[1] += 1
+            if suppressed:
+                record.suppressed = suppressed
+            return True
+
+    def _prune(self, now: float):
+        for key, window in list(self._windows.items()):
+            if now - window[0] >= self.interval:
+                del self._windows[key]
+        if len(self._windows) >= MAX_RATE_KEYS // 2:
+            self._windows.clear()  # Mostly distinct messages: start over rather than prune each time
+
+
+class _Formatter(logging.Formatter):
+
+    def format(self, record: logging.LogRecord) -> str:
+        text = super().format(record)
+        suppressed = getattr(record, "suppressed", 0)
+        if suppressed:
+            text += f" [{suppressed} similar messages suppressed]"
+        dropped = getattr(record, "dropped", 0)
+        if dropped:
+            text += f" [{dropped} messages dropped, log queue full]"
+        return text
+
+
+class _AsyncHandler(QueueHandler):
+    """Queues records without formatting them and never blocks."""
+
+    def __init__(self, log_queue: queue.SimpleQueue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record  # Formatted by the writer thread
+
+    def enqueue(self, record: logging.LogRecord):
+        if self.queue.qsize() >= QUEUE_SIZE:
+            self.dropped += 1  # The writer can't keep up
+            return
+        if self.dropped:
+            record.dropped, self.dropped = self.dropped, 0
+        self.queue.put_nowait(record)
+
+
+class LogPipeline:
+    """Queue, writer thread and level rules of the process."""
+
+    def __init__(self, spec: str, rate_limit: float, stream=None):
+        try:
+            self.default, self.rules = parse_levels(spec)
+            error = None
+        except ValueError as e:
+            self.default, self.rules = DEFAULT_LEVEL, []
+            error = e
+        self.stream = stream
+        self.handler = _AsyncHandler(queue.SimpleQueue())
+        self.handler.addFilter(RateLimitFilter(rate_limit))
+        self.listener: Optional[QueueListener] = None
+        self.start()
+        if error is not None:
+            self.get_logger("Logging").warning("Ignoring FLOWDIP_LOG: %s", error)
+
+    def start(self):
+        """Starts the writer thread, on a new queue."""
+        writer = logging.StreamHandler(self.stream if self.stream is not None else sys.stderr)
+        writer.setFormatter(_Formatter(LOG_FORMAT))
+        self.handler.queue = queue.SimpleQueue()
+        self.listener = QueueListener(self.handler.queue, writer)
+        self.listener.start()
+
+    def stop(self):
+        """Writes the queued records and stops the writer thread."""
+        if self.listener is not None and self.listener._thread is not None:
+            self.listener.stop()
+
+    def level_for(self, name: str) -> int:
+        level = self.default
+        for pattern, rule_level in self.rules:
+            if fnmatch.fnmatchcase(name, pattern):
+                level = rule_level
+        return level
+
+    def get_logger(self, name: str) -> logging.Logger:
+        logger = logging.getLogger(name)
+        if not logger.handlers:
+            logger.setLevel(self.level_for(name))
+            logger.addHandler(self.handler)
+            logger.propagate = False
+        return logger
+
+
+_pipeline: Optional[LogPipeline] = None
+_pipeline_lock = threading.Lock()
+
+
+def pipeline() -> LogPipeline:
+    global _pipeline
+    if _pipeline is None:
+        with _pipeline_lock:
+            if _pipeline is None:
+                _pipeline = LogPipeline(os.environ.get("FLOWDIP_LOG", ""),
+                                        float(os.environ.get("FLOWDIP_LOG_RATE", "5")))
+                atexit.register(_pipeline.stop)
+    return _pipeline
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Return a logger with the given name, configured if not already."""
+    return pipeline().get_logger(name)
+
+
+def flush():
+    """Writes the pending records. Call before a process ends with os._exit
+    (multiprocessing children), which skips atexit handlers."""
+    if _pipeline is not None:
+        _pipeline.stop()
+        _pipeline.start()
+
+
+def _after_fork_in_child():
+    # The writer thread isn't forked: the child gets its own
+    if _pipeline is not None:
+        _pipeline.start()
+
+
+os.register_at_fork(after_in_child=_after_fork_in_child)
@@ -0,0 +1,136 @@
+"""
+Declarative node registry shared by the frontend and backend processes.
+
+Every node type is described by a NodeSpec: its name (sent in requests), the
+"module:Class" paths of its frontend and backend classes and a set of
+capabilities. Classes are imported on first use, so each process only loads
+its own side, and only for the node types it actually instantiates.
+
+Plugins register nodes through the "flowdip.nodes" entry point group. An
+entry point must resolve to a NodeSpec, an iterable of NodeSpecs or a
+callable returning either; it should live in a lightweight module, since it
+is imported at discovery time:
+
+    [project.entry-points."flowdip.nodes"]
+    my_nodes = "my_package.flowdip_specs:NODES"
+"""
+import importlib
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, Iterable, Optional
+
+from flowdip import get_logger
+
+ENTRY_POINT_GROUP = "flowdip.nodes"
+
+logger = get_logger("Node Registry")
+
+
+@dataclass(frozen=True)
+class NodeSpec:
+    name: str                 # Node type, unique across plugins
+    frontend: str             # "module:Class" of the FrontFlowDiPNode subclass
+    backend: str              # "module:Class" of the BackEndFlowDiPNode subclass
+    capabilities: FrozenSet[str] = frozenset()
+
+
+def import_object(path: str):
+    """Imports "package.module:Attribute"."""
+    module_name, _, attr = path.partition(":")
+    if not attr:
+        raise ValueError(f"Invalid class path '{path}', expected 'module:Class'.")
+    return getattr(importlib.import_module(module_name), attr)
+
+
+class NodeRegistry:
+
+    def __init__(self):
+        self._specs: Dict[str, NodeSpec] = {}
+        self._classes: Dict[str, type] = {}  # Imported classes by class path
+
+    def register(self, spec: NodeSpec):
+        if spec.name in self._specs and self._specs[spec.name] != spec:
+            raise ValueError(f"Node type '{spec.name}' is already registered.")
+        self._specs[spec.name] = spec
+
+    def get(self, name: str) -> NodeSpec:
+        spec = self._specs.get(name)
+        if spec is None:
+            raise ValueError(f"Unknown node type '{name}'.")
+        return spec
+
+    def specs(self) -> Iterable[NodeSpec]:
+        return self._specs.values()
+
+    def has_capability(self, name: str, capability: str) -> bool:
+        return capability in self.get(name).capabilities
+
+    def backend_class(self, name: str) -> type:
+        return self._load(self.get(name).backend)
+
+    def frontend_class(self, name: str) -> type:
+        return self._load(self.get(name).frontend)
+
+    def _load(self, path: str) -> type:
+        cls = self._classes.get(path)
+        if cls is None:
+            cls = self._classes[path] = import_object(path)
+        return cls
+
+    def discover(self, group: str = ENTRY_POINT_GROUP):
+        """Registers the node specs exposed by installed plugins."""
+        from importlib.metadata import entry_points
+
+        for entry_point in entry_points(group=group):
+            try:
+                specs = entry_point.load()
+                if callable(specs):
+                    specs = specs()
+                if isinstance(specs, NodeSpec):
+                    specs = [specs]
+                for spec in specs:
+                    self.register(spec)
+            except Exception as e:
+                # A broken plugin must not prevent the application from starting
+                logger.error(f"Failed to load node plugin '{entry_point.name}': {e}")
+
+
+# =============================================================================
+#  Built-in nodes
+# =============================================================================
+
+_FE = "flowdip.frontend.flowdip_nodes"
+_BE = "flowdip.backend.flowdip_nodes"
+
+
+def _builtin(name: str, *capabilities: str) -> NodeSpec:
+    return NodeSpec(name, f"{_FE}:Front{name}", f"{_BE}:Back{name}", frozenset(capabilities))
+
+
+BUILTIN_NODES = (
+    _builtin("MediaPlayer", "source", "preview"),
+    _builtin("RawFrameSource", "source", "preview"),
+    _builtin("ImageSequencePlayer", "source", "preview"),
+    _builtin("RawFrameRecorder", "sink"),
+    _builtin("Resize", "image"),
+    _builtin("ColorConvert", "image"),
+    _builtin("Blur", "image"),
+    _builtin("Threshold", "image"),
+    _builtin("Crop", "image"),
+    _builtin("Normalize", "image"),
+    _builtin("Invert", "image"),
+    _builtin("Morphology", "image"),
+    _builtin("Inference", "inference"),
+)
+
+_registry: Optional[NodeRegistry] = None
+
+
+def get_registry() -> NodeRegistry:
+    """Returns the process registry, discovering plugins on first call."""
+    global _registry
+    if _registry is None:
+        _registry = NodeRegistry()
+        for spec in BUILTIN_NODES:
+            _registry.register(spec)
+        _registry.discover()
+    return _registry
@@ -0,0 +1,177 @@
+import struct
+from dataclasses import dataclass
+from multiprocessing.shared_memory import SharedMemory
+from typing import Optional, Tuple
+
+import numpy as np
+
+# =============================================================================
+#  Self-describing shared memory frame segments
+# =============================================================================
+#
+#  Layout:  [ header (DATA_OFFSET bytes) ][ payload (capacity bytes) ]
+#
+#  The header describes the frame currently stored in the payload (shape,
+#  strides, dtype, pixel format), so the geometry travels in-band: readers
+#  pick it up on the next frame, without any event from the writer.
+#
+#  Segments are allocated with headroom (see segment_capacity). A resolution
+#  change that fits in the capacity just rewrites the header; a bigger frame
+#  retires the segment (RETIRED flag) and the writer creates a new one under
+#  the same name, which readers re-attach to when they see the flag.
+#
+#  The header is guarded by a sequence lock: the writer makes `seq` odd while
+#  it updates the header and payload and even once the frame is complete.
+#  A reader that sees an odd sequence, or a different sequence after reading,
+#  has observed a frame being written.
+# =============================================================================
+
+SHM_MAGIC = b"FDSF"
+SHM_VERSION = 1
+DATA_OFFSET = 128  # Payload starts on a cache line boundary
+MAX_NDIM = 3
+
+FLAG_RETIRED = 1
+
+HEADROOM = 2.0  # Capacity / size of the first frame
+MIN_CAPACITY = 1920 * 1080 * 3  # A 1080p BGR frame
+
+# magic, version, header size, seq, flags, capacity, dtype, pixel format, ndim, shape[3], strides[3]
+_HEADER_STRUCT = struct.Struct("<4sHHQIQ8s8sB3I3I")
+_SEQ_STRUCT = struct.Struct("<Q")
+_SEQ_OFFSET = 8
+
+
+@dataclass(frozen=True)
+class FrameGeometry:
+    seq: int
+    shape: Tuple[int, ...]
+    strides: Tuple[int, ...]
+    dtype: np.dtype
+    pixfmt: str
+    retired: bool = False
+
+    @property
+    def nbytes(self) -> int:
+        return int(np.prod(self.shape)) * self.dtype.itemsize if self.shape else 0
+
+
+def segment_capacity(nbytes: int, headroom: float = HEADROOM) -> int:
+    """Payload capacity for a first frame of nbytes. Pages of a shared memory
+    segment are only committed when written, so the headroom costs address
+    space, not memory, until larger frames actually use it."""
+    return max(int(nbytes * headroom), MIN_CAPACITY)
+
+
+def default_pixfmt(frame: np.ndarray) -> str:
+    return "GRAY" if frame.ndim == 2 or frame.shape[2] == 1 else "BGR"
+
+
+class FrameSegment:
+    """Writer or reader end of a frame segment. The backend node creates and
+    unlinks it, the frontend attaches to it by name."""
+
+    def __init__(self, shm: SharedMemory, capacity: int, owner: bool):
+        self.shm = shm
+        self.capacity = capacity
+        self.owner = owner
+        self._seq = 0  # Writer side
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    @classmethod
+    def create(cls, name: str, capacity: int) -> "FrameSegment":
+        shm = SharedMemory(name=name, create=True, size=DATA_OFFSET + capacity)
+        segment = cls(shm, capacity, owner=True)
+        _HEADER_STRUCT.pack_into(shm.buf, 0, SHM_MAGIC, SHM_VERSION, DATA_OFFSET, 0, 0, capacity,
+                                 b"", b"", 0, 0, 0, 0, 0, 0, 0)
+        return segment
+
+    @classmethod
+    def attach(cls, name: str) -> "FrameSegment":
+        shm = SharedMemory(name=name)
+        magic, version, header_size, _, _, capacity, *_ = _HEADER_STRUCT.unpack_from(shm.buf, 0)
+        if magic != SHM_MAGIC or version != SHM_VERSION or header_size != DATA_OFFSET:
+            shm.close()
+            raise ValueError(f"Shared memory segment '{name}' is not a FlowDiP frame segment "
+                             f"(version {SHM_VERSION}).")
+        return cls(shm, capacity, owner=False)
+
+    # ------------------------------------------------------------------
+    # Writer
+    # ------------------------------------------------------------------
+    def fits(self, frame: np.ndarray) -> bool:
+        return frame.nbytes <= self.capacity and frame.ndim <= MAX_NDIM
+
+    def write(self, frame: np.ndarray, pixfmt: Optional[str] = None) -> bool:
+        """Publishes a frame. Returns False, without writing, if it does not
+        fit in the segment: the caller must retire it and create a bigger one."""
+        if not self.fits(frame):
+            return False
+
+        shape = frame.shape
+        strides = tuple(int(np.prod(shape[i + 1:])) * frame.dtype.itemsize for i in range(frame.ndim))
+        pad = (0,) * (MAX_NDIM - frame.ndim)
+
+        self._seq += 1  # Odd: frame being written
+        _HEADER_STRUCT.pack_into(self.shm.buf, 0, SHM_MAGIC, SHM_VERSION, DATA_OFFSET, self._seq, 0,
+                                 self.capacity, frame.dtype.str.encode(),
+                                 (pixfmt or default_pixfmt(frame)).encode(), frame.ndim,
+                                 *(shape + pad), *(strides + pad))
+        np.copyto(np.ndarray(shape, dtype=frame.dtype, buffer=self.shm.buf, offset=DATA_OFFSET), frame)
+        self._seq += 1  # Even: frame complete
+        _SEQ_STRUCT.pack_into(self.shm.buf, _SEQ_OFFSET, self._seq)
+        return True
+
+    def retire(self):
+        """Tells readers to re-attach: the writer is replacing the segment."""
+        self._seq += 2
+        flags_offset = _SEQ_OFFSET + _SEQ_STRUCT.size
+        struct.pack_into("<I", self.shm.buf, flags_offset, FLAG_RETIRED)
+        _SEQ_STRUCT.pack_into(self.shm.buf, _SEQ_OFFSET, self._seq)
+
+    # ------------------------------------------------------------------
+    # Reader
+    # ------------------------------------------------------------------
+    @property
+    def seq(self) -> int:
+        return _SEQ_STRUCT.unpack_from(self.shm.buf, _SEQ_OFFSET)[0]
+
+    def read_geometry(self, retries: int = 3) -> Optional[FrameGeometry]:
+        """Returns the geometry of the last complete frame, or None if no
+        frame was published yet or the writer kept it busy."""
+        for _ in range(retries):
+            (_, _, _, seq, flags, _, dtype, pixfmt, ndim,
+             *dims) = _HEADER_STRUCT.unpack_from(self.shm.buf, 0)
+            if flags & FLAG_RETIRED:
+                return FrameGeometry(seq, (), (), np.dtype(np.uint8), "", retired=True)
+            if seq & 1 or self.seq != seq:
+                continue
+            if ndim == 0:
+                return None
+            return FrameGeometry(
+                seq=seq,
+                shape=tuple(dims[:ndim]),
+                strides=tuple(dims[MAX_NDIM:MAX_NDIM + ndim]),
+                dtype=np.dtype(dtype.rstrip(b"\0").decode()),
+                pixfmt=pixfmt.rstrip(b"\0").decode(),
+            )
+        return None
+
+    def view(self, geometry: FrameGeometry) -> np.ndarray:
+        """Zero-copy view of the payload. Compare `seq` with geometry.seq
+        after using it to detect a frame written in the meantime."""
+        if geometry.nbytes > self.capacity:
+            raise ValueError(f"Frame geometry {geometry.shape} exceeds the segment capacity.")
+        return np.ndarray(geometry.shape, dtype=geometry.dtype, buffer=self.shm.buf,
+                          offset=DATA_OFFSET, strides=geometry.strides)
+
+    # ------------------------------------------------------------------
+    def close(self):
+        """Views returned by view() must be dropped first."""
+        self.shm.close()
+
+    def unlink(self):
+        self.shm.unlink()
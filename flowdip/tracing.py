@@ -0,0 +1,153 @@
+"""
+Opt-in execution tracing in Chrome trace-event format (opens in Perfetto or
+chrome://tracing).
+
+Set FLOWDIP_TRACE=/path/to/trace to enable it. Each process writes its own
+file on exit (trace-backend.json, trace-frontend.json, one
+trace-backend-shard<N>.json per shard of a sharded backend); they all use
+the same monotonic clock and can be merged with:
+
+    python -m flowdip.tracing merged.json trace-backend.json trace-frontend.json
+
+Spans are recorded into per-thread buffers without locking. When tracing is
+disabled, span() returns a shared no-op context manager.
+"""
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from typing import List, Optional
+
+TRACE_PATH = os.environ.get("FLOWDIP_TRACE") or None
+MAX_EVENTS_PER_THREAD = 1_000_000  # Oldest spans are dropped beyond this
+
+enabled = TRACE_PATH is not None
+
+_local = threading.local()
+_buffers: List[tuple] = []  # (thread id, thread name, events) for every traced thread
+_buffers_lock = threading.Lock()  # Only taken once per thread, on first span
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def _thread_buffer() -> deque:
+    events = getattr(_local, "events", None)
+    if events is None:
+        events = _local.events = deque(maxlen=MAX_EVENTS_PER_THREAD)
+        thread = threading.current_thread()
+        with _buffers_lock:
+            _buffers.append((thread.ident, thread.name, events))
+    return events
+
+
+class _Span:
+    __slots__ = ("name", "detail", "cat", "t0")
+
+    def __init__(self, name: str, detail: Optional[str], cat: str):
+        self.name = name
+        self.detail = detail
+        self.cat = cat
+
+    def __enter__(self):
+        self.t0 = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        t1 = time.perf_counter_ns()
+        # deque.append is atomic: no lock on the hot path
+        _thread_buffer().append((self.name, self.detail, self.cat, self.t0, t1 - self.t0))
+        return False
+
+
+def span(name: str, detail: Optional[str] = None, cat: str = "flowdip"):
+    """Context manager recording a complete ("X") event around its body.
+    `detail` (e.g. the node name) is shown in the event arguments."""
+    if not enabled:
+        return _NULL_SPAN
+    return _Span(name, detail, cat)
+
+
+def enable(path: Optional[str] = None):
+    global enabled, TRACE_PATH
+    TRACE_PATH = path or TRACE_PATH or "flowdip-trace"
+    enabled = True
+
+
+def disable():
+    global enabled
+    enabled = False
+
+
+def _drain(spans: deque) -> list:
+    """Takes the spans out of a thread buffer. Iterating it could fail with
+    "deque mutated during iteration" if its thread still records, while
+    popleft() is atomic like append()."""
+    drained = []
+    try:
+        while True:
+            drained.append(spans.popleft())
+    except IndexError:
+        return drained
+
+
+def trace_events() -> List[dict]:
+    """Converts the recorded spans to Chrome trace events, and removes
+    them from the buffers. Threads may still be recording."""
+    pid = os.getpid()
+    events = []
+    with _buffers_lock:
+        buffers = list(_buffers)
+    for tid, thread_name, spans in buffers:
+        events.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": tid,
+                       "args": {"name": thread_name}})
+        for name, detail, cat, t0, dur in _drain(spans):
+            event = {"name": name, "cat": cat, "ph": "X", "pid": pid, "tid": tid,
+                     "ts": t0 / 1000.0, "dur": dur / 1000.0}
+            if detail is not None:
+                event["args"] = {"detail": detail}
+            events.append(event)
+    return events
+
+
+def dump(label: str, process_name: Optional[str] = None) -> Optional[str]:
+    """Writes this process' trace to '<FLOWDIP_TRACE>-<label>.json'."""
+    if TRACE_PATH is None:
+        return None
+    root = TRACE_PATH[:-5] if TRACE_PATH.endswith(".json") else TRACE_PATH
+    path = f"{root}-{label}.json"
+
+    events = trace_events()
+    events.append({"name": "process_name", "ph": "M", "pid": os.getpid(),
+                   "args": {"name": process_name or label}})
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+    return path
+
+
+def merge(out_path: str, paths: List[str]):
+    """Merges several trace files into one timeline."""
+    events = []
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            events.extend(json.load(f)["traceEvents"])
+    with open(out_path, "w", encoding="utf-8") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        sys.exit("usage: python -m flowdip.tracing <merged.json> <trace.json>...")
+    merge(sys.argv[1], sys.argv[2:])
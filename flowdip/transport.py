@@ -0,0 +1,422 @@
+"""
+Socket transport between the frontend and a remote backend.
+
+`python -m flowdip --listen HOST:PORT` runs the backend alone and serves one
+frontend at a time; `python -m flowdip --connect HOST:PORT` runs the frontend
+against it. Local sessions keep using multiprocessing queues and shared memory.
+
+Requests and events are sent with a compact tagged binary encoding of the
+dataclasses and enums of the flowdip package (WIRE_TYPES), not pickle: a
+peer can only ever make the other side build those types. Messages are
+length-prefixed. There is no authentication, so only listen on trusted
+networks (or bind to 127.0.0.1 and use an SSH tunnel).
+
+Each connection is a SocketChannel with two queue-like ends:
+  - incoming: a queue.Queue filled by a reader thread. When the peer goes
+    away, `eof_message` is posted so that the manager reading it stops.
+  - outgoing: put() queues messages in order for a sender thread, so node
+    threads never block on the network. put_latest() keeps only the most
+    recent message per key (preview frames): when the link is slower than
+    the frames, the older ones are dropped and counted as coalesced.
+
+Only the standard library is imported, the launcher uses this module too.
+"""
+import queue
+import socket
+import struct
+import threading
+import time
+from collections import deque
+from dataclasses import fields, is_dataclass
+from enum import IntEnum
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from flowdip import (
+    BatchPayload, ConnectPortsPayload, CreateNodePayload, DeleteNodePayload, Event, EventType,
+    FramePayload, NodeMetricsPayload, Request, RequestDonePayload, RequestType, RunNodePayload,
+    TransportCommand, UpdateNodeParamsPayload, get_logger,
+)
+
+logger = get_logger("Transport")
+
+PROTOCOL_MAGIC = b"FDIP"
+PROTOCOL_VERSION = 2
+DEFAULT_PORT = 7878
+MAX_MESSAGE_BYTES = 256 * 2 ** 20
+
+# Types that can be sent, identified by their index: only append to it
+WIRE_TYPES = (
+    RequestType, EventType, TransportCommand,
+    Request, Event,
+    CreateNodePayload, DeleteNodePayload, RunNodePayload, UpdateNodeParamsPayload,
+    ConnectPortsPayload, BatchPayload, NodeMetricsPayload, FramePayload, RequestDonePayload,
+)
+_TYPE_IDS = {cls: index for index, cls in enumerate(WIRE_TYPES)}
+_FIELDS = {cls: tuple(field.name for field in fields(cls)) for cls in WIRE_TYPES if is_dataclass(cls)}
+
+_HANDSHAKE = struct.Struct("<4sH")
+_LENGTH = struct.Struct("<I")
+_FLOAT = struct.Struct("<d")
+
+# Value tags
+(_NONE, _TRUE, _FALSE, _INT, _FLOAT_TAG, _STR, _BYTES,
+ _LIST, _TUPLE, _DICT, _OBJECT, _ENUM) = range(12)
+
+
+# =============================================================================
+#  Encoding
+# =============================================================================
+
+def _write_uint(out: bytearray, n: int):
+    while n >= 0x80:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def _write_int(out: bytearray, n: int):
+    _write_uint(out, n * 2 if n >= 0 else -n * 2 - 1)  # Zigzag: small negatives stay short
+
+
+def encode(obj: Any) -> bytes:
+    out = bytearray()
+    _encode(obj, out)
+    return bytes(out)
+
+
+def _encode(obj: Any, out: bytearray):
+    if obj is None:
+        out.append(_NONE)
+    elif obj is True:
+        out.append(_TRUE)
+    elif obj is False:
+        out.append(_FALSE)
+    elif isinstance(obj, IntEnum):
+        type_id = _TYPE_IDS.get(type(obj))
+        if type_id is None:
+            raise TypeError(f"Enum {type(obj).__name__} is not a wire type.")
+        out.append(_ENUM)
+        _write_uint(out, type_id)
+        _write_int(out, int(obj))
+    elif isinstance(obj, int):
+        out.append(_INT)
+        _write_int(out, obj)
+    elif isinstance(obj, float):
+        out.append(_FLOAT_TAG)
+        out += _FLOAT.pack(obj)
+    elif isinstance(obj, str):
+        data = obj.encode("utf-8")
+        out.append(_STR)
+        _write_uint(out, len(data))
+        out += data
+    elif isinstance(obj, (bytes, bytearray, memoryview)):
+        out.append(_BYTES)
+        _write_uint(out, len(obj))
+        out += obj
+    elif isinstance(obj, (list, tuple)):
+        out.append(_LIST if isinstance(obj, list) else _TUPLE)
+        _write_uint(out, len(obj))
+        for item in obj:
+            _encode(item, out)
+    elif isinstance(obj, dict):
+        out.append(_DICT)
+        _write_uint(out, len(obj))
+        for key, value in obj.items():
+            _encode(key, out)
+            _encode(value, out)
+    elif type(obj) in _FIELDS:
+        out.append(_OBJECT)
+        _write_uint(out, _TYPE_IDS[type(obj)])
+        for name in _FIELDS[type(obj)]:
+            _encode(getattr(obj, name), out)
+    elif hasattr(obj, "item") and getattr(obj, "ndim", None) == 0:
+        _encode(obj.item(), out)  # NumPy scalars in metrics and stats
+    else:
+        raise TypeError(f"Cannot send {type(obj).__name__} objects over the transport.")
+
+
+class _Reader:
+
+    def __init__(self, data: bytes):
+        self.data = memoryview(data)
+        self.pos = 0
+
+    def uint(self) -> int:
+        n = shift = 0
+        while True:
+            byte = self.data[self.pos]
+            self.pos += 1
+            n |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                return n
+            shift += 7
+
+    def int(self) -> int:
+        n = self.uint()
+        return n >> 1 if not n & 1 else -((n + 1) >> 1)
+
+    def take(self, size: int) -> memoryview:
+        if self.pos + size > len(self.data):
+            raise ValueError("Truncated message.")
+        chunk = self.data[self.pos:self.pos + size]
+        self.pos += size
+        return chunk
+
+    def value(self) -> Any:
+        tag = self.data[self.pos]
+        self.pos += 1
+        if tag == _NONE:
+            return None
+        if tag == _TRUE:
+            return True
+        if tag == _FALSE:
+            return False
+        if tag == _INT:
+            return self.int()
+        if tag == _FLOAT_TAG:
+            return _FLOAT.unpack(self.take(_FLOAT.size))[0]
+        if tag == _STR:
+            return str(self.take(self.uint()), "utf-8")
+        if tag == _BYTES:
+            return bytes(self.take(self.uint()))
+        if tag == _LIST:
+            return [self.value() for _ in range(self.uint())]
+        if tag == _TUPLE:
+            return tuple(self.value() for _ in range(self.uint()))
+        if tag == _DICT:
+            return {self.value(): self.value() for _ in range(self.uint())}
+        if tag in (_OBJECT, _ENUM):
+            type_id = self.uint()
+            if type_id >= len(WIRE_TYPES):
+                raise ValueError(f"Unknown wire type {type_id}.")
+            cls = WIRE_TYPES[type_id]
+            if tag == _ENUM and issubclass(cls, IntEnum):
+                return cls(self.int())
+            if tag == _OBJECT and cls in _FIELDS:
+                return cls(*(self.value() for _ in _FIELDS[cls]))
+            raise ValueError(f"Wire type {cls.__name__} does not match its tag.")
+        raise ValueError(f"Unknown value tag {tag}.")
+
+
+def decode(data: bytes) -> Any:
+    try:
+        return _Reader(data).value()
+    except (IndexError, RecursionError, TypeError, UnicodeDecodeError) as e:
+        raise ValueError(f"Malformed message: {e!r}")
+
+
+# =============================================================================
+#  Channel
+# =============================================================================
+
+class Outbox:
+    """Sending end of a SocketChannel, used like a multiprocessing.Queue."""
+
+    def __init__(self, channel: "SocketChannel"):
+        self.channel = channel
+        self._cond = threading.Condition()
+        self._messages = deque()
+        self._latest: Dict[Any, Callable[[], Any]] = {}
+        self._stats = {"bytes": 0, "messages": 0, "coalesced": 0}
+        self._stats_since = time.perf_counter()
+
+    def put(self, obj: Any, block: bool = True, timeout: Optional[float] = None):
+        if self.channel.closed.is_set():
+            return  # Peer gone: the session is ending anyway
+        with self._cond:
+            self._messages.append(obj)
+            self._cond.notify()
+
+    def put_latest(self, key: Any, make: Callable[[], Any]):
+        """Queues make(), called by the sender thread to build the message,
+        replacing the one still pending for the same key."""
+        if self.channel.closed.is_set():
+            return
+        with self._cond:
+            if self._latest.pop(key, None) is not None:
+                self._stats["coalesced"] += 1
+            self._latest[key] = make
+            self._cond.notify()
+
+    def take_stats(self) -> dict:
+        """Returns the counters since the last call and resets them."""
+        with self._cond:
+            now = time.perf_counter()
+            stats, self._stats = self._stats, {"bytes": 0, "messages": 0, "coalesced": 0}
+            stats["interval"] = now - self._stats_since
+            self._stats_since = now
+        return stats
+
+    def _next(self) -> Tuple[Any, Optional[Callable[[], Any]]]:
+        """Returns (message, None) or (None, make), (None, None) once closed."""
+        with self._cond:
+            while not self._messages and not self._latest:
+                if self.channel.closed.is_set():
+                    return None, None
+                self._cond.wait()
+            if self._messages:
+                return self._messages.popleft(), None
+            key = next(iter(self._latest))  # Oldest pending key first
+            return None, self._latest.pop(key)
+
+    def _run(self):
+        while True:
+            message, make = self._next()
+            if make is not None:
+                try:
+                    message = make()
+                except Exception as e:
+                    # A failing preview must not stop the events behind it
+                    logger.error("Message not built: %r", e)
+                    continue
+            if message is None:
+                if self.channel.closed.is_set():
+                    return
+                continue  # Nothing to send after all (make() returned None)
+            try:
+                data = encode(message)
+                self.channel.sock.sendall(_LENGTH.pack(len(data)) + data)
+            except TypeError as e:
+                logger.error(f"Message not sent: {e}")
+                continue
+            except OSError:
+                self.channel.close()
+                return
+            with self._cond:
+                self._stats["bytes"] += len(data) + _LENGTH.size
+                self._stats["messages"] += 1
+
+    def _wake(self):
+        with self._cond:
+            self._cond.notify_all()
+
+
+class SocketChannel:
+    """Message channel over a connected socket."""
+
+    def __init__(self, sock: socket.socket, eof_message: Any = None, name: str = "flowdip-socket"):
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.sock = sock
+        self.peer = sock.getpeername()
+        self.eof_message = eof_message
+        self.closed = threading.Event()
+        self.incoming: queue.Queue = queue.Queue()
+        self.outgoing = Outbox(self)
+        self._reader = threading.Thread(target=self._read_loop, name=f"{name}-reader", daemon=True)
+        self._sender = threading.Thread(target=self.outgoing._run, name=f"{name}-sender", daemon=True)
+        self._reader.start()
+        self._sender.start()
+
+    def _recv_exact(self, size: int) -> Optional[bytes]:
+        chunks, remaining = [], size
+        while remaining:
+            chunk = self.sock.recv(min(remaining, 1 << 20))
+            if not chunk:
+                return None
+            chunks.append(chunk)
+            remaining -= len(chunk)
+        return b"".join(chunks)
+
+    def _read_loop(self):
+        try:
+            while not self.closed.is_set():
+                header = self._recv_exact(_LENGTH.size)
+                if header is None:
+                    break
+                (size,) = _LENGTH.unpack(header)
+                if size > MAX_MESSAGE_BYTES:
+                    raise ValueError(f"Message of {size} bytes exceeds the limit.")
+                data = self._recv_exact(size)
+                if data is None:
+                    break
+                self.incoming.put(decode(data))
+        except (OSError, ValueError) as e:
+            if not self.closed.is_set():
+                logger.error(f"Connection with {self.peer} failed: {e}")
+        self.close()
+        if self.eof_message is not None:
+            self.incoming.put(self.eof_message)
+
+    def close(self):
+        if self.closed.is_set():
+            return
+        self.closed.set()
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
+        self.outgoing._wake()
+        logger.info(f"Connection with {self.peer} closed")
+
+    def flush(self, timeout: float = 2.0):
+        """Waits until the queued messages are sent."""
+        deadline = time.monotonic() + timeout
+        while (self.outgoing._messages or self.outgoing._latest) and not self.closed.is_set():
+            if time.monotonic() > deadline:
+                break
+            time.sleep(0.01)
+
+
+# =============================================================================
+#  Connections
+# =============================================================================
+
+def parse_address(address: str, default_host: str = "127.0.0.1") -> Tuple[str, int]:
+    """"HOST:PORT", "PORT" or "HOST" -> (host, port)."""
+    host, _, port = address.rpartition(":")
+    if not host and not port.isdigit():
+        host, port = port, ""
+    try:
+        return host or default_host, int(port) if port else DEFAULT_PORT
+    except ValueError:
+        raise ValueError(f"Invalid address '{address}', expected HOST:PORT.")
+
+
+def _handshake(sock: socket.socket):
+    sock.sendall(_HANDSHAKE.pack(PROTOCOL_MAGIC, PROTOCOL_VERSION))
+    data = b""
+    while len(data) < _HANDSHAKE.size:
+        chunk = sock.recv(_HANDSHAKE.size - len(data))
+        if not chunk:
+            raise ConnectionError("Connection closed during the handshake.")
+        data += chunk
+    magic, version = _HANDSHAKE.unpack(data)
+    if magic != PROTOCOL_MAGIC or version != PROTOCOL_VERSION:
+        raise ConnectionError(f"Peer is not a FlowDiP endpoint of protocol version {PROTOCOL_VERSION}.")
+
+
+def listen(address: str) -> socket.socket:
+    host, port = parse_address(address)
+    server = socket.create_server((host, port))
+    logger.info(f"Listening for frontends on {host}:{port}")
+    return server
+
+
+def accept(server: socket.socket, eof_message: Any = None, timeout: float = 10.0) -> SocketChannel:
+    """Waits for the next peer. Peers failing the handshake are dropped."""
+    while True:
+        sock, peer = server.accept()
+        sock.settimeout(timeout)
+        try:
+            _handshake(sock)
+        except (OSError, ConnectionError) as e:
+            logger.warning(f"Rejected connection from {peer}: {e}")
+            sock.close()
+            continue
+        sock.settimeout(None)
+        logger.info(f"Frontend connected from {peer}")
+        return SocketChannel(sock, eof_message, name="flowdip-frontend")
+
+
+def connect(address: str, eof_message: Any = None, timeout: float = 10.0) -> SocketChannel:
+    host, port = parse_address(address)
+    sock = socket.create_connection((host, port), timeout=timeout)
+    try:
+        _handshake(sock)
+    except (OSError, ConnectionError):
+        sock.close()
+        raise
+    sock.settimeout(None)
+    logger.info(f"Connected to backend at {host}:{port}")
+    return SocketChannel(sock, eof_message, name="flowdip-backend")